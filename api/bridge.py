@@ -0,0 +1,24 @@
+from flask import jsonify, request
+from . import app
+from models.bridge_server import handle_request
+from models.telemetry import telemetry
+
+# The bridge protocol over HTTP, so model actions can be served by the
+# pre-fork workers in api/prefork.py instead of a per-caller subprocess.
+# The request body is the same {"action", "params", "request_id"} object the
+# NDJSON bridge reads, and the response is the same envelope.
+@app.route('/api/bridge', methods=['POST'])
+def bridge_request():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            "success": False,
+            "request_id": "unknown",
+            "error": "Request body must be a JSON object",
+            "data": None
+        }), 400
+    
+    # Failures are reported in the envelope's success/error fields, as on the NDJSON bridge
+    response = handle_request(data)
+    with telemetry.stage("serialize", data.get("action", "") or "unknown"):
+        return jsonify(response)
@@ -32,8 +32,17 @@ try:
     # These imports are just to register the routes
     from . import quizzes
     from . import slides
+    from . import uploads
+    from . import jobs
+    from . import bridge
+    from . import metrics
 except ImportError as e:
     print(f"Warning: Could not import some API modules: {e}")
 
 if __name__ == '__main__':
+    try:
+        from .jobs import start_background_jobs
+        start_background_jobs()
+    except ImportError as e:
+        print(f"Warning: Could not resume background jobs: {e}")
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8000))) 
\ No newline at end of file
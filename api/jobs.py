@@ -0,0 +1,328 @@
+from flask import jsonify
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from . import app
+from .quiz_store import quiz_store
+from .response_cache import invalidate_quiz
+from .storage import blob_store, connect
+
+# Background pipeline that turns an upload into AI artifacts: text extraction
+# followed by summary/quiz/flashcard generation for each learning speed. Jobs
+# are persisted in SQLite so queued or interrupted work resumes on restart.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_DB_PATH = os.path.join(blob_store.root, "jobs.db")
+# Delay before a job whose stage got placeholder output runs again
+JOB_RETRY_DELAY_SECONDS = float(os.environ.get("JOB_RETRY_DELAY_SECONDS", 60))
+LEARNING_SPEEDS = ["slow", "moderate", "fast"]
+GENERATED_KINDS = ["summary", "quiz", "flashcards"]
+STAGES = ["extract_text"] + [f"generate_{speed}" for speed in LEARNING_SPEEDS]
+IMAGE_EXTENSIONS = ["jpg", "jpeg", "png", "gif"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    upload_id TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    completed_stages INTEGER NOT NULL DEFAULT 0,
+    results TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_sha256_status ON jobs (sha256, status);
+CREATE TABLE IF NOT EXISTS job_uploads (
+    job_id TEXT NOT NULL,
+    upload_id TEXT NOT NULL,
+    PRIMARY KEY (job_id, upload_id)
+);
+"""
+
+def extract_text(path: str, extension: str) -> str:
+    """
+    Extract plain text from an uploaded PDF or image
+    
+    Args:
+        path: Path of the stored file
+        extension: File extension used to pick the extractor
+    
+    Returns:
+        The extracted text
+    """
+    if extension == "pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            try:
+                from PyPDF2 import PdfReader
+            except ImportError:
+                raise RuntimeError("PDF text extraction requires the pypdf package")
+        reader = PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    
+    if extension in IMAGE_EXTENSIONS:
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("Image text extraction requires the pytesseract and Pillow packages")
+        with Image.open(path) as image:
+            return pytesseract.image_to_string(image)
+    
+    raise RuntimeError(f"No text extractor for .{extension} files")
+
+def artifacts_complete(artifacts: Dict[str, Any]) -> bool:
+    """Whether every stage's output is already stored for a blob"""
+    if "text" not in artifacts:
+        return False
+    return all(speed in artifacts.get(kind, {}) for kind in GENERATED_KINDS for speed in LEARNING_SPEEDS)
+
+class JobQueue:
+    """
+    Persistent job store backed by SQLite with a thread pool of workers
+    
+    Each stage's output is written as soon as the stage finishes, so a job
+    picked up again after a restart skips the stages that already ran.
+    """
+    
+    def __init__(self, db_path: str = JOB_DB_PATH, workers: int = JOB_WORKERS):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.executescript(SCHEMA)
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+    
+    def reset_after_fork(self):
+        """Give a forked child its own worker threads; the parent's do not exist there"""
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record by id, or None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["results"] = json.loads(job["results"])
+        return job
+    
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with connect(self.db_path) as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    
+    def enqueue(self, upload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Queue the pipeline for an upload
+        
+        Args:
+            upload: Upload record from the blob store
+        
+        Every upload gets its own catalogue quizzes: when the content has
+        already been processed they are published straight away, and an
+        upload that joins an active job is published by that job.
+        
+        Returns:
+            The new or already active job for the same content, or None when
+            every artifact for the content has already been generated
+        """
+        sha256 = upload["sha256"]
+        artifacts = blob_store.get_artifacts(sha256)
+        if artifacts_complete(artifacts):
+            for speed in LEARNING_SPEEDS:
+                self._publish_quiz(upload["id"], speed, artifacts["quiz"][speed])
+            return None
+        
+        with connect(self.db_path) as conn:
+            # Take the write lock before looking, so concurrent uploads of the
+            # same content (from any thread or process) cannot both insert a job
+            conn.execute("BEGIN IMMEDIATE")
+            active = conn.execute(
+                "SELECT id FROM jobs WHERE sha256 = ? AND status IN ('queued', 'running') ORDER BY created_at LIMIT 1",
+                (sha256,)
+            ).fetchone()
+            if active is not None:
+                job_id = active["id"]
+            else:
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO jobs (id, upload_id, sha256, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (job_id, upload["id"], sha256, now, now)
+                )
+            conn.execute("INSERT OR IGNORE INTO job_uploads (job_id, upload_id) VALUES (?, ?)", (job_id, upload["id"]))
+        
+        if active is None:
+            self.executor.submit(self._run, job_id)
+            return self.get(job_id)
+        
+        # The job publishes each speed for the uploads attached when it
+        # finishes that speed; publish the speeds it finished before this one joined
+        job = self.get(job_id)
+        for speed, result in job["results"].items():
+            self._publish_quiz(upload["id"], speed, result["quiz"])
+        return job
+    
+    def resume(self) -> List[str]:
+        """Resubmit jobs left queued or running by a previous process"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        job_ids = [row["id"] for row in rows]
+        for job_id in job_ids:
+            self._update(job_id, status="queued")
+            self.executor.submit(self._run, job_id)
+        if job_ids:
+            print(f"Resumed {len(job_ids)} background job(s)")
+        return job_ids
+    
+    def _run(self, job_id: str):
+        job = self.get(job_id)
+        if job is None:
+            return
+        self._update(job_id, status="running", error=None)
+        
+        try:
+            blob = blob_store.get_blob(job["sha256"])
+            if blob is None:
+                raise RuntimeError("Uploaded file is no longer stored")
+            results = job["results"]
+            
+            # Stage 1: text extraction (deterministic, so always stored with the blob)
+            self._update(job_id, stage="extract_text")
+            text = blob_store.get_artifacts(blob["sha256"]).get("text")
+            if text is None:
+                text = extract_text(blob["path"], blob["extension"])
+                blob_store.put_artifact(blob["sha256"], "text", text)
+            if not text.strip():
+                raise RuntimeError("No text could be extracted from the upload")
+            self._update(job_id, completed_stages=1)
+            
+            # Imported here so the API starts without loading the model stack
+            from models import model_bridge
+            
+            # Remaining stages: one encoder pass per learning speed
+            for index, speed in enumerate(LEARNING_SPEEDS, start=2):
+                self._update(job_id, stage=f"generate_{speed}")
+                artifacts = blob_store.get_artifacts(blob["sha256"])
+                stored = {kind: artifacts[kind][speed] for kind in GENERATED_KINDS if speed in artifacts.get(kind, {})}
+                
+                if len(stored) == len(GENERATED_KINDS):
+                    results[speed] = stored
+                elif speed not in results:
+                    result = model_bridge.generate_all(text, speed)
+                    # Placeholder output is never published or stored; the
+                    # stages finished so far are kept and the job runs again
+                    if result.get("mock"):
+                        self._requeue(job_id, "Model unavailable; the job will be retried")
+                        return
+                    results[speed] = result
+                    for kind in GENERATED_KINDS:
+                        blob_store.put_artifact(blob["sha256"], kind, result[kind], speed)
+                
+                # Record the result before publishing, so an upload attached in between still sees it
+                self._update(job_id, completed_stages=index, results=json.dumps(results))
+                for upload_id in self._upload_ids(job):
+                    self._publish_quiz(upload_id, speed, results[speed]["quiz"])
+            
+            self._update(job_id, status="done", stage=None)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+
+    def _requeue(self, job_id: str, reason: str):
+        """Mark a job queued again and resubmit it after JOB_RETRY_DELAY_SECONDS"""
+        print(f"Job {job_id} requeued: {reason}")
+        self._update(job_id, status="queued", error=reason)
+        timer = threading.Timer(JOB_RETRY_DELAY_SECONDS, self.executor.submit, (self._run, job_id))
+        timer.daemon = True
+        timer.start()
+    
+    def _upload_ids(self, job: Dict[str, Any]) -> List[str]:
+        """Uploads waiting on a job: the one that created it and every upload of the same content since"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT upload_id FROM job_uploads WHERE job_id = ?", (job["id"],)).fetchall()
+        return list(dict.fromkeys([job["upload_id"]] + [row["upload_id"] for row in rows]))
+    
+    def _publish_quiz(self, upload_id: str, speed: str, quiz: Dict[str, Any]):
+        """Add a generated quiz to the catalogue under the uploader's course"""
+        upload = blob_store.get_upload(upload_id)
+        if upload is None:
+            return
+        quiz_id = f"{upload['id']}-{speed}"
+        quiz_store.put_quiz({
+            "id": quiz_id,
+            "course_id": upload["course_id"],
+            "owner_id": upload["user_id"],
+            "title": f"{upload['title']} ({speed} pace)",
+            "description": quiz.get("description", ""),
+            "learning_speed": speed,
+            "upload_id": upload["id"],
+            "questions": quiz.get("questions", [])
+        })
+        invalidate_quiz(quiz_id)
+
+def job_payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Client-facing view of a job record"""
+    payload = {
+        "jobId": job["id"],
+        "uploadId": job["upload_id"],
+        "contentHash": job["sha256"],
+        "state": job["status"],
+        "stage": job["stage"],
+        "completedStages": job["completed_stages"],
+        "totalStages": len(STAGES),
+        "error": job["error"],
+        "statusUrl": f"/api/jobs/{job['id']}"
+    }
+    if job["status"] == "done":
+        payload["results"] = job["results"]
+    return payload
+
+# Shared queue used by the API routes
+job_queue = JobQueue()
+os.register_at_fork(after_in_child=job_queue.reset_after_fork)
+
+_resumed = False
+
+def start_background_jobs() -> List[str]:
+    """
+    Pick up work left queued or running by a previous process
+    
+    Called once at server startup by the process that owns the job pipeline:
+    the app's __main__ block, or the first worker forked by api.prefork.
+    Importing this module never starts model work. Later calls are no-ops.
+    
+    Returns:
+        Ids of the resubmitted jobs
+    """
+    global _resumed
+    if _resumed:
+        return []
+    _resumed = True
+    return job_queue.resume()
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({
+                "status": "error",
+                "message": "Job not found"
+            }), 404
+        
+        return jsonify(dict(job_payload(job), status="success"))
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
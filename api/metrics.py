@@ -0,0 +1,37 @@
+import time
+from flask import Response, g, jsonify, request
+from . import app
+from models.telemetry import telemetry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency of every Flask route, labelled by its URL rule rather than the raw
+# path so that ids in the URL do not create a series each
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        telemetry.observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - started,
+            endpoint=request.url_rule.rule if request.url_rule is not None else "unmatched",
+            method=request.method,
+            status=str(response.status_code)
+        )
+    return response
+
+# Histograms and counters from the bridge, the model code and the routes
+# above, in the Prometheus text format
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    try:
+        return Response(telemetry.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
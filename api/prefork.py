@@ -0,0 +1,172 @@
+"""
+Pre-fork multi-worker server for the Flask API
+
+The master process imports the app, loads BartModelHandler and UserClassifier
+once, freezes the garbage collector, binds the listening socket, and then
+forks the workers. Each worker accepts connections on the inherited socket
+and shares the master's model weights copy-on-write. The weights are only
+read during inference, so their pages stay shared. Each worker sets its
+torch intra-op thread count so that the workers together use no more
+threads than there are cores.
+
+Workers serve one request at a time, so N workers run at most N generations
+at once. Workers that exit are restarted. Background jobs left over from a
+previous run are resumed by the first worker only, and not again when a
+worker is restarted; the master never runs jobs, so none are mid-flight
+when it forks. SIGINT or SIGTERM stops the workers and then the master.
+
+Usage: python -m api.prefork [--workers N] [--host HOST] [--port PORT]
+
+See PREFORK_SERVING.md for memory and throughput measurements.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PREFORK_WORKERS = int(os.environ.get("PREFORK_WORKERS", str(os.cpu_count() or 1)))
+PREFORK_HOST = os.environ.get("HOST", "0.0.0.0")
+PREFORK_PORT = int(os.environ.get("PORT", 8000))
+LISTEN_BACKLOG = 128
+
+# Restarting a worker that keeps crashing is delayed by this much
+RESPAWN_DELAY_SECONDS = 1.0
+
+def threads_per_worker(workers: int) -> int:
+    """Torch intra-op threads per worker so the total stays within the core count"""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """
+    Memory use of a process in kB, from /proc/<pid>/smaps_rollup
+    
+    Returns:
+        rss (resident), pss (resident with shared pages split between
+        sharers), uss (pages private to the process) and shared
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    }
+
+def load_models():
+    """Load both models in the master before forking and return the Flask app"""
+    from api.index import app
+    from models import model_bridge
+    
+    start = time.perf_counter()
+    model_bridge.warm_up()
+    handler = model_bridge.bart_loader.get()
+    classifier = model_bridge.classifier_loader.get()
+    print(f"Master loaded models in {time.perf_counter() - start:.1f}s "
+          f"(BART {'ready' if handler is not None else 'unavailable'}, "
+          f"classifier {'ready' if classifier is not None else 'unavailable'})", file=sys.stderr)
+    
+    # Workers are single-threaded; a micro-batching thread would not survive the fork
+    if handler is not None and handler.batcher is not None:
+        handler.batcher.close()
+        handler.batcher = None
+    return app
+
+def run_worker(app, listener: socket.socket, threads: int, resume_jobs: bool = False):
+    """Body of a forked worker: serve requests on the inherited socket until told to stop"""
+    import torch
+    from werkzeug.serving import make_server
+    
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+    
+    if resume_jobs:
+        from api.jobs import start_background_jobs
+        start_background_jobs()
+    
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=False, fd=listener.fileno())
+    server.serve_forever()
+
+def serve(workers: int = PREFORK_WORKERS, host: str = PREFORK_HOST, port: int = PREFORK_PORT):
+    """Load models, fork the workers and supervise them"""
+    app = load_models()
+    
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers do not write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+    
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(LISTEN_BACKLOG)
+    listener.set_inheritable(True)
+    
+    threads = threads_per_worker(workers)
+    children: List[int] = []
+    stopping = False
+    
+    def spawn(resume_jobs: bool = False):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, listener, threads, resume_jobs)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    for index in range(workers):
+        spawn(resume_jobs=index == 0)
+    print(f"Serving on {host}:{listener.getsockname()[1]} with {workers} worker(s), "
+          f"{threads} torch thread(s) each; worker pids {children}", file=sys.stderr)
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid in children:
+            children.remove(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting", file=sys.stderr)
+            time.sleep(RESPAWN_DELAY_SECONDS)
+            spawn()
+    
+    listener.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork multi-worker server for the Flask API")
+    parser.add_argument("--workers", type=int, default=PREFORK_WORKERS)
+    parser.add_argument("--host", default=PREFORK_HOST)
+    parser.add_argument("--port", type=int, default=PREFORK_PORT)
+    args = parser.parse_args(argv)
+    serve(args.workers, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
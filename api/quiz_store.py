@@ -0,0 +1,199 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .storage import STORAGE_DIR, connect
+
+# Local stand-in for the quiz catalogue: an indexed SQLite table listed with
+# keyset pagination, so every page costs one index range scan
+QUIZ_DB_PATH = os.environ.get("QUIZ_DB_PATH", os.path.join(STORAGE_DIR, "quizzes.db"))
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Columns a list request may project; questions are only returned by the detail endpoint
+LIST_FIELDS = ["id", "title", "description", "time_limit", "question_count", "created_at",
+               "course_id", "owner_id", "learning_speed", "upload_id"]
+DEFAULT_LIST_FIELDS = ["id", "title", "description", "time_limit", "question_count", "created_at"]
+
+# Generated quizzes allow this many minutes per question
+MINUTES_PER_QUESTION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    id TEXT PRIMARY KEY,
+    course_id TEXT NOT NULL DEFAULT '',
+    owner_id TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL,
+    description TEXT,
+    time_limit INTEGER,
+    question_count INTEGER NOT NULL,
+    learning_speed TEXT,
+    upload_id TEXT,
+    created_at TEXT NOT NULL,
+    questions TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quizzes_created ON quizzes (created_at, id);
+CREATE INDEX IF NOT EXISTS quizzes_course_created ON quizzes (course_id, created_at, id);
+CREATE INDEX IF NOT EXISTS quizzes_owner_created ON quizzes (owner_id, created_at, id);
+CREATE TABLE IF NOT EXISTS catalogue_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalogue_generation (id, generation) VALUES (1, 0);
+"""
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(created_at: str, quiz_id: str) -> str:
+    """Opaque cursor pointing just past a row in (created_at, id) order"""
+    raw = json.dumps([created_at, quiz_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, quiz_id = json.loads(raw)
+        return str(created_at), str(quiz_id)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+def utc_timestamp() -> str:
+    """Current time in the ISO-8601 form used for created_at, which sorts lexicographically"""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+class QuizStore:
+    """SQLite-backed quiz catalogue indexed by course, owner and creation time"""
+    
+    def __init__(self, db_path: str = QUIZ_DB_PATH):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.executescript(SCHEMA)
+        # Per-thread connection for generation(), which runs on every cached read
+        self._local = threading.local()
+    
+    def put_quiz(self, quiz: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert or replace a quiz
+        
+        Args:
+            quiz: Quiz with id, title and questions; other columns are optional
+        
+        Returns:
+            The stored quiz
+        """
+        questions = quiz.get("questions", [])
+        row = {
+            "id": quiz["id"],
+            "course_id": quiz.get("course_id", ""),
+            "owner_id": quiz.get("owner_id", ""),
+            "title": quiz["title"],
+            "description": quiz.get("description", ""),
+            "time_limit": quiz.get("time_limit", len(questions) * MINUTES_PER_QUESTION),
+            "question_count": quiz.get("question_count", len(questions)),
+            "learning_speed": quiz.get("learning_speed"),
+            "upload_id": quiz.get("upload_id"),
+            "created_at": quiz.get("created_at") or utc_timestamp(),
+            "questions": json.dumps(questions)
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with connect(self.db_path) as conn:
+            conn.execute(f"INSERT OR REPLACE INTO quizzes ({columns}) VALUES ({placeholders})", tuple(row.values()))
+            conn.execute("UPDATE catalogue_generation SET generation = generation + 1 WHERE id = 1")
+        return self.get_quiz(quiz["id"])
+    
+    def generation(self) -> int:
+        """
+        Counter bumped by every write, shared by all processes using the database
+        
+        Cached responses built at an older generation are stale, whichever
+        process made the write. Each thread keeps one connection open for
+        this read; outside a transaction every SELECT sees the latest commit.
+        """
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited through fork must not be used by the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn.execute("SELECT generation FROM catalogue_generation WHERE id = 1").fetchone()[0]
+    
+    def get_quiz(self, quiz_id: str) -> Optional[Dict[str, Any]]:
+        """Full quiz including questions, or None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
+        if row is None:
+            return None
+        quiz = dict(row)
+        quiz["questions"] = json.loads(quiz["questions"])
+        return quiz
+    
+    def count(self) -> int:
+        with connect(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM quizzes").fetchone()[0]
+    
+    def list_quizzes(self, course_id: Optional[str] = None, owner_id: Optional[str] = None,
+                     created_after: Optional[str] = None, created_before: Optional[str] = None,
+                     fields: Optional[List[str]] = None, limit: int = DEFAULT_PAGE_SIZE,
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List quizzes newest first, one keyset page at a time
+        
+        Args:
+            course_id: Only quizzes for this course
+            owner_id: Only quizzes owned by this user
+            created_after: Only quizzes created at or after this ISO-8601 timestamp
+            created_before: Only quizzes created before this ISO-8601 timestamp
+            fields: Columns to return (defaults to DEFAULT_LIST_FIELDS)
+            limit: Page size, capped at MAX_PAGE_SIZE
+            cursor: Cursor returned with the previous page
+        
+        Returns:
+            The page of quizzes and the cursor for the next page (None on the last page)
+        """
+        fields = fields or DEFAULT_LIST_FIELDS
+        unknown = [field for field in fields if field not in LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        clauses, params = [], []
+        if course_id is not None:
+            clauses.append("course_id = ?")
+            params.append(course_id)
+        if owner_id is not None:
+            clauses.append("owner_id = ?")
+            params.append(owner_id)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        if cursor:
+            # Seek past the last row of the previous page instead of using OFFSET
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        
+        # The sort columns are always selected so the next cursor can be built
+        selected = list(dict.fromkeys(fields + ["created_at", "id"]))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (f"SELECT {', '.join(selected)} FROM quizzes {where} "
+                 f"ORDER BY created_at DESC, id DESC LIMIT ?")
+        
+        with connect(self.db_path) as conn:
+            rows = conn.execute(query, (*params, limit + 1)).fetchall()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        page = [{field: row[field] for field in fields} for row in rows]
+        return page, next_cursor
+
+# Shared catalogue used by the quiz routes and the job pipeline
+quiz_store = QuizStore()
@@ -2,41 +2,156 @@ from flask import jsonify, request
 import os
 import json
 import requests
+from urllib.parse import urlencode
 from .index import app
+from .jobs import job_payload, job_queue
+from .response_cache import invalidate_quiz, quiz_key, quiz_list_key, response_cache
+from .quiz_store import DEFAULT_PAGE_SIZE, quiz_store, utc_timestamp
+from .storage import blob_store
 
-@app.route('/api/quizzes', methods=['GET'])
-def get_quizzes():
-    try:
-        # In a real implementation, you would fetch quizzes from your database
-        # For now, return mock data that matches your frontend expectations
-        quizzes = [
+def _demo_quiz_list():
+    """Demo quiz summaries seeded into an empty catalogue"""
+    quizzes = [
+        {
+            "id": "1",
+            "title": "Object-Oriented Programming Basics",
+            "description": "Test your knowledge of OOP fundamentals",
+            "time_limit": 15,
+            "question_count": 10,
+            "created_at": "2023-06-15T10:00:00Z"
+        },
+        {
+            "id": "2",
+            "title": "Python Data Structures",
+            "description": "Quiz on Python lists, dictionaries, and more",
+            "time_limit": 20,
+            "question_count": 15,
+            "created_at": "2023-06-10T14:30:00Z"
+        },
+        {
+            "id": "3",
+            "title": "Web Development Fundamentals",
+            "description": "HTML, CSS, and JavaScript basics",
+            "time_limit": 25,
+            "question_count": 20,
+            "created_at": "2023-06-05T09:15:00Z"
+        }
+    ]
+    return quizzes
+
+def _demo_quiz(quiz_id):
+    """Demo quiz detail, including questions"""
+    quiz = {
+        "id": quiz_id,
+        "title": "Object-Oriented Programming Basics" if quiz_id == "1" else "Python Quiz",
+        "description": "Test your knowledge of OOP fundamentals",
+        "time_limit": 15,
+        "question_count": 5,
+        "questions": [
+            {
+                "id": "q1",
+                "text": "What does OOP stand for?",
+                "options": [
+                    "Object-Oriented Programming",
+                    "Outcome-Oriented Protocol",
+                    "Object-Oriented Protocol",
+                    "Outcome-Oriented Programming"
+                ],
+                "correct_option": 0
+            },
             {
-                "id": "1",
-                "title": "Object-Oriented Programming Basics",
-                "description": "Test your knowledge of OOP fundamentals",
-                "time_limit": 15,
-                "question_count": 10,
-                "created_at": "2023-06-15T10:00:00Z"
+                "id": "q2",
+                "text": "Which of the following is a pillar of OOP?",
+                "options": [
+                    "Fragmentation",
+                    "Encapsulation",
+                    "Segregation",
+                    "Compilation"
+                ],
+                "correct_option": 1
             },
             {
-                "id": "2",
-                "title": "Python Data Structures",
-                "description": "Quiz on Python lists, dictionaries, and more",
-                "time_limit": 20,
-                "question_count": 15,
-                "created_at": "2023-06-10T14:30:00Z"
+                "id": "q3",
+                "text": "What is inheritance in OOP?",
+                "options": [
+                    "A way to create multiple instances of a class",
+                    "A mechanism to reuse code from one class in another",
+                    "A method to hide data from external access",
+                    "A technique to compile code faster"
+                ],
+                "correct_option": 1
             },
             {
-                "id": "3",
-                "title": "Web Development Fundamentals",
-                "description": "HTML, CSS, and JavaScript basics",
-                "time_limit": 25,
-                "question_count": 20,
-                "created_at": "2023-06-05T09:15:00Z"
+                "id": "q4",
+                "text": "What is polymorphism?",
+                "options": [
+                    "The ability to create multiple classes",
+                    "The ability to create multiple objects",
+                    "The ability to take on multiple forms",
+                    "The ability to inherit from multiple classes"
+                ],
+                "correct_option": 2
+            },
+            {
+                "id": "q5",
+                "text": "Which of these is NOT an access modifier in most OOP languages?",
+                "options": [
+                    "Public",
+                    "Private",
+                    "Protected",
+                    "Common"
+                ],
+                "correct_option": 3
             }
         ]
-        
-        return jsonify(quizzes)
+    }
+    return quiz
+
+def _seed_demo_quizzes():
+    """Give a fresh catalogue the demo quizzes the frontend expects"""
+    if quiz_store.count() == 0:
+        for summary in _demo_quiz_list():
+            quiz_store.put_quiz(dict(summary, questions=_demo_quiz(summary["id"])["questions"]))
+
+_seed_demo_quizzes()
+
+@app.route('/api/quizzes', methods=['GET'])
+def get_quizzes():
+    try:
+        fields = request.args.get('fields')
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({
+                "status": "error",
+                "message": "limit must be an integer"
+            }), 400
+            
+        def build_page():
+            page, next_cursor = quiz_store.list_quizzes(
+                course_id=request.args.get('courseId'),
+                owner_id=request.args.get('ownerId'),
+                created_after=request.args.get('createdAfter'),
+                created_before=request.args.get('createdBefore'),
+                fields=fields.split(',') if fields else None,
+                limit=limit,
+                cursor=request.args.get('cursor')
+            )
+            headers = {}
+            if next_cursor:
+                next_args = dict(request.args.items(), cursor=next_cursor)
+                headers["X-Next-Cursor"] = next_cursor
+                headers["Link"] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+            return page, headers
+            
+        # Each distinct page is serialized and compressed once; later reads are served from the cached bytes
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return response_cache.get_or_build(quiz_list_key(query), build_page).to_response()
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -46,74 +161,17 @@ def get_quizzes():
 @app.route('/api/quizzes/<quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
     try:
-        # In a real implementation, you would fetch the specific quiz from your database
-        # For now, return mock data
-        quiz = {
-            "id": quiz_id,
-            "title": "Object-Oriented Programming Basics" if quiz_id == "1" else "Python Quiz",
-            "description": "Test your knowledge of OOP fundamentals",
-            "time_limit": 15,
-            "question_count": 5,
-            "questions": [
-                {
-                    "id": "q1",
-                    "text": "What does OOP stand for?",
-                    "options": [
-                        "Object-Oriented Programming",
-                        "Outcome-Oriented Protocol",
-                        "Object-Oriented Protocol",
-                        "Outcome-Oriented Programming"
-                    ],
-                    "correct_option": 0
-                },
-                {
-                    "id": "q2",
-                    "text": "Which of the following is a pillar of OOP?",
-                    "options": [
-                        "Fragmentation",
-                        "Encapsulation",
-                        "Segregation",
-                        "Compilation"
-                    ],
-                    "correct_option": 1
-                },
-                {
-                    "id": "q3",
-                    "text": "What is inheritance in OOP?",
-                    "options": [
-                        "A way to create multiple instances of a class",
-                        "A mechanism to reuse code from one class in another",
-                        "A method to hide data from external access",
-                        "A technique to compile code faster"
-                    ],
-                    "correct_option": 1
-                },
-                {
-                    "id": "q4",
-                    "text": "What is polymorphism?",
-                    "options": [
-                        "The ability to create multiple classes",
-                        "The ability to create multiple objects",
-                        "The ability to take on multiple forms",
-                        "The ability to inherit from multiple classes"
-                    ],
-                    "correct_option": 2
-                },
-                {
-                    "id": "q5",
-                    "text": "Which of these is NOT an access modifier in most OOP languages?",
-                    "options": [
-                        "Public",
-                        "Private",
-                        "Protected",
-                        "Common"
-                    ],
-                    "correct_option": 3
-                }
-            ]
-        }
-        
-        return jsonify(quiz)
+        entry = response_cache.get(quiz_key(quiz_id))
+        if entry is None:
+            quiz = quiz_store.get_quiz(quiz_id)
+            if quiz is None:
+                return jsonify({
+                    "status": "error",
+                    "message": "Quiz not found"
+                }), 404
+            entry = response_cache.get_or_build(quiz_key(quiz_id), lambda: quiz)
+            
+        return entry.to_response()
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -132,16 +190,33 @@ def generate_quiz():
                 "message": "Content ID is required"
             }), 400
             
-        # In a real implementation, you would generate a quiz based on the content
-        # For now, return a mock generated quiz
+        # Content uploaded through this API is processed by the background pipeline;
+        # the client polls the job's status URL instead of waiting on inference
+        upload = blob_store.get_upload(content_id)
+        if upload is not None:
+            job = job_queue.enqueue(upload)
+            if job is None:
+                return jsonify({
+                    "status": "success",
+                    "message": "Content already processed",
+                    "artifacts": blob_store.get_artifacts(upload["sha256"])
+                })
+                
+            return jsonify(dict(job_payload(job), status="accepted", message="Quiz generation queued")), 202
+            
+        # Unknown content: return a mock generated quiz
         generated_quiz = {
             "id": "gen-" + content_id,
             "title": "Generated Quiz for Content " + content_id,
             "description": "Quiz generated from your content",
             "time_limit": 10,
             "question_count": 5,
-            "created_at": "2023-07-01T12:00:00Z"
+            "created_at": utc_timestamp()
         }
+        quiz_store.put_quiz(dict(generated_quiz, questions=_demo_quiz(generated_quiz["id"])["questions"]))
+        
+        # Regenerating replaces the quiz, so drop its cached responses
+        invalidate_quiz(generated_quiz["id"])
         
         return jsonify({
             "status": "success",
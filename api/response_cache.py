@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import Response, request
+from .quiz_store import quiz_store
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Serialized responses for the quiz read endpoints are built once and kept
+# with precompressed variants until the catalogue changes. Each process has
+# its own cache, so validity is checked against the catalogue's shared
+# generation counter on every read: a quiz written by another worker (e.g.
+# by its job pipeline) retires the cached pages of all workers.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 4096))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 256
+
+class CachedResponse:
+    """A serialized JSON body with its compressed variants and strong ETags"""
+    
+    def __init__(self, payload: Any, headers: Optional[Dict[str, str]] = None):
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.headers = dict(headers or {})
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        
+        # Strong validators must differ per content-coding, so each variant gets its own tag
+        self.variants: Dict[str, bytes] = {"identity": self.body}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+        self.etags = {
+            encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+            for encoding in self.variants
+        }
+    
+    def choose_encoding(self) -> str:
+        """Pick the smallest variant the client accepts"""
+        accepted = request.accept_encodings
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted[encoding]:
+                return encoding
+        return "identity"
+    
+    def to_response(self) -> Response:
+        """
+        Build the Flask response for the current request
+        
+        Returns 304 when the client already holds any variant of this body,
+        otherwise the precompressed bytes for the best accepted encoding.
+        """
+        encoding = self.choose_encoding()
+        headers = {
+            **self.headers,
+            "ETag": f'"{self.etags[encoding]}"',
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache"
+        }
+        
+        if any(request.if_none_match.contains(etag) for etag in self.etags.values()):
+            return Response(status=304, headers=headers)
+        
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], status=200, headers=headers, mimetype="application/json")
+
+class ResponseCache:
+    """
+    Thread-safe map of cache key to CachedResponse
+    
+    With a version callable, each entry remembers the version it was built
+    at and is only served while version() still returns the same value.
+    """
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, version: Optional[Callable[[], Any]] = None):
+        self.max_entries = max_entries
+        self.version = version
+        self._entries: Dict[str, Tuple[Any, CachedResponse]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a build that raced one is not stored
+        self._generation = 0
+    
+    def _current_version(self) -> Any:
+        return self.version() if self.version is not None else None
+    
+    def _lookup(self, key: str, version: Any) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None or item[0] != version:
+            return None
+        return item[1]
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        version = self._current_version()
+        with self._lock:
+            return self._lookup(key, version)
+    
+    def get_or_build(self, key: str, build: Callable[[], Any]) -> CachedResponse:
+        """
+        Return the cached response for key, serializing build() on a miss
+        
+        Args:
+            key: Cache key, e.g. "quizzes?<query>" or "quiz:<id>"
+            build: Returns the JSON-serializable payload, or a (payload, headers)
+                tuple when extra response headers should be cached with it
+        
+        Returns:
+            The cached response
+        """
+        # Read before building, so a write during the build leaves the entry already stale
+        version = self._current_version()
+        with self._lock:
+            entry = self._lookup(key, version)
+            generation = self._generation
+        if entry is not None:
+            return entry
+        
+        # Serialize and compress outside the lock; a concurrent miss just builds twice
+        built = build()
+        entry = CachedResponse(*built) if isinstance(built, tuple) else CachedResponse(built)
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (version, entry)
+        return entry
+    
+    def invalidate(self, *keys: str):
+        """Drop cached responses so the next read rebuilds them"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def invalidate_prefix(self, prefix: str):
+        """Drop every cached response whose key starts with prefix"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+# Shared cache used by the quiz routes, valid while the catalogue is unchanged
+response_cache = ResponseCache(version=quiz_store.generation)
+
+def quiz_list_key(query: str = "") -> str:
+    """Key for one page of the quiz list; query is the canonical query string"""
+    return f"quizzes?{query}"
+
+def quiz_key(quiz_id: str) -> str:
+    return f"quiz:{quiz_id}"
+
+def invalidate_quiz(quiz_id: str):
+    """Forget a quiz's cached body and every cached list page after it is (re)generated"""
+    response_cache.invalidate(quiz_key(quiz_id))
+    response_cache.invalidate_prefix(quiz_list_key())
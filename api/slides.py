@@ -1,14 +1,41 @@
 from flask import jsonify, request
-import os
 import json
 import requests
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from . import app
+from .jobs import job_payload, job_queue
+from .storage import blob_store
 
-# Mock storage for uploaded files
-UPLOAD_FOLDER = '/tmp/uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+ALLOWED_EXTENSIONS = ['pdf', 'jpg', 'jpeg', 'png', 'gif']
+
+def upload_response(upload, blob, is_new):
+    """Success payload for a stored upload, including artifacts reused from earlier uploads"""
+    # Reuse anything already generated for this content
+    artifacts = {} if is_new else blob_store.get_artifacts(blob["sha256"])
+    
+    # Queue text extraction and generation unless it has all been done before
+    job = job_queue.enqueue(upload)
+    
+    return {
+        "status": "success",
+        "message": "File uploaded successfully" if is_new else "File already stored; reusing existing content",
+        "uploadId": upload["id"],
+        "contentHash": blob["sha256"],
+        "deduplicated": not is_new,
+        "fileUrl": f"/uploads/{blob['sha256']}",
+        "filePath": blob["path"],
+        "artifacts": artifacts,
+        "job": job_payload(job) if job else None,
+        "metadata": {
+            "title": upload["title"],
+            "description": upload["description"],
+            "courseId": upload["course_id"],
+            "fileName": upload["file_name"],
+            "fileType": blob["content_type"],
+            "fileSize": blob["size"]
+        }
+    }
 
 @app.route('/api/slides/upload', methods=['POST'])
 def upload_slide():
@@ -51,42 +78,24 @@ def upload_slide():
         file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
         
         # Validate file type
-        allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png', 'gif']
-        if file_ext not in allowed_extensions:
+        if file_ext not in ALLOWED_EXTENSIONS:
             return jsonify({
                 "status": "error",
-                "message": f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}"
+                "message": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
             
-        # Generate a unique filename to avoid collisions
-        unique_filename = f"{course_id}_{int(os.path.getmtime('/tmp'))}_{filename}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # Save the file
-        file.save(file_path)
-        
-        # In a real implementation, you would store file metadata in a database
-        # and upload the file to a cloud storage service
+        # Stream the file into content-addressed storage; identical decks are stored once
+        blob, is_new = blob_store.store_stream(file.stream, file_ext, file.content_type)
+        user_id = request.form.get('userId', '')
+        upload = blob_store.add_upload(user_id, course_id, title, description, filename, blob["sha256"])
         
-        # Mock response with file URL (in a real app, this would be a cloud storage URL)
-        file_url = f"/uploads/{unique_filename}"
+        return jsonify(upload_response(upload, blob, is_new))
         
-        # Return success response
+    except RequestEntityTooLarge:
         return jsonify({
-            "status": "success",
-            "message": "File uploaded successfully",
-            "fileUrl": file_url,
-            "filePath": file_path,
-            "metadata": {
-                "title": title,
-                "description": description,
-                "courseId": course_id,
-                "fileName": filename,
-                "fileType": file.content_type,
-                "fileSize": os.path.getsize(file_path)
-            }
-        })
-        
+            "status": "error",
+            "message": "File is too large; use the chunked upload API at /api/uploads"
+        }), 413
     except Exception as e:
         return jsonify({
             "status": "error",
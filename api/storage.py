@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+# Uploaded files are stored once per distinct content under their SHA-256
+STORAGE_DIR = os.environ.get("UPLOAD_STORAGE_DIR", "/tmp/uploads")
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    extension TEXT NOT NULL,
+    content_type TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    file_name TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    created_at REAL NOT NULL,
+    UNIQUE (user_id, course_id, title)
+);
+CREATE INDEX IF NOT EXISTS uploads_sha256 ON uploads (sha256);
+CREATE TABLE IF NOT EXISTS artifacts (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    learning_speed TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (sha256, kind, learning_speed)
+);
+"""
+
+@contextmanager
+def connect(db_path: str) -> Iterator[sqlite3.Connection]:
+    """Open a short-lived SQLite connection that commits on success and always closes"""
+    # One connection per call keeps the stores safe to share across request threads
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+class BlobStore:
+    """
+    Content-addressed file storage with a SQLite metadata index
+    
+    Each distinct file is kept once under blobs/<sha[:2]>/<sha>.<ext>; the
+    uploads table maps a user's (course, title) entry to a blob, and the
+    artifacts table holds AI output already generated for a blob so that a
+    re-upload of known content can reuse it.
+    """
+    
+    def __init__(self, root: str = STORAGE_DIR, db_path: Optional[str] = None):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.staging_dir = os.path.join(root, "staging")
+        self.db_path = db_path or os.path.join(root, "metadata.db")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connect(self):
+        return connect(self.db_path)
+    
+    def blob_path(self, sha256: str, extension: str) -> str:
+        """Path of the stored file for a content hash"""
+        name = f"{sha256}.{extension}" if extension else sha256
+        return os.path.join(self.blob_dir, sha256[:2], name)
+    
+    def get_blob(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a stored blob, or None if the hash is unknown"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            return None
+        blob = dict(row)
+        blob["path"] = self.blob_path(blob["sha256"], blob["extension"])
+        return blob
+    
+    def store_stream(self, stream: BinaryIO, extension: str, content_type: Optional[str] = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[Dict[str, Any], bool]:
+        """
+        Stream a file to disk while hashing it, then store it under its hash
+        
+        Args:
+            stream: Readable binary stream
+            extension: File extension used for the stored blob
+            content_type: MIME type recorded with the blob
+            chunk_size: Bytes read per iteration
+        
+        Returns:
+            Blob metadata and whether the content was new
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, staging_path = tempfile.mkstemp(dir=self.staging_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            return self.adopt_file(staging_path, digest.hexdigest(), size, extension, content_type)
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+    
+    def adopt_file(self, staging_path: str, sha256: str, size: int, extension: str,
+                   content_type: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Move an already-hashed staging file into the store
+        
+        The staging file is consumed when the content is new and left in
+        place (for the caller to remove) when it is a duplicate.
+        
+        Returns:
+            Blob metadata and whether the content was new
+        """
+        existing = self.get_blob(sha256)
+        if existing is not None and os.path.exists(existing["path"]):
+            return existing, False
+        
+        path = self.blob_path(sha256, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staging_path, path)
+        
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs (sha256, size, extension, content_type, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, size, extension, content_type, time.time())
+            )
+        return self.get_blob(sha256), True
+    
+    def add_upload(self, user_id: str, course_id: str, title: str, description: str,
+                   file_name: str, sha256: str) -> Dict[str, Any]:
+        """
+        Record a user's upload entry pointing at a stored blob
+        
+        Re-uploading under the same user, course and title replaces the
+        entry's file rather than creating a second entry.
+        
+        Returns:
+            The upload record
+        """
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO uploads (id, user_id, course_id, title, description, file_name, sha256, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, course_id, title) DO UPDATE SET
+                    description = excluded.description,
+                    file_name = excluded.file_name,
+                    sha256 = excluded.sha256
+                """,
+                (uuid.uuid4().hex, user_id, course_id, title, description, file_name, sha256, time.time())
+            )
+            row = conn.execute(
+                "SELECT * FROM uploads WHERE user_id = ? AND course_id = ? AND title = ?",
+                (user_id, course_id, title)
+            ).fetchone()
+        return dict(row)
+    
+    def get_upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Upload record by id, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+        return dict(row) if row is not None else None
+    
+    def put_artifact(self, sha256: str, kind: str, payload: Any, learning_speed: str = "") -> None:
+        """Store AI output (summary, quiz, flashcards, text) generated for a blob"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (sha256, kind, learning_speed, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, kind, learning_speed, json.dumps(payload), time.time())
+            )
+    
+    def get_artifacts(self, sha256: str) -> Dict[str, Any]:
+        """
+        All artifacts generated for a blob
+        
+        Returns:
+            Mapping of kind to payload, or to a {learning_speed: payload}
+            mapping for artifacts generated per learning speed
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT kind, learning_speed, payload FROM artifacts WHERE sha256 = ?", (sha256,)
+            ).fetchall()
+        artifacts: Dict[str, Any] = {}
+        for row in rows:
+            payload = json.loads(row["payload"])
+            if row["learning_speed"]:
+                artifacts.setdefault(row["kind"], {})[row["learning_speed"]] = payload
+            else:
+                artifacts[row["kind"]] = payload
+        return artifacts
+
+# Shared store used by the API routes
+blob_store = BlobStore()
@@ -0,0 +1,353 @@
+from flask import jsonify, request
+import hashlib
+import os
+import threading
+import time
+import uuid
+from werkzeug.utils import secure_filename
+from . import app
+from .slides import ALLOWED_EXTENSIONS, upload_response
+from .storage import blob_store, connect
+
+# Resumable chunked uploads: init, PUT numbered chunks, then complete.
+# Chunks are written straight into a staging file at their offset, so memory
+# use per request is bounded by STREAM_READ_SIZE regardless of deck size.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 500 * 1024 * 1024))
+DEFAULT_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024))
+MAX_CHUNK_BYTES = int(os.environ.get("UPLOAD_MAX_CHUNK_BYTES", 32 * 1024 * 1024))
+STREAM_READ_SIZE = 64 * 1024
+SESSION_DB_PATH = os.path.join(blob_store.root, "upload_sessions.db")
+
+# Open sessions not completed within this long are expired with their staging
+# files; the sweep runs at most once per interval, from init_upload. A session
+# being completed is never expired.
+UPLOAD_SESSION_TTL_SECONDS = float(os.environ.get("UPLOAD_SESSION_TTL_SECONDS", 24 * 3600))
+UPLOAD_SWEEP_INTERVAL_SECONDS = float(os.environ.get("UPLOAD_SWEEP_INTERVAL_SECONDS", 600))
+
+# Reject any request body larger than the upload limit before Werkzeug reads it
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    file_name TEXT NOT NULL,
+    content_type TEXT,
+    size INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL,
+    expected_sha256 TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS upload_chunks (
+    session_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (session_id, chunk_index)
+);
+CREATE INDEX IF NOT EXISTS upload_sessions_status_created ON upload_sessions (status, created_at);
+"""
+
+with connect(SESSION_DB_PATH) as _conn:
+    _conn.executescript(SCHEMA)
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+def _error(message, status_code):
+    return jsonify({
+        "status": "error",
+        "message": message
+    }), status_code
+
+def _staging_path(session_id):
+    return os.path.join(blob_store.staging_dir, f"chunked_{session_id}")
+
+def _get_session(session_id):
+    with connect(SESSION_DB_PATH) as conn:
+        row = conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+def _received_chunks(session_id):
+    with connect(SESSION_DB_PATH) as conn:
+        rows = conn.execute(
+            "SELECT chunk_index FROM upload_chunks WHERE session_id = ? ORDER BY chunk_index", (session_id,)
+        ).fetchall()
+    return [row["chunk_index"] for row in rows]
+
+def _chunk_length(session, index):
+    if index == session["total_chunks"] - 1:
+        return session["size"] - index * session["chunk_size"]
+    return session["chunk_size"]
+
+def _set_session_status(session_id, status, expected):
+    """Move a session from one state to another; False if it was not in the expected state"""
+    with connect(SESSION_DB_PATH) as conn:
+        cursor = conn.execute(
+            "UPDATE upload_sessions SET status = ? WHERE id = ? AND status = ?", (status, session_id, expected)
+        )
+    return cursor.rowcount == 1
+
+def _remove_session(session_id):
+    """Delete a claimed session with its chunks and staging file"""
+    staging_path = _staging_path(session_id)
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    with connect(SESSION_DB_PATH) as conn:
+        conn.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM upload_sessions WHERE id = ?", (session_id,))
+
+def expire_sessions(max_age=UPLOAD_SESSION_TTL_SECONDS):
+    """
+    Delete sessions left open for longer than max_age, with their staging files
+    
+    Sessions being completed are left alone. An abort that was interrupted
+    after claiming its session is finished here.
+    
+    Returns:
+        Number of sessions removed
+    """
+    cutoff = time.time() - max_age
+    with connect(SESSION_DB_PATH) as conn:
+        rows = conn.execute(
+            "SELECT id, status FROM upload_sessions WHERE status IN ('open', 'aborting') AND created_at < ?", (cutoff,)
+        ).fetchall()
+    
+    expired = 0
+    for row in rows:
+        # Claim the session first; a complete that claimed it in the meantime keeps it
+        if row["status"] == "open" and not _set_session_status(row["id"], "aborting", "open"):
+            continue
+        _remove_session(row["id"])
+        expired += 1
+    if expired:
+        print(f"Expired {expired} abandoned upload session(s)")
+    return expired
+
+def _maybe_expire_sessions():
+    """Run expire_sessions() unless it already ran within UPLOAD_SWEEP_INTERVAL_SECONDS"""
+    global _last_sweep
+    with _sweep_lock:
+        now = time.monotonic()
+        if _last_sweep and now - _last_sweep < UPLOAD_SWEEP_INTERVAL_SECONDS:
+            return
+        _last_sweep = now
+    try:
+        expire_sessions()
+    except Exception as e:
+        print(f"Error expiring upload sessions: {e}")
+
+def _session_status(session):
+    received = _received_chunks(session["id"])
+    received_set = set(received)
+    return {
+        "status": "success",
+        "uploadId": session["id"],
+        "state": session["status"],
+        "size": session["size"],
+        "chunkSize": session["chunk_size"],
+        "totalChunks": session["total_chunks"],
+        "receivedChunks": received,
+        "missingChunks": [i for i in range(session["total_chunks"]) if i not in received_set]
+    }
+
+@app.route('/api/uploads', methods=['POST'])
+def init_upload():
+    try:
+        data = request.get_json() or {}
+        title = data.get('title', '')
+        course_id = data.get('courseId', '')
+        filename = secure_filename(data.get('fileName', ''))
+        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        
+        if not title:
+            return _error("Title is required", 400)
+        if not course_id:
+            return _error("Course ID is required", 400)
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return _error(f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}", 400)
+        
+        try:
+            size = int(data.get('size'))
+            chunk_size = int(data.get('chunkSize') or DEFAULT_CHUNK_BYTES)
+        except (TypeError, ValueError):
+            return _error("size and chunkSize must be integers", 400)
+        
+        # Enforce the limit up front, before the client sends any file bytes
+        if size <= 0:
+            return _error("size must be positive", 400)
+        if size > MAX_UPLOAD_BYTES:
+            return _error(f"File exceeds the maximum upload size of {MAX_UPLOAD_BYTES} bytes", 413)
+        if not 0 < chunk_size <= MAX_CHUNK_BYTES:
+            return _error(f"chunkSize must be between 1 and {MAX_CHUNK_BYTES} bytes", 400)
+        
+        # Each session reserves a staging file, so clear out abandoned ones first
+        _maybe_expire_sessions()
+        
+        session_id = uuid.uuid4().hex
+        total_chunks = (size + chunk_size - 1) // chunk_size
+        
+        # Sparse staging file that chunks are written into at their offsets
+        with open(_staging_path(session_id), "wb") as f:
+            f.truncate(size)
+        
+        with connect(SESSION_DB_PATH) as conn:
+            conn.execute(
+                """
+                INSERT INTO upload_sessions (id, user_id, course_id, title, description, file_name, content_type,
+                                             size, chunk_size, total_chunks, expected_sha256, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'open', ?)
+                """,
+                (session_id, data.get('userId', ''), course_id, title, data.get('description', ''), filename,
+                 data.get('contentType'), size, chunk_size, total_chunks, data.get('sha256'), time.time())
+            )
+        
+        return jsonify(_session_status(_get_session(session_id))), 201
+    except Exception as e:
+        return _error(str(e), 500)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    try:
+        session = _get_session(upload_id)
+        if session is None:
+            return _error("Upload not found", 404)
+        return jsonify(_session_status(session))
+    except Exception as e:
+        return _error(str(e), 500)
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_chunk(upload_id, index):
+    try:
+        session = _get_session(upload_id)
+        if session is None:
+            return _error("Upload not found", 404)
+        if session["status"] != "open":
+            return _error("Upload is already complete", 409)
+        if not 0 <= index < session["total_chunks"]:
+            return _error(f"Chunk index must be between 0 and {session['total_chunks'] - 1}", 400)
+        
+        expected_sha256 = request.headers.get('X-Chunk-Sha256', '').lower()
+        if not expected_sha256:
+            return _error("X-Chunk-Sha256 header is required", 400)
+        
+        # Check the declared length before reading anything from the body
+        expected_length = _chunk_length(session, index)
+        if request.content_length != expected_length:
+            return _error(f"Chunk {index} must be exactly {expected_length} bytes", 400)
+        
+        digest = hashlib.sha256()
+        written = 0
+        with open(_staging_path(upload_id), "r+b") as f:
+            f.seek(index * session["chunk_size"])
+            while written < expected_length:
+                piece = request.stream.read(min(STREAM_READ_SIZE, expected_length - written))
+                if not piece:
+                    break
+                digest.update(piece)
+                f.write(piece)
+                written += len(piece)
+        
+        if written != expected_length:
+            return _error(f"Chunk {index} was truncated; received {written} of {expected_length} bytes", 400)
+        if digest.hexdigest() != expected_sha256:
+            return _error(f"Checksum mismatch for chunk {index}", 422)
+        
+        with connect(SESSION_DB_PATH) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_chunks (session_id, chunk_index, size, sha256) VALUES (?, ?, ?, ?)",
+                (upload_id, index, written, expected_sha256)
+            )
+        
+        return jsonify({
+            "status": "success",
+            "uploadId": upload_id,
+            "chunk": index
+        })
+    except Exception as e:
+        return _error(str(e), 500)
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    try:
+        session = _get_session(upload_id)
+        if session is None:
+            return _error("Upload not found", 404)
+        
+        # Claim the session so a concurrent complete cannot adopt the file a second time
+        if not _set_session_status(upload_id, "completing", "open"):
+            return _error("Upload is already complete", 409)
+        
+        try:
+            return _complete_claimed(upload_id, _get_session(upload_id))
+        except Exception:
+            # Let the client retry, unless the staging file was already moved into the store
+            if os.path.exists(_staging_path(upload_id)):
+                _set_session_status(upload_id, "open", "completing")
+            raise
+    except Exception as e:
+        return _error(str(e), 500)
+
+def _complete_claimed(upload_id, session):
+    """Assemble and store a claimed session; failures that the client can fix reopen it"""
+    status = _session_status(session)
+    if status["missingChunks"]:
+        _set_session_status(upload_id, "open", "completing")
+        response = dict(status, status="error", state="open", message="Upload has missing chunks")
+        return jsonify(response), 409
+    
+    # Hash the assembled file from disk in bounded reads
+    staging_path = _staging_path(upload_id)
+    digest = hashlib.sha256()
+    with open(staging_path, "rb") as f:
+        for piece in iter(lambda: f.read(STREAM_READ_SIZE), b""):
+            digest.update(piece)
+    sha256 = digest.hexdigest()
+    
+    if session["expected_sha256"] and session["expected_sha256"].lower() != sha256:
+        _set_session_status(upload_id, "open", "completing")
+        return _error("Checksum mismatch for the assembled file", 422)
+    
+    file_ext = session["file_name"].rsplit('.', 1)[1].lower()
+    blob, is_new = blob_store.adopt_file(staging_path, sha256, session["size"], file_ext, session["content_type"])
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    
+    upload = blob_store.add_upload(session["user_id"], session["course_id"], session["title"],
+                                   session["description"], session["file_name"], sha256)
+    
+    with connect(SESSION_DB_PATH) as conn:
+        conn.execute("UPDATE upload_sessions SET status = 'complete' WHERE id = ?", (upload_id,))
+        conn.execute("DELETE FROM upload_chunks WHERE session_id = ?", (upload_id,))
+    
+    return jsonify(upload_response(upload, blob, is_new))
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    try:
+        session = _get_session(upload_id)
+        if session is None:
+            return _error("Upload not found", 404)
+        
+        # Claim the session the same way complete does, so the two cannot both act on it
+        if not _set_session_status(upload_id, "aborting", "open"):
+            session = _get_session(upload_id)
+            if session is None:
+                return _error("Upload not found", 404)
+            if session["status"] == "complete":
+                return _error("Upload is already complete", 409)
+            return _error(f"Upload is already {session['status']}", 409)
+        
+        _remove_session(upload_id)
+        
+        return jsonify({
+            "status": "success",
+            "message": "Upload aborted"
+        })
+    except Exception as e:
+        return _error(str(e), 500)
@@ -2,8 +2,9 @@ import { NextRequest, NextResponse } from "next/server";
 import { createServerSupabaseClient } from "@/lib/supabase/server";
 
 // Python process module for running model bridge
-import { spawn } from "child_process";
+import { spawn, ChildProcessWithoutNullStreams } from "child_process";
 import { randomUUID } from "crypto";
+import { createInterface } from "readline";
 
 // This simulates a server-side storage for the generated quizzes
 // In a real application, this would be stored in a database
@@ -28,6 +29,114 @@ interface GeneratedQuiz {
   created_at?: string;
 }
 
+// A single long-lived Python bridge process is shared by every request so the
+// models are loaded once instead of on each call. Requests and responses are
+// newline-delimited JSON matched up by request_id.
+type PendingBridgeRequest = {
+  action: string;
+  params: any;
+  resolve: (value: any) => void;
+  reject: (reason: any) => void;
+  timer?: ReturnType<typeof setTimeout>;
+};
+
+// How long a request waits for the bridge to answer, including a cold model load
+const BRIDGE_REQUEST_TIMEOUT_MS = Number(
+  process.env.BRIDGE_REQUEST_TIMEOUT_MS ?? 180000
+);
+
+let bridgeProcess: ChildProcessWithoutNullStreams | null = null;
+const pendingBridgeRequests = new Map<string, PendingBridgeRequest>();
+
+// Resolve a request that could not be answered by the bridge, falling back to
+// mock data for the actions that have a local equivalent.
+function failBridgeRequest(pending: PendingBridgeRequest, reason: string) {
+  clearTimeout(pending.timer);
+  if (pending.action === "generate_quiz") {
+    const { content, learning_speed } = pending.params;
+    pending.resolve(generateMockQuiz(content, learning_speed));
+  } else if (pending.action === "classify_user") {
+    const { responses } = pending.params;
+    pending.resolve({ learning_speed: classifyUserMock(responses) });
+  } else {
+    pending.reject(new Error(reason));
+  }
+}
+
+function getBridgeProcess(): ChildProcessWithoutNullStreams {
+  if (bridgeProcess) {
+    return bridgeProcess;
+  }
+
+  const child = spawn("python", ["-m", "models.bridge_server", "--persistent"]);
+  let stderr = "";
+
+  createInterface({ input: child.stdout }).on("line", (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    let parsedResult: any;
+    try {
+      parsedResult = JSON.parse(line);
+    } catch (e) {
+      console.error(`Failed to parse Python response: ${e}`);
+      return;
+    }
+    const pending = pendingBridgeRequests.get(parsedResult.request_id);
+    if (!pending) {
+      return;
+    }
+    // Streaming actions send partial frames before the final response; only
+    // the final response is used here
+    if (parsedResult.partial) {
+      return;
+    }
+    pendingBridgeRequests.delete(parsedResult.request_id);
+    clearTimeout(pending.timer);
+    pending.resolve(parsedResult);
+  });
+
+  child.stderr.on("data", (data) => {
+    // Keep only the tail of the log for error reporting
+    stderr = (stderr + data.toString()).slice(-4000);
+  });
+
+  // Fail everything still in flight when the process goes away; the next call
+  // starts a fresh bridge.
+  const failPending = (reason: string) => {
+    if (bridgeProcess === child) {
+      bridgeProcess = null;
+    }
+    const pending = Array.from(pendingBridgeRequests.values());
+    pendingBridgeRequests.clear();
+    pending.forEach((request) => failBridgeRequest(request, reason));
+  };
+
+  child.on("close", (code) => {
+    console.error(`Python bridge exited with code ${code}`);
+    if (stderr) {
+      console.error(`Error: ${stderr}`);
+    }
+    failPending(`Python process failed with code ${code}: ${stderr}`);
+  });
+
+  child.on("error", (err) => {
+    console.error(`Failed to start Python bridge: ${err}`);
+    failPending(`Failed to start Python bridge: ${err}`);
+  });
+
+  // A write to a bridge that has died fails asynchronously (e.g. EPIPE); stop
+  // using this process and let the next call start a fresh one
+  child.stdin.on("error", (err) => {
+    console.error(`Failed to write to Python bridge: ${err}`);
+    failPending(`Failed to write to Python bridge: ${err}`);
+    child.kill();
+  });
+
+  bridgeProcess = child;
+  return child;
+}
+
 // Helper function to call Python model bridge
 async function callModelBridge(action: string, params: any): Promise<any> {
   return new Promise((resolve, reject) => {
@@ -38,48 +147,23 @@ async function callModelBridge(action: string, params: any): Promise<any> {
       request_id: requestId,
     });
 
-    const pythonProcess = spawn("python", ["-m", "models.bridge_server"]);
-    let result = "";
-    let error = "";
-
-    // Send data to the Python process
-    pythonProcess.stdin.write(requestData);
-    pythonProcess.stdin.end();
-
-    // Collect output
-    pythonProcess.stdout.on("data", (data) => {
-      result += data.toString();
-    });
-
-    pythonProcess.stderr.on("data", (data) => {
-      error += data.toString();
-    });
-
-    pythonProcess.on("close", (code) => {
-      if (code !== 0) {
-        console.error(`Python process exited with code ${code}`);
-        console.error(`Error: ${error}`);
-        // Fallback to mock data
-        if (action === "generate_quiz") {
-          const { content, learning_speed } = params;
-          resolve(generateMockQuiz(content, learning_speed));
-        } else if (action === "classify_user") {
-          const { responses } = params;
-          resolve({ learning_speed: classifyUserMock(responses) });
-        } else {
-          reject(
-            new Error(`Python process failed with code ${code}: ${error}`)
-          );
-        }
-      } else {
-        try {
-          const parsedResult = JSON.parse(result);
-          resolve(parsedResult);
-        } catch (e) {
-          reject(new Error(`Failed to parse Python response: ${e}`));
-        }
+    const pending: PendingBridgeRequest = { action, params, resolve, reject };
+    pendingBridgeRequests.set(requestId, pending);
+    pending.timer = setTimeout(() => {
+      if (pendingBridgeRequests.delete(requestId)) {
+        failBridgeRequest(
+          pending,
+          `Python bridge did not answer within ${BRIDGE_REQUEST_TIMEOUT_MS} ms`
+        );
       }
-    });
+    }, BRIDGE_REQUEST_TIMEOUT_MS);
+
+    try {
+      getBridgeProcess().stdin.write(requestData + "\n");
+    } catch (e) {
+      pendingBridgeRequests.delete(requestId);
+      failBridgeRequest(pending, `Failed to write to Python bridge: ${e}`);
+    }
   });
 }
 
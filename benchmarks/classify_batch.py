@@ -0,0 +1,67 @@
+"""
+Compare per-row UserClassifier.classify() against classify_batch()
+
+Trains a classifier on synthetic placement-test responses in a temporary
+directory (the repo's model files are left untouched), then times
+classifying a cohort one user at a time and in a single batch.
+
+Usage: python -m benchmarks.classify_batch [cohort_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.xgboost.xgboost_classifier import UserClassifier, SPEED_LABELS
+
+QUESTION_COUNT = 5
+
+def synthetic_responses(rng: np.random.Generator, count: int):
+    """Generate labelled responses biased toward their class, like the classifier's own example data"""
+    data = []
+    for _ in range(count):
+        classification = SPEED_LABELS[rng.integers(0, len(SPEED_LABELS))]
+        responses = {}
+        for question_id in range(1, QUESTION_COUNT + 1):
+            if rng.random() < 0.7:
+                responses[question_id] = classification
+            else:
+                responses[question_id] = SPEED_LABELS[rng.integers(0, len(SPEED_LABELS))]
+        data.append({"responses": responses, "classification": classification})
+    return data
+
+def main(cohort_size: int = 5000):
+    rng = np.random.default_rng(42)
+    
+    # train() saves to relative model paths, so run it inside a scratch directory
+    workdir = tempfile.mkdtemp(prefix="classify-bench-")
+    os.makedirs(os.path.join(workdir, "models", "xgboost"))
+    os.chdir(workdir)
+    
+    classifier = UserClassifier(load_model=False)
+    classifier.train(synthetic_responses(rng, 600))
+    
+    cohort = [item["responses"] for item in synthetic_responses(rng, cohort_size)]
+    
+    start = time.perf_counter()
+    per_row = [classifier.classify(responses) for responses in cohort]
+    per_row_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batched = classifier.classify_batch(cohort)
+    batch_seconds = time.perf_counter() - start
+    
+    agreement = sum(a == b for a, b in zip(per_row, batched)) / cohort_size
+    
+    print(f"Cohort size:   {cohort_size}")
+    print(f"Per-row:       {per_row_seconds:.3f}s ({cohort_size / per_row_seconds:,.0f} users/s)")
+    print(f"Batch:         {batch_seconds:.3f}s ({cohort_size / batch_seconds:,.0f} users/s)")
+    print(f"Speedup:       {per_row_seconds / batch_seconds:.1f}x")
+    print(f"Agreement:     {agreement:.2%}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
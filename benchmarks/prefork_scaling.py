@@ -0,0 +1,121 @@
+"""
+Measure per-worker memory and throughput of the pre-fork server from 1 to N workers
+
+For each worker count this starts `python -m api.prefork` on a free port and
+waits for /api/health. It reads RSS, PSS and USS for the master and every
+worker from /proc. It then sends generate_summary requests to /api/bridge
+from 2 x workers client threads for a fixed duration.
+
+Result caching is disabled so every request runs generate(). Set
+BART_MODEL_BASE to choose the checkpoint; a tiny local one keeps the run
+offline.
+
+Usage: python -m benchmarks.prefork_scaling [max_workers] [seconds]
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.prefork import process_memory
+
+CONTENT = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "It takes place in the chloroplasts of plant cells, where chlorophyll absorbs light. "
+    "The light-dependent reactions produce ATP and NADPH, which power the Calvin cycle. "
+) * 4
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_health(port: int, timeout: float = 600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("Server did not become healthy")
+
+def worker_pids(master_pid: int):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+def bridge_call(port: int):
+    body = json.dumps({
+        "action": "generate_summary",
+        "params": {"content": CONTENT, "learning_speed": "moderate"},
+        "request_id": uuid.uuid4().hex
+    }).encode("utf-8")
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/api/bridge", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())["success"]
+
+def measure_throughput(port: int, clients: int, seconds: float) -> float:
+    completed = [0] * clients
+    deadline = time.monotonic() + seconds
+    
+    def client(index):
+        while time.monotonic() < deadline:
+            if bridge_call(port):
+                completed[index] += 1
+    
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(completed) / (time.monotonic() - start)
+
+def run(workers: int, seconds: float):
+    port = free_port()
+    env = dict(os.environ, RESULT_CACHE_MAX_ENTRIES="0", RESULT_CACHE_DIR="")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "api.prefork", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_health(port)
+        # One request per worker first, so the measured memory includes inference buffers
+        for _ in range(workers):
+            bridge_call(port)
+        master = process_memory(server.pid)
+        children = [process_memory(pid) for pid in worker_pids(server.pid)]
+        rps = measure_throughput(port, 2 * workers, seconds)
+    finally:
+        server.terminate()
+        server.wait()
+    return master, children, rps
+
+def main(max_workers: int = os.cpu_count() or 1, seconds: float = 20):
+    print(f"Cores: {os.cpu_count()}  model: {os.environ.get('BART_MODEL_BASE', 'facebook/bart-large-cnn')}")
+    print(f"{'workers':>7} {'master RSS MB':>13} {'worker RSS MB':>13} {'worker PSS MB':>13} "
+          f"{'worker USS MB':>13} {'total PSS MB':>12} {'req/s':>8} {'scaling':>8}")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        master, children, rps = run(workers, seconds)
+        baseline = baseline or rps
+        rss = sum(c["rss"] for c in children) / len(children) / 1024
+        pss = sum(c["pss"] for c in children) / len(children) / 1024
+        uss = sum(c["uss"] for c in children) / len(children) / 1024
+        total_pss = (master["pss"] + sum(c["pss"] for c in children)) / 1024
+        print(f"{workers:>7} {master['rss'] / 1024:>13.0f} {rss:>13.0f} {pss:>13.0f} "
+              f"{uss:>13.0f} {total_pss:>12.0f} {rps:>8.2f} {rps / baseline:>7.2f}x")
+        workers *= 2
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,63 @@
+"""
+Measure requests per second for the quiz read endpoints before and after
+the precomputed response cache
+
+"Before" is the original behaviour, loading the payload and calling
+jsonify() on every hit, served from a benchmark-only route. "After" hits the
+real /api/quizzes/<id> route with the cache warm, for an identity client, a
+gzip client, a brotli client and a revalidating client that gets 304s.
+Requests go through Flask's test client in-process, so the numbers measure
+application overhead without network or WSGI server costs.
+
+Usage: python -m benchmarks.quiz_responses [requests]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+from api.index import app
+from api.quiz_store import quiz_store
+from api.response_cache import response_cache
+
+QUIZ_ID = "1"
+
+@app.route('/bench/jsonify/quizzes/<quiz_id>', methods=['GET'])
+def _jsonify_quiz(quiz_id):
+    return jsonify(quiz_store.get_quiz(quiz_id))
+
+def requests_per_second(client, path: str, count: int, headers=None) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path, headers=headers or {})
+    return count / (time.perf_counter() - start)
+
+def main(count: int = 5000):
+    client = app.test_client()
+    response_cache.clear()
+    warm = client.get(f"/api/quizzes/{QUIZ_ID}")
+    etag = warm.headers["ETag"]
+    
+    cases = [
+        ("before: jsonify per request", f"/bench/jsonify/quizzes/{QUIZ_ID}", {}),
+        ("after:  cached, identity", f"/api/quizzes/{QUIZ_ID}", {}),
+        ("after:  cached, gzip", f"/api/quizzes/{QUIZ_ID}", {"Accept-Encoding": "gzip"}),
+        ("after:  cached, br", f"/api/quizzes/{QUIZ_ID}", {"Accept-Encoding": "br, gzip"}),
+        ("after:  If-None-Match -> 304", f"/api/quizzes/{QUIZ_ID}", {"If-None-Match": etag})
+    ]
+    
+    baseline = None
+    for label, path, headers in cases:
+        # Short warm-up so the first case does not pay import and routing setup costs
+        requests_per_second(client, path, min(200, count), headers)
+        response = client.get(path, headers=headers)
+        rps = requests_per_second(client, path, count, headers)
+        baseline = baseline or rps
+        print(f"{label:32s} {rps:10,.0f} req/s  {rps / baseline:5.2f}x  "
+              f"status {response.status_code}, {len(response.data):5d} bytes on the wire")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
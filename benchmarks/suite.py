@@ -0,0 +1,416 @@
+"""
+Offline benchmark suite for the model layer, checked against a stored baseline
+
+Everything runs locally without network access. Tiny randomly initialised
+BART checkpoints (see BART_CONFIGS) are written to a scratch directory with
+a byte-level tokenizer that needs no download, and a synthetic XGBoost
+classifier is trained there as well. The suite then times:
+
+- BartModelHandler.generate_summary / generate_quiz / generate_flashcards
+  for each BART config and input size ("long" goes through chunking)
+- UserClassifier.classify and classify_batch, and the compiled NumPy
+  predictor used for serving, over several cohort sizes
+- a bridge round trip: one NDJSON request written to a persistent
+  `python -m models.bridge_server` process and its response read back
+- json.dumps of response envelopes of several sizes
+
+Random weights make the generated text meaningless, but the work done per
+call (input length, beam search, output length) is fixed by the seed, so
+timings are comparable between runs. Result caches are disabled.
+
+Results are written as JSON. A short fixed calibration workload is timed
+between every two samples, and each sample is also expressed relative to
+the calibration times on either side of it. On a shared host the speed of
+the whole machine can swing by half within seconds, and this relative time
+cancels most of that out. With a baseline, any benchmark whose best
+relative time is more than --tolerance above the baseline's (and whose best
+time is slower by more than NOISE_FLOOR_MS) is reported as a regression and
+the exit status is 1. Baselines are still best compared on the host that
+recorded them; the suite warns when the recorded environment differs.
+
+Usage: python -m benchmarks.suite [--repeat N] [--only bart,classify,bridge,json]
+                                  [--output PATH] [--baseline PATH] [--tolerance F]
+                                  [--update-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+# Must be set before torch, transformers or the model modules are imported
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ["RESULT_CACHE_MAX_ENTRIES"] = "0"
+os.environ["RESULT_CACHE_DIR"] = ""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results.json")
+
+# A benchmark regresses when its best time relative to the calibration
+# workload is this much above the baseline's...
+REGRESSION_TOLERANCE = 0.25
+# ...and also slower by at least this many milliseconds, so timer jitter on
+# sub-millisecond benchmarks is not reported
+NOISE_FLOOR_MS = 0.005
+
+SEED = 0
+
+# Randomly initialised BART shapes. max_position_embeddings covers the
+# 1024-token encoder limit plus BART's position offset.
+BART_CONFIGS = {
+    "tiny": {"d_model": 16, "encoder_layers": 1, "decoder_layers": 1, "encoder_attention_heads": 2,
+             "decoder_attention_heads": 2, "encoder_ffn_dim": 32, "decoder_ffn_dim": 32},
+    "small": {"d_model": 64, "encoder_layers": 2, "decoder_layers": 2, "encoder_attention_heads": 4,
+              "decoder_attention_heads": 4, "encoder_ffn_dim": 128, "decoder_ffn_dim": 128}
+}
+
+# Input sizes in words. The byte-level tokenizer has no merges, so a word is
+# about six tokens: "long" exceeds the encoder limit and is chunked.
+INPUT_SIZES = {"short": 30, "medium": 120, "long": 400}
+
+COHORT_SIZES = [1, 100, 1000]
+
+QUIZ_QUESTION_COUNTS = [10, 100, 1000]
+
+WORDS = ("cell membrane energy protein enzyme nucleus molecule reaction carbon oxygen light "
+         "glucose structure function system process organism tissue signal gene").split()
+
+def make_content(word_count: int, seed: int = SEED) -> str:
+    """Deterministic pseudo-text of word_count words in sentences of ten"""
+    rng = np.random.default_rng(seed + word_count)
+    words = [WORDS[i] for i in rng.integers(0, len(WORDS), word_count)]
+    sentences = [" ".join(words[i:i + 10]).capitalize() + "." for i in range(0, word_count, 10)]
+    return " ".join(sentences)
+
+def write_byte_level_tokenizer(path: str):
+    """Write a BartTokenizer with one token per byte and the usual special tokens"""
+    from transformers import BartTokenizer
+    from transformers.models.bart.tokenization_bart import bytes_to_unicode
+    
+    specials = ["<s>", "<pad>", "</s>", "<unk>"]
+    vocab = {token: i for i, token in enumerate(specials)}
+    for char in bytes_to_unicode().values():
+        vocab[char] = len(vocab)
+    vocab["<mask>"] = len(vocab)
+    
+    with open(os.path.join(path, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(path, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+    BartTokenizer(os.path.join(path, "vocab.json"), os.path.join(path, "merges.txt")).save_pretrained(path)
+    return len(vocab)
+
+def build_tiny_bart(path: str, name: str) -> str:
+    """Save a randomly initialised BART checkpoint for BART_CONFIGS[name] to path"""
+    import torch
+    from transformers import BartConfig, BartForConditionalGeneration
+    
+    os.makedirs(path, exist_ok=True)
+    vocab_size = write_byte_level_tokenizer(path)
+    config = BartConfig(vocab_size=vocab_size, max_position_embeddings=1100, **BART_CONFIGS[name])
+    torch.manual_seed(SEED)
+    BartForConditionalGeneration(config).save_pretrained(path)
+    return path
+
+def calibrate(repeat: int = 3) -> float:
+    """Fastest time in ms of a fixed mixed Python and torch workload, as a measure of host speed"""
+    import torch
+    
+    generator = torch.Generator().manual_seed(SEED)
+    a = torch.rand(128, 128, generator=generator)
+    b = torch.rand(128, 128, generator=generator)
+    
+    def workload():
+        sum(i * i for i in range(20000))
+        json.dumps([{"id": i, "text": WORDS[i % len(WORDS)]} for i in range(500)])
+        for _ in range(20):
+            torch.mm(a, b)
+    
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+def measure(fn: Callable[[], Any], repeat: int, number: int = 1) -> Dict[str, float]:
+    """
+    Time fn after one warm-up call
+    
+    Args:
+        fn: Callable to time
+        repeat: Number of timed samples
+        number: Calls per sample, for operations too fast to time singly
+    
+    Returns:
+        Median, minimum and maximum milliseconds per call, the sample count,
+        and "relative": the smallest ratio of a sample to the mean of the
+        calibration times on either side of it
+    """
+    fn()
+    samples = []
+    calibrations = [calibrate()]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+        calibrations.append(calibrate())
+    relative = [sample * 2 / (before + after) for sample, before, after in zip(samples, calibrations, calibrations[1:])]
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "runs": repeat,
+        "relative": min(relative)
+    }
+
+def bench_bart(workdir: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    from models.bart.bart_model import BartModelHandler
+    
+    results = {}
+    for name in BART_CONFIGS:
+        path = build_tiny_bart(os.path.join(workdir, f"bart-{name}"), name)
+        handler = BartModelHandler(model_path=path, batch_window_ms=0, quantize=False)
+        for size, word_count in INPUT_SIZES.items():
+            content = make_content(word_count)
+            for action in ("generate_summary", "generate_quiz", "generate_flashcards"):
+                method = getattr(handler, action)
+                results[f"bart.{action}[{name},{size}]"] = measure(lambda: method(content, "moderate"), repeat)
+                print(f"  bart.{action}[{name},{size}]")
+    return results
+
+def synthetic_training_data(count: int) -> List[Dict[str, Any]]:
+    """Labelled placement-test responses biased toward their class"""
+    from benchmarks.classify_batch import synthetic_responses
+    
+    return synthetic_responses(np.random.default_rng(SEED), count)
+
+def bench_classify(workdir: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    from models.xgboost.xgboost_classifier import UserClassifier
+    from models.xgboost.tree_predictor import CompiledClassifier, COMPILED_MODEL_PATH
+    
+    # train() saves to relative model paths, so run it inside the scratch directory
+    classifier_dir = os.path.join(workdir, "classifier")
+    os.makedirs(os.path.join(classifier_dir, "models", "xgboost"))
+    cwd = os.getcwd()
+    os.chdir(classifier_dir)
+    try:
+        classifier = UserClassifier(load_model=False)
+        classifier.train(synthetic_training_data(600))
+        compiled = CompiledClassifier(COMPILED_MODEL_PATH)
+    finally:
+        os.chdir(cwd)
+    
+    results = {}
+    single = synthetic_training_data(1)[0]["responses"]
+    results["classify.single[xgboost]"] = measure(lambda: classifier.classify(single), repeat, number=20)
+    results["classify.single[compiled]"] = measure(lambda: compiled.classify(single), repeat, number=200)
+    for cohort_size in COHORT_SIZES:
+        cohort = [item["responses"] for item in synthetic_training_data(cohort_size)]
+        number = max(1, 1000 // cohort_size)
+        results[f"classify.batch[xgboost,{cohort_size}]"] = measure(lambda: classifier.classify_batch(cohort), repeat, number)
+        results[f"classify.batch[compiled,{cohort_size}]"] = measure(lambda: compiled.classify_batch(cohort), repeat, number)
+    return results
+
+class BridgeProcess:
+    """A persistent bridge subprocess speaking NDJSON over its stdin and stdout"""
+    
+    def __init__(self, model_path: str):
+        env = dict(
+            os.environ,
+            BART_MODEL_BASE=model_path,
+            BART_ARTIFACT_PATH=os.path.join(model_path, "no-artifact"),
+            BART_QUANTIZE="0",
+            BART_BATCH_WINDOW_MS="0"
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "models.bridge_server", "--persistent"],
+            cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        self.next_id = 0
+    
+    def call(self, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self.next_id += 1
+        request_id = str(self.next_id)
+        self.process.stdin.write(json.dumps({"action": action, "params": params, "request_id": request_id}) + "\n")
+        self.process.stdin.flush()
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("Bridge process exited")
+            response = json.loads(line)
+            if response.get("request_id") == request_id and not response.get("partial"):
+                if not response["success"]:
+                    raise RuntimeError(f"Bridge {action} failed: {response['error']}")
+                return response
+    
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+def bench_bridge(workdir: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    path = build_tiny_bart(os.path.join(workdir, "bridge-bart"), "tiny")
+    bridge = BridgeProcess(path)
+    try:
+        # Wait for the model to load so the first timed call does not include it
+        bridge.call("generate_summary", {"content": make_content(10)})
+        results = {"bridge.roundtrip[status]": measure(lambda: bridge.call("status", {}), repeat, number=50)}
+        for size, word_count in INPUT_SIZES.items():
+            params = {"content": make_content(word_count), "learning_speed": "moderate"}
+            results[f"bridge.roundtrip[generate_summary,{size}]"] = measure(
+                lambda: bridge.call("generate_summary", params), repeat)
+    finally:
+        bridge.close()
+    return results
+
+def bench_json(workdir: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    from models.model_bridge import _mock_quiz
+    
+    question = _mock_quiz(make_content(30), "fast")["questions"][0]
+    results = {}
+    for count in QUIZ_QUESTION_COUNTS:
+        envelope = {
+            "success": True,
+            "request_id": "bench",
+            "error": None,
+            "data": {"questions": [dict(question, id=i) for i in range(count)], "learning_speed": "moderate"}
+        }
+        results[f"json.encode[quiz,{count}]"] = measure(lambda: json.dumps(envelope), repeat, number=max(1, 2000 // count))
+    for size, word_count in INPUT_SIZES.items():
+        envelope = {"success": True, "request_id": "bench", "error": None,
+                    "data": {"summary": make_content(word_count), "detail_level": "balanced"}}
+        results[f"json.encode[summary,{size}]"] = measure(lambda: json.dumps(envelope), repeat, number=2000)
+    return results
+
+GROUPS = {
+    "bart": bench_bart,
+    "classify": bench_classify,
+    "bridge": bench_bridge,
+    "json": bench_json
+}
+
+def environment() -> Dict[str, Any]:
+    """Host and library versions, recorded with the results"""
+    import torch
+    import transformers
+    import xgboost
+    
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "transformers": transformers.__version__,
+        "xgboost": xgboost.__version__
+    }
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """
+    Compare best relative times with a baseline and print a report
+    
+    Args:
+        results: Current results
+        baseline: Baseline results
+        tolerance: Allowed increase of the relative time as a fraction of the baseline's
+    
+    Returns:
+        Names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':52s} {'baseline ms':>12} {'current ms':>12} {'baseline rel':>12} {'current rel':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:52s} {'-':>12} {result['min_ms']:12.3f} {'-':>12} {result['relative']:12.4f} {'new':>8}")
+            continue
+        before = baseline[name]["relative"]
+        after = result["relative"]
+        change = (after - before) / before if before else 0.0
+        regressed = after > before * (1 + tolerance) and result["min_ms"] - baseline[name]["min_ms"] > NOISE_FLOOR_MS
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:52s} {baseline[name]['min_ms']:12.3f} {result['min_ms']:12.3f} "
+              f"{before:12.4f} {after:12.4f} {change:+7.0%}{flag}")
+        if regressed:
+            regressions.append(name)
+    for name in baseline:
+        if name not in results:
+            print(f"{name:52s} {'(not run)':>12}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the model layer")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per benchmark")
+    parser.add_argument("--only", default=",".join(GROUPS), help="comma-separated groups: " + ", ".join(GROUPS))
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed slowdown of the fastest sample as a fraction of the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+    
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+    
+    import torch
+    torch.manual_seed(SEED)
+    
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="model-bench-") as workdir:
+        for group in groups:
+            print(f"Running {group} benchmarks")
+            start = time.perf_counter()
+            results.update(GROUPS[group](workdir, args.repeat))
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+    
+    report = {"environment": environment(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated at {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    differing = {key: (value, report["environment"].get(key))
+                 for key, value in baseline["environment"].items() if report["environment"].get(key) != value}
+    if differing:
+        print("Warning: the baseline was recorded in a different environment; timings may not be comparable")
+        for key, (before, after) in differing.items():
+            print(f"  {key}: baseline {before}, current {after}")
+    
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"\nFAILED: {len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline:")
+        for name in regressions:
+            print(f"  {name}")
+        return 1
+    print(f"\nOK: no benchmark more than {args.tolerance:.0%} slower than the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from typing import Dict, Optional
+
+import torch
+from safetensors.torch import save_model
+from transformers import BartConfig, BartForConditionalGeneration, BartTokenizerFast, GenerationConfig
+from transformers.modeling_utils import no_init_weights
+
+# Local model artifact: memory-mapped safetensors weights plus a pre-serialized
+# fast tokenizer, resolved strictly from disk. Loading costs page faults
+# instead of a full read-and-copy, and processes on one host share the
+# weights through the page cache.
+ARTIFACT_PATH = os.environ.get("BART_ARTIFACT_PATH", "models/bart/artifact")
+ARTIFACT_FORMAT = 1
+MANIFEST_FILE = "artifact.json"
+WEIGHTS_FILE = "model.safetensors"
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+# Files whose size and modification time identify a checkpoint's weights
+FINGERPRINT_SUFFIXES = (".safetensors", ".bin", ".pt")
+FINGERPRINT_FILES = ("config.json",)
+
+def weights_fingerprint(source_id: str) -> str:
+    """
+    Short identifier of the weights currently stored for a checkpoint
+    
+    For a local directory it hashes the name, size and modification time of
+    the config and weight files, so fine-tuning into the same directory
+    changes it without reading gigabytes of weights. For a hub model name it
+    is the commit of the cached snapshot.
+    
+    Args:
+        source_id: Local checkpoint directory or hub model name
+    
+    Returns:
+        Hex fingerprint, or "" when nothing is stored locally for source_id
+    """
+    if os.path.isdir(source_id):
+        stats = []
+        for name in sorted(os.listdir(source_id)):
+            if name in FINGERPRINT_FILES or name.endswith(FINGERPRINT_SUFFIXES):
+                stat = os.stat(os.path.join(source_id, name))
+                stats.append([name, stat.st_size, stat.st_mtime_ns])
+        if not stats:
+            return ""
+        return hashlib.sha256(json.dumps(stats).encode("utf-8")).hexdigest()[:16]
+    
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        
+        cached = try_to_load_from_cache(source_id, "config.json")
+    except Exception:
+        return ""
+    # .../snapshots/<commit>/config.json; a str only when the file is cached
+    return os.path.basename(os.path.dirname(cached)) if isinstance(cached, str) else ""
+
+def read_manifest(path: str = ARTIFACT_PATH) -> Optional[Dict]:
+    """Manifest of the artifact at path, or None if there is none"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("format") == ARTIFACT_FORMAT else None
+
+def find_artifact(source_id: str, fingerprint: str, path: str = ARTIFACT_PATH) -> Optional[str]:
+    """
+    Path of an artifact exported from source_id, or None
+    
+    Args:
+        source_id: Checkpoint the caller would otherwise load
+        fingerprint: weights_fingerprint() of that checkpoint; an artifact
+            exported from older weights of the same checkpoint is ignored
+        path: Artifact directory
+    """
+    manifest = read_manifest(path)
+    if manifest is None or manifest.get("source_id") != source_id:
+        return None
+    if manifest.get("fingerprint") != fingerprint:
+        print(f"Ignoring model artifact at {path}: exported from other weights of {source_id}")
+        return None
+    return path
+
+def export_artifact(model, tokenizer, source_id: str, path: str = ARTIFACT_PATH):
+    """
+    Write a model and its tokenizer as a local artifact
+    
+    Args:
+        model: BartForConditionalGeneration to export (fp32, not quantized)
+        tokenizer: Tokenizer for the model; a fast tokenizer is saved either way
+        source_id: Checkpoint the model was loaded from, recorded in the manifest
+        path: Output directory
+    """
+    os.makedirs(path, exist_ok=True)
+    
+    # save_model drops tied duplicates (shared embeddings, lm_head); tie_weights restores them on load
+    save_model(model, os.path.join(path, WEIGHTS_FILE))
+    model.config.to_json_file(os.path.join(path, "config.json"))
+    model.generation_config.to_json_file(os.path.join(path, "generation_config.json"))
+    
+    fast_tokenizer = tokenizer if tokenizer.is_fast else BartTokenizerFast.from_pretrained(tokenizer.name_or_path)
+    fast_tokenizer.save_pretrained(path)
+    
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump({"format": ARTIFACT_FORMAT, "source_id": source_id, "fingerprint": weights_fingerprint(source_id),
+                   "weights": WEIGHTS_FILE}, f, indent=2)
+    print(f"Exported model artifact for {source_id} to {path}")
+
+def mmap_safetensors(filename: str) -> Dict[str, torch.Tensor]:
+    """
+    Open a safetensors file as tensors backed by a private memory mapping
+    
+    Pages are read from the page cache on first touch and only copied if a
+    tensor is written to.
+    """
+    with open(filename, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+    data_start = 8 + header_size
+    
+    storage = torch.UntypedStorage.from_file(filename, shared=False, nbytes=os.path.getsize(filename))
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        offset = data_start + begin
+        if offset % itemsize:
+            # Misaligned for its dtype: fall back to a copy of just this tensor
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, offset, torch.Size([end - begin]))
+            tensors[name] = raw.clone().view(dtype).reshape(info["shape"])
+            continue
+        tensor = torch.empty(0, dtype=dtype)
+        tensor.set_(storage, offset // itemsize, torch.Size(info["shape"]))
+        tensors[name] = tensor
+    
+    # save_model records each dropped tied duplicate as metadata pointing at the kept tensor
+    for name, kept in header.get("__metadata__", {}).items():
+        if name not in tensors and kept in tensors:
+            tensors[name] = tensors[kept]
+    return tensors
+
+def load_artifact_tokenizer(path: str = ARTIFACT_PATH) -> BartTokenizerFast:
+    """Load the artifact's pre-serialized fast tokenizer without touching the network"""
+    return BartTokenizerFast.from_pretrained(path, local_files_only=True)
+
+def load_artifact_model(path: str = ARTIFACT_PATH) -> BartForConditionalGeneration:
+    """
+    Build the model on the meta device and attach the memory-mapped weights
+    
+    No weight memory is allocated or copied; parameters point straight into
+    the mapping of the safetensors file.
+    """
+    config = BartConfig.from_json_file(os.path.join(path, "config.json"))
+    # Random initialisation would be overwritten anyway, and is slow even on meta tensors
+    with no_init_weights(), torch.device("meta"):
+        model = BartForConditionalGeneration(config)
+    
+    state_dict = mmap_safetensors(os.path.join(path, WEIGHTS_FILE))
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    
+    still_meta = [name for name, tensor in list(model.named_parameters()) + list(model.named_buffers()) if tensor.is_meta]
+    if unexpected or still_meta:
+        raise ValueError(f"Artifact at {path} does not match its config "
+                         f"(unexpected: {unexpected}, missing: {still_meta})")
+    
+    generation_config_path = os.path.join(path, "generation_config.json")
+    if os.path.exists(generation_config_path):
+        model.generation_config = GenerationConfig.from_pretrained(path, local_files_only=True)
+    return model
+
+# Usage: python -m models.bart.artifacts [source] [output_dir]
+# Exports the fine-tuned model if present, otherwise the base checkpoint
+if __name__ == "__main__":
+    from models.bart.bart_model import FINETUNED_MODEL_PATH, MODEL_BASE
+    
+    default_source = FINETUNED_MODEL_PATH if os.path.exists(FINETUNED_MODEL_PATH) else MODEL_BASE
+    source = sys.argv[1] if len(sys.argv) > 1 else default_source
+    output = sys.argv[2] if len(sys.argv) > 2 else ARTIFACT_PATH
+    
+    start = time.perf_counter()
+    model = BartForConditionalGeneration.from_pretrained(source)
+    tokenizer = BartTokenizerFast.from_pretrained(source)
+    export_artifact(model, tokenizer, source, output)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
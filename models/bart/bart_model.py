@@ -1,15 +1,45 @@
 import torch
-from transformers import BartForConditionalGeneration, BartTokenizer, AdamW
+from transformers import BartForConditionalGeneration, BartTokenizer, AdamW, TextIteratorStreamer
+from transformers.modeling_outputs import BaseModelOutput
+from torch.utils.data import DataLoader, Dataset
 import json
 import os
+import sys
+import threading
+import time
+from functools import partial
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterator
+
+# Add the repository root to the path so the example below also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from models.bart.artifacts import find_artifact, load_artifact_model, load_artifact_tokenizer, weights_fingerprint
+from models.bart.batching import GenerationBatcher, BATCH_WINDOW_MS, MAX_BATCH_SIZE
+from models.bart.generation_policy import generation_policy
+from models.bart.chunking import iter_windows, batched
+from models.bart.quantization import (
+    QUANTIZE_DEFAULT,
+    quantize_model,
+    save_quantized_model,
+    load_quantized_model
+)
+from models.bart.training import (
+    SummarizationDataset,
+    LengthBucketSampler,
+    collate_batch,
+    save_checkpoint,
+    load_checkpoint,
+    LABEL_PAD_ID
+)
+from models.result_cache import ResultCache, make_cache_key
+from models.telemetry import telemetry
 
 # Set device
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 # Model paths
-MODEL_BASE = "facebook/bart-large-cnn"  # Pre-trained model for summarization
+MODEL_BASE = os.environ.get("BART_MODEL_BASE", "facebook/bart-large-cnn")  # Pre-trained model for summarization
 FINETUNED_MODEL_PATH = "models/bart/finetuned_model"
 QUIZ_GENERATION_MODEL_PATH = "models/bart/quiz_generation_model"
 
@@ -38,52 +68,330 @@ LEARNING_SPEED_PARAMS = {
     }
 }
 
+# Longest input the BART encoder accepts
+MAX_INPUT_TOKENS = 1024
+
+# Beam search settings shared by every generation call
+GENERATION_DEFAULTS = {
+    "num_beams": 4,
+    "length_penalty": 2.0,
+    "early_stopping": True,
+    "no_repeat_ngram_size": 3
+}
+
+# Settings for summarising one window of a long document. They do not
+# depend on learning speed, so cached window summaries are shared by all users.
+CHUNK_GENERATION_KWARGS = dict(GENERATION_DEFAULTS, min_length=30, max_length=142)
+
+# Number of windows summarised per generate() call in chunked mode
+CHUNK_BATCH_SIZE = int(os.environ.get("BART_CHUNK_BATCH_SIZE", "4"))
+
+SUMMARY_PREFIX = "summarize: "
+QUIZ_PREFIX = "generate quiz questions for: "
+FLASHCARDS_PREFIX = "extract key concepts and definitions from: "
+
 class BartModelHandler:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, batch_window_ms: Optional[float] = None, max_batch_size: Optional[int] = None,
+                 quantize: Optional[bool] = None):
         """Initialize BART model with pre-trained weights or fine-tuned model"""
-        self.tokenizer = BartTokenizer.from_pretrained(MODEL_BASE)
+        local_model = bool(model_path and os.path.exists(model_path))
+        source_id = model_path if local_model else MODEL_BASE
+        # Changes when the checkpoint's weights do, e.g. after fine_tune() into the same directory
+        fingerprint = weights_fingerprint(source_id)
+        
+        # A local artifact for this checkpoint is loaded from disk only, with memory-mapped weights
+        artifact_path = find_artifact(source_id, fingerprint)
+        if artifact_path:
+            self.tokenizer = load_artifact_tokenizer(artifact_path)
+        elif local_model and os.path.exists(os.path.join(model_path, "vocab.json")):
+            # fine_tune() saves the tokenizer next to the model, so there is no need to ask the hub
+            self.tokenizer = BartTokenizer.from_pretrained(model_path, local_files_only=True)
+        else:
+            self.tokenizer = BartTokenizer.from_pretrained(MODEL_BASE)
         
+        # Dynamic int8 quantization only applies to CPU inference
+        quantize = QUANTIZE_DEFAULT if quantize is None else quantize
+        if quantize and device.type != "cpu":
+            print("Quantized mode is CPU-only, using fp32 weights")
+            quantize = False
+            
+        quantized_model = load_quantized_model(source_id, fingerprint) if quantize else None
+        if quantized_model is not None:
+            self.model = quantized_model
+            print(f"Loaded quantized model for {source_id}")
+        elif artifact_path:
+            self.model = load_artifact_model(artifact_path)
+            print(f"Loaded memory-mapped model artifact for {source_id} from {artifact_path}")
         # Load model from path if provided, otherwise use base model
-        if model_path and os.path.exists(model_path):
-            self.model = BartForConditionalGeneration.from_pretrained(model_path)
+        elif local_model:
+            self.model = BartForConditionalGeneration.from_pretrained(model_path, local_files_only=True)
             print(f"Loaded fine-tuned model from {model_path}")
         else:
             self.model = BartForConditionalGeneration.from_pretrained(MODEL_BASE)
             print(f"Loaded base model {MODEL_BASE}")
             
+        if quantize and quantized_model is None:
+            self.model = quantize_model(self.model)
+            save_quantized_model(self.model, source_id, fingerprint)
+            
+        self.quantized = quantize
+        self.model_id = self._make_model_id(source_id, fingerprint)
+            
         self.model.to(device)
         self.model.eval()  # Set to evaluation mode
         
-    def generate_summary(self, content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
-        """Generate summary based on content and learning speed"""
-        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+        # Window summaries for chunked summarisation of long documents
+        self.chunk_cache = ResultCache()
+        
+        # Micro-batching of generate() calls across concurrent requests
+        self.batcher = None
+        window_ms = BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms
+        if window_ms > 0:
+            self.enable_batching(window_ms, max_batch_size or MAX_BATCH_SIZE)
+            
+    def _make_model_id(self, source_id: str, fingerprint: str) -> str:
+        """Identity of the loaded weights for result cache keys"""
+        model_id = f"{source_id}#{fingerprint}" if fingerprint else source_id
+        return f"{model_id}+int8" if self.quantized else model_id
+        
+    def enable_batching(self, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = MAX_BATCH_SIZE):
+        """Route generation through a scheduler that pads concurrent requests into shared batches"""
+        if self.batcher is not None:
+            self.batcher.close()
+        self.batcher = GenerationBatcher(self.generate_batch, window_ms, max_batch_size)
+        
+    def generate_batch(self, texts: List[str], generation_kwargs: Dict[str, Any]) -> List[str]:
+        """Run one padded generate() call over several inputs sharing the same settings"""
+        with telemetry.stage("tokenize"):
+            inputs = self.tokenizer(
+                texts,
+                return_tensors="pt",
+                max_length=MAX_INPUT_TOKENS,
+                truncation=True,
+                padding=True
+            ).to(device)
+            
+        with telemetry.stage("generate"), torch.no_grad():
+            output_ids = self.model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                **generation_kwargs
+            )
+        self._record_tokens(inputs["attention_mask"], output_ids)
+            
+        with telemetry.stage("decode"):
+            return self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+            
+    def _record_tokens(self, attention_mask: torch.Tensor, output_ids: torch.Tensor, action: Optional[str] = None):
+        """Add the encoder input and generated token counts of one generate() call to the telemetry counters"""
+        action = action or telemetry.current_action()
+        telemetry.increment("model_input_tokens_total", int(attention_mask.sum()), action=action)
+        telemetry.increment("model_output_tokens_total", int((output_ids != self.tokenizer.pad_token_id).sum()), action=action)
         
-        # Tokenize input
-        inputs = self.tokenizer.encode(
-            "summarize: " + content, 
-            return_tensors="pt", 
-            max_length=1024, 
-            truncation=True
-        ).to(device)
+    def _generate_text(self, text: str, generation_kwargs: Dict[str, Any]) -> str:
+        """Generate output for a single input, batched with other callers when enabled"""
+        # Settings are adjusted here, on the request's thread, before batching groups by them
+        generation_kwargs = generation_policy.apply(generation_kwargs)
+        if self.batcher is not None:
+            return self.batcher.generate(text, generation_kwargs)
+        return self.generate_batch([text], generation_kwargs)[0]
         
+    def _summary_generation_kwargs(self, content: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Generation settings for a summary of the given content"""
         # Calculate target length based on content and learning speed
         content_words = len(content.split())
         target_length = int(content_words * params["summary_ratio"])
         min_length = min(params["min_length"], max(30, target_length // 2))
         max_length = min(params["max_length"], max(100, target_length * 2))
         
+        return dict(GENERATION_DEFAULTS, min_length=min_length, max_length=max_length)
+        
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """Token count of each text, without special tokens"""
+        with telemetry.stage("tokenize"):
+            return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+        
+    def _fits_input(self, text: str) -> bool:
+        """Whether text plus special tokens fits in the encoder without truncation"""
+        # A token spans at least one character, so short text never needs counting
+        if len(text) + 2 <= MAX_INPUT_TOKENS:
+            return True
+        return self._count_tokens([text])[0] + 2 <= MAX_INPUT_TOKENS
+        
+    def generate_summary(self, content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
+        """Generate summary based on content and learning speed"""
+        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+        
+        # Long documents are summarised window by window instead of truncated
+        if not self._fits_input(SUMMARY_PREFIX + content):
+            return self.generate_long_summary(content, learning_speed)
+        
         # Generate summary
-        summary_ids = self.model.generate(
-            inputs,
-            min_length=min_length,
-            max_length=max_length,
-            num_beams=4,
-            length_penalty=2.0,
-            early_stopping=True,
-            no_repeat_ngram_size=3
+        summary = self._generate_text(
+            SUMMARY_PREFIX + content,
+            self._summary_generation_kwargs(content, params)
+        )
+        
+        return self._build_summary(summary, learning_speed)
+        
+    def _summarize_windows(self, windows: List[str]) -> List[str]:
+        """Summarise document windows in one batch, reusing cached window summaries"""
+        generation_kwargs = generation_policy.apply(CHUNK_GENERATION_KWARGS)
+        
+        def window_keys(kwargs: Dict[str, Any]) -> List[str]:
+            settings = ",".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+            return [make_cache_key("summarize_window", window, settings, self.model_id) for window in windows]
+        
+        # Window summaries from heavier settings are reused first; new ones are stored under this level's settings
+        keys = window_keys(generation_kwargs)
+        lookups = [window_keys(generation_policy.apply(CHUNK_GENERATION_KWARGS, level))
+                   for level in generation_policy.usable_levels()]
+        
+        summaries = []
+        missing = []
+        for index in range(len(windows)):
+            cached = None
+            for level_keys in lookups:
+                cached = self.chunk_cache.get(level_keys[index])
+                if cached is not None:
+                    break
+            summaries.append(cached["summary"] if cached is not None else None)
+            if cached is None:
+                missing.append(index)
+                
+        if missing:
+            generated = self.generate_batch(
+                [SUMMARY_PREFIX + windows[index] for index in missing],
+                generation_kwargs
+            )
+            for index, summary in zip(missing, generated):
+                summaries[index] = summary
+                self.chunk_cache.put(keys[index], {"summary": summary})
+                
+        return summaries
+        
+    def _reduce_to_window(self, content: str) -> Tuple[str, int]:
+        """
+        Map-reduce long content until it fits in one encoder window
+        
+        Returns:
+            The reduced text and the number of windows summarised on the way
+        """
+        window_tokens = MAX_INPUT_TOKENS - 2 - self._count_tokens([SUMMARY_PREFIX])[0]
+        
+        text = content
+        window_count = 0
+        while not self._fits_input(SUMMARY_PREFIX + text):
+            partials = []
+            for windows in batched(iter_windows(text, self._count_tokens, window_tokens), CHUNK_BATCH_SIZE):
+                partials.extend(self._summarize_windows(windows))
+            window_count += len(partials)
+            
+            reduced = "\n\n".join(partials)
+            # Stop if a level fails to shrink the text; the final pass truncates
+            if len(partials) <= 1 or len(reduced) >= len(text):
+                text = reduced
+                break
+            text = reduced
+            
+        return text, window_count
+        
+    def generate_long_summary(self, content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
+        """
+        Summarise content longer than the encoder window by map-reduce
+        
+        The content is split on sentence and paragraph boundaries into
+        overlapping windows, which are summarised in batches. The partial
+        summaries are joined and summarised again until they fit in one
+        window, and that text gets a final summary using the learning-speed
+        length targets. Each window summary is cached on its own, so editing
+        part of a document only re-runs the windows that changed.
+        
+        Args:
+            content: The content to summarize
+            learning_speed: The user's learning speed ("slow", "moderate", "fast")
+            
+        Returns:
+            Dictionary containing the summary and metadata
+        """
+        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+        text, window_count = self._reduce_to_window(content)
+        
+        summary = self._generate_text(
+            SUMMARY_PREFIX + text,
+            self._summary_generation_kwargs(content, params)
         )
         
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        result = self._build_summary(summary, learning_speed)
+        result["chunk_count"] = window_count
+        return result
+        
+    def stream_summary(self, content: str, learning_speed: str = "moderate") -> Iterator[str]:
+        """
+        Generate a summary and yield its text incrementally as it is decoded
+        
+        Streaming uses greedy decoding, since beam search cannot commit to any
+        text until it finishes. Long content is reduced by the chunked path
+        first, and only the final pass streams.
+        
+        Args:
+            content: The content to summarize
+            learning_speed: The user's learning speed ("slow", "moderate", "fast")
+            
+        Yields:
+            Successive pieces of summary text
+        """
+        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+        text, _ = self._reduce_to_window(content)
+        
+        generation_kwargs = generation_policy.apply(self._summary_generation_kwargs(content, params))
+        generation_kwargs["num_beams"] = 1
+        # Both only affect beam search, and generate() warns when they are set for greedy decoding
+        generation_kwargs.pop("length_penalty", None)
+        generation_kwargs.pop("early_stopping", None)
+        
+        with telemetry.stage("tokenize"):
+            inputs = self.tokenizer(
+                SUMMARY_PREFIX + text,
+                return_tensors="pt",
+                max_length=MAX_INPUT_TOKENS,
+                truncation=True
+            ).to(device)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+        errors = []
+        # The generation thread has no request of its own; label its timings with this one.
+        # Incremental decoding happens inside the streamer, so it is part of "generate".
+        action = telemetry.current_action()
+        
+        def run_generation():
+            try:
+                with telemetry.stage("generate", action), torch.no_grad():
+                    output_ids = self.model.generate(
+                        inputs["input_ids"],
+                        attention_mask=inputs["attention_mask"],
+                        streamer=streamer,
+                        **generation_kwargs
+                    )
+                self._record_tokens(inputs["attention_mask"], output_ids, action)
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, which re-raises below
+                streamer.end()
+                
+        thread = threading.Thread(target=run_generation, name="bart-stream", daemon=True)
+        thread.start()
+        
+        for piece in streamer:
+            if piece:
+                yield piece
+                
+        thread.join()
+        if errors:
+            raise errors[0]
+        
+    def _build_summary(self, summary: str, learning_speed: str) -> Dict[str, Any]:
+        """Package generated summary text as a summary result"""
+        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
         
         return {
             "summary": summary,
@@ -93,31 +401,21 @@ class BartModelHandler:
     
     def generate_quiz(self, content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
         """Generate quiz based on content and learning speed"""
-        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
-        question_count = params["question_count"]
-        
         # For a real implementation, we would use a specialized model for quiz generation
         # Here we'll use a simplified approach with the base model
         
-        # Tokenize input with a special prefix for quiz generation
-        inputs = self.tokenizer.encode(
-            "generate quiz questions for: " + content, 
-            return_tensors="pt", 
-            max_length=1024, 
-            truncation=True
-        ).to(device)
-        
-        # Generate response
-        output_ids = self.model.generate(
-            inputs,
-            max_length=512,
-            num_beams=4,
-            length_penalty=2.0,
-            early_stopping=True,
-            no_repeat_ngram_size=3
+        # Generate response with a special prefix for quiz generation
+        raw_output = self._generate_text(
+            QUIZ_PREFIX + content,
+            dict(GENERATION_DEFAULTS, max_length=512)
         )
         
-        raw_output = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+        return self._build_quiz(raw_output, learning_speed)
+        
+    def _build_quiz(self, raw_output: str, learning_speed: str) -> Dict[str, Any]:
+        """Turn raw quiz generation output into a quiz result"""
+        params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+        question_count = params["question_count"]
         
         # In a real implementation, we would parse this into structured quiz questions
         # Here we'll return a mock structure based on the learning speed
@@ -133,7 +431,7 @@ class BartModelHandler:
                     f"Option C for question {i}", 
                     f"Option D for question {i}"
                 ],
-                "correct_option": np.random.randint(0, 4)
+                "correct_option": int(np.random.randint(0, 4))
             })
         
         return {
@@ -144,6 +442,16 @@ class BartModelHandler:
     
     def generate_flashcards(self, content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
         """Generate flashcards based on content and learning speed"""
+        # Generate response with a special prefix for flashcard generation
+        raw_output = self._generate_text(
+            FLASHCARDS_PREFIX + content,
+            dict(GENERATION_DEFAULTS, max_length=512)
+        )
+        
+        return self._build_flashcards(raw_output, learning_speed)
+        
+    def _build_flashcards(self, raw_output: str, learning_speed: str) -> Dict[str, Any]:
+        """Turn raw flashcard generation output into a flashcards result"""
         # Adjust flashcards based on learning speed
         if learning_speed == "slow":
             card_count = 15
@@ -155,26 +463,6 @@ class BartModelHandler:
             card_count = 7
             detail_level = "concise"
         
-        # Tokenize input with a special prefix for flashcard generation
-        inputs = self.tokenizer.encode(
-            "extract key concepts and definitions from: " + content, 
-            return_tensors="pt", 
-            max_length=1024, 
-            truncation=True
-        ).to(device)
-        
-        # Generate response
-        output_ids = self.model.generate(
-            inputs,
-            max_length=512,
-            num_beams=4,
-            length_penalty=2.0,
-            early_stopping=True,
-            no_repeat_ngram_size=3
-        )
-        
-        raw_output = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
-        
         # In a real implementation, we would parse this into structured flashcards
         # Here we'll return a mock structure based on the learning speed
         flashcards = []
@@ -191,60 +479,218 @@ class BartModelHandler:
             "detail_level": detail_level,
             "learning_speed": learning_speed
         }
-    
-    def fine_tune(self, train_data: List[Dict[str, str]], epochs: int = 3, batch_size: int = 4, learning_rate: float = 3e-5):
-        """Fine-tune the BART model on custom data"""
-        # Set model to training mode
-        self.model.train()
+        
+    def _decoder_prompt_ids(self, prompt: str) -> torch.Tensor:
+        """Decoder start tokens followed by a task instruction, to condition decoding on the task"""
+        config = getattr(self.model, "generation_config", None) or self.model.config
+        start_ids = [config.decoder_start_token_id]
+        # The prompt replaces the first generated token, so add the token generate() would force there
+        if getattr(config, "forced_bos_token_id", None) is not None:
+            start_ids.append(config.forced_bos_token_id)
+        prompt_ids = self.tokenizer(prompt, add_special_tokens=False)["input_ids"]
+        return torch.tensor([start_ids + prompt_ids], device=device)
+        
+    def _generate_from_encoder(self, encoder_outputs: BaseModelOutput, attention_mask: torch.Tensor,
+                               generation_kwargs: Dict[str, Any], decoder_prompt: Optional[str] = None) -> str:
+        """
+        Decode from precomputed encoder states without re-running the encoder
+        
+        Args:
+            encoder_outputs: Encoder states shared by every artifact
+            attention_mask: Attention mask of the encoded input
+            generation_kwargs: Settings passed to generate()
+            decoder_prompt: Task instruction the decoder starts from; it is
+                not part of the returned text
+        """
+        prompt_length = 0
+        if decoder_prompt is not None:
+            decoder_input_ids = self._decoder_prompt_ids(decoder_prompt)
+            prompt_length = decoder_input_ids.shape[1]
+            # Length limits count the prompt tokens, so keep the generated part as long as before
+            generation_kwargs = dict(generation_kwargs, decoder_input_ids=decoder_input_ids)
+            for name in ("min_length", "max_length"):
+                if name in generation_kwargs:
+                    generation_kwargs[name] += prompt_length
+                    
+        # generate() expands encoder_outputs in place for beam search, so each
+        # call gets its own wrapper around the shared hidden states
+        with telemetry.stage("generate"), torch.no_grad():
+            output_ids = self.model.generate(
+                encoder_outputs=BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state),
+                attention_mask=attention_mask,
+                **generation_kwargs
+            )[:, prompt_length:]
+        # Input tokens are counted once, for the shared encoder pass in generate_all
+        telemetry.increment("model_output_tokens_total", int((output_ids != self.tokenizer.pad_token_id).sum()),
+                            action=telemetry.current_action())
+            
+        with telemetry.stage("decode"):
+            return self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+        
+    def generate_all(self, content: str, learning_speed: str = "moderate",
+                     learning_speeds: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Generate a summary, quiz and flashcards from a single encoder pass
+        
+        The content is tokenized and encoded once, with the summary prefix, so
+        the summary is the one generate_summary() produces. The quiz and
+        flashcards decode from the same encoder states, with their task
+        prefix given to the decoder as a prompt instead of to the encoder.
+        Their raw output therefore differs from generate_quiz() and
+        generate_flashcards(), but stays specific to each task.
+        
+        Args:
+            content: The source content
+            learning_speed: Learning speed used for every artifact by default
+            learning_speeds: Optional per-artifact overrides keyed by
+                "summary", "quiz" or "flashcards"
+                
+        Returns:
+            Dictionary with "summary", "quiz" and "flashcards" results
+        """
+        speeds = {artifact: learning_speed for artifact in ("summary", "quiz", "flashcards")}
+        speeds.update(learning_speeds or {})
+        summary_params = LEARNING_SPEED_PARAMS.get(speeds["summary"], LEARNING_SPEED_PARAMS["moderate"])
+        
+        with telemetry.stage("tokenize"):
+            inputs = self.tokenizer(
+                SUMMARY_PREFIX + content,
+                return_tensors="pt",
+                max_length=MAX_INPUT_TOKENS,
+                truncation=True
+            ).to(device)
+        telemetry.increment("model_input_tokens_total", int(inputs["attention_mask"].sum()),
+                            action=telemetry.current_action())
+        
+        # The shared encoder pass is counted as part of generation
+        with telemetry.stage("generate"), torch.no_grad():
+            encoder_outputs = self.model.get_encoder()(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                return_dict=True
+            )
+            
+        def decode(generation_kwargs: Dict[str, Any], decoder_prompt: Optional[str] = None) -> str:
+            return self._generate_from_encoder(encoder_outputs, inputs["attention_mask"],
+                                               generation_policy.apply(generation_kwargs), decoder_prompt)
+            
+        # Long documents get the chunked summary; quiz and flashcards still
+        # decode from the shared (truncated) encoder pass
+        if self._fits_input(SUMMARY_PREFIX + content):
+            summary_result = self._build_summary(
+                decode(self._summary_generation_kwargs(content, summary_params)),
+                speeds["summary"]
+            )
+        else:
+            summary_result = self.generate_long_summary(content, speeds["summary"])
+        quiz_output = decode(dict(GENERATION_DEFAULTS, max_length=512), QUIZ_PREFIX)
+        flashcards_output = decode(dict(GENERATION_DEFAULTS, max_length=512), FLASHCARDS_PREFIX)
+        
+        return {
+            "summary": summary_result,
+            "quiz": self._build_quiz(quiz_output, speeds["quiz"]),
+            "flashcards": self._build_flashcards(flashcards_output, speeds["flashcards"])
+        }
+        
+    def fine_tune(self, train_data: List[Dict[str, str]], epochs: int = 3, batch_size: int = 4, learning_rate: float = 3e-5,
+                  gradient_accumulation_steps: int = 1, num_workers: int = 0, bf16: bool = False,
+                  checkpoint_dir: Optional[str] = None, checkpoint_every: int = 500, seed: int = 0):
+        """
+        Fine-tune the BART model on custom data
+        
+        Samples are tokenized in DataLoader workers, grouped into padded
+        batches of similar length, and gradients are accumulated over
+        several batches per optimizer step. With a checkpoint directory,
+        training state is saved every `checkpoint_every` optimizer steps and
+        at the end of each epoch, and an interrupted run resumes from there.
+        
+        Args:
+            train_data: List of {"source_text", "target_text"} pairs, or a
+                Dataset yielding tokenized samples with a lengths() method
+            epochs: Number of passes over the data
+            batch_size: Samples per forward/backward pass
+            learning_rate: AdamW learning rate
+            gradient_accumulation_steps: Batches per optimizer step; the
+                effective batch size is batch_size * gradient_accumulation_steps
+            num_workers: Background DataLoader worker processes
+            bf16: Run forward passes under bfloat16 autocast
+            checkpoint_dir: Directory for resumable checkpoints, None to disable
+            checkpoint_every: Optimizer steps between checkpoints
+            seed: Seed for batch ordering
+        """
+        dataset = train_data if isinstance(train_data, Dataset) else SummarizationDataset(train_data, self.tokenizer)
+        sampler = LengthBucketSampler(dataset.lengths(), batch_size, seed)
+        loader = DataLoader(
+            dataset,
+            batch_sampler=sampler,
+            num_workers=num_workers,
+            collate_fn=partial(collate_batch, pad_token_id=self.tokenizer.pad_token_id)
+        )
         
         # Prepare optimizer
         optimizer = AdamW(self.model.parameters(), lr=learning_rate)
         
+        start_epoch, skip_batches, step = 0, 0, 0
+        if checkpoint_dir:
+            resumed = load_checkpoint(checkpoint_dir, self.model, optimizer)
+            if resumed is not None:
+                start_epoch, skip_batches, step = resumed["epoch"], resumed["next_batch"], resumed["step"]
+                
+        # Set model to training mode
+        self.model.train()
+        optimizer.zero_grad()
+        
         # Training loop
-        for epoch in range(epochs):
-            total_loss = 0
+        for epoch in range(start_epoch, epochs):
+            sampler.set_epoch(epoch, skip_batches if epoch == start_epoch else 0)
+            first_batch = sampler.skip_batches
+            batch_count = first_batch + len(sampler)
+            
+            total_loss, samples, tokens = 0.0, 0, 0
+            epoch_start = time.perf_counter()
             
-            # Process in batches
-            for i in range(0, len(train_data), batch_size):
-                batch = train_data[i:i+batch_size]
+            for batch_index, batch in enumerate(loader, start=first_batch):
+                batch = {key: value.to(device) for key, value in batch.items()}
                 
-                # Process each item in batch
-                for item in batch:
-                    # Tokenize input and target
-                    inputs = self.tokenizer.encode(
-                        item["source_text"], 
-                        return_tensors="pt", 
-                        max_length=1024, 
-                        truncation=True
-                    ).to(device)
-                    
-                    targets = self.tokenizer.encode(
-                        item["target_text"], 
-                        return_tensors="pt", 
-                        max_length=512, 
-                        truncation=True
-                    ).to(device)
+                # Forward pass
+                with torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16):
+                    loss = self.model(**batch).loss
                     
-                    # Forward pass
-                    outputs = self.model(input_ids=inputs, labels=targets)
-                    loss = outputs.loss
-                    
-                    # Backward pass
-                    loss.backward()
-                    total_loss += loss.item()
+                # Backward pass, scaled so accumulated gradients average over the step
+                (loss / gradient_accumulation_steps).backward()
                 
-                # Update parameters
-                optimizer.step()
-                optimizer.zero_grad()
+                batch_samples = batch["input_ids"].size(0)
+                total_loss += loss.item() * batch_samples
+                samples += batch_samples
+                tokens += int(batch["attention_mask"].sum()) + int((batch["labels"] != LABEL_PAD_ID).sum())
                 
+                # Update parameters
+                if (batch_index + 1) % gradient_accumulation_steps == 0 or batch_index + 1 == batch_count:
+                    optimizer.step()
+                    optimizer.zero_grad()
+                    step += 1
+                    
+                    if checkpoint_dir and step % checkpoint_every == 0:
+                        save_checkpoint(checkpoint_dir, self.model, optimizer, epoch, batch_index + 1, step)
+                        
             # Print epoch results
-            print(f"Epoch {epoch+1}/{epochs}, Loss: {total_loss/len(train_data)}")
+            elapsed = time.perf_counter() - epoch_start
+            print(
+                f"Epoch {epoch+1}/{epochs}, Loss: {total_loss/max(samples, 1)}, "
+                f"{samples/elapsed:.2f} samples/sec, {tokens/elapsed:.0f} tokens/sec"
+            )
+            
+            if checkpoint_dir:
+                save_checkpoint(checkpoint_dir, self.model, optimizer, epoch + 1, 0, step)
         
         # Save fine-tuned model
         self.model.save_pretrained(FINETUNED_MODEL_PATH)
         self.tokenizer.save_pretrained(FINETUNED_MODEL_PATH)
         print(f"Model saved to {FINETUNED_MODEL_PATH}")
         
+        # Results cached for the previous weights must not be served for the new ones
+        self.model_id = self._make_model_id(FINETUNED_MODEL_PATH, weights_fingerprint(FINETUNED_MODEL_PATH))
+        
         # Return to evaluation mode
         self.model.eval()
 
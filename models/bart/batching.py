@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# How long the scheduler holds the first request of a batch waiting for more
+# compatible requests. 0 disables batching.
+BATCH_WINDOW_MS = float(os.environ.get("BART_BATCH_WINDOW_MS", "0"))
+
+# Upper bound on the number of inputs padded into one generate() call
+MAX_BATCH_SIZE = int(os.environ.get("BART_MAX_BATCH_SIZE", "8"))
+
+class _PendingGeneration:
+    """A single caller waiting for its share of a batched generate() call"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+class GenerationBatcher:
+    """
+    Collect concurrent generation requests and run them as padded batches
+    
+    Requests are grouped by their generation settings (min/max length, beam
+    count and so on), since only requests with identical settings can share a
+    generate() call. A group is flushed when its oldest request has waited for
+    the batching window, or as soon as it reaches the maximum batch size.
+    """
+    
+    def __init__(self, generate_fn: Callable[[List[str], Dict[str, Any]], List[str]],
+                 window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = MAX_BATCH_SIZE):
+        """
+        Args:
+            generate_fn: Function generating outputs for a list of inputs sharing the same settings
+            window_ms: Time to wait for more requests before flushing a group
+            max_batch_size: Maximum number of inputs per generate() call
+        """
+        self.generate_fn = generate_fn
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        
+        self._groups: Dict[Tuple, List[_PendingGeneration]] = {}
+        self._settings: Dict[Tuple, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="bart-batcher", daemon=True)
+        self._thread.start()
+        
+    @staticmethod
+    def _group_key(generation_kwargs: Dict[str, Any]) -> Tuple:
+        """Hashable key identifying requests that can share a generate() call"""
+        return tuple(sorted(generation_kwargs.items()))
+        
+    def submit(self, text: str, generation_kwargs: Dict[str, Any]) -> Future:
+        """
+        Queue an input for generation
+        
+        Args:
+            text: Model input text
+            generation_kwargs: Keyword arguments for model.generate()
+            
+        Returns:
+            Future resolving to the decoded output text
+        """
+        pending = _PendingGeneration(text)
+        key = self._group_key(generation_kwargs)
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Generation batcher is closed")
+            self._groups.setdefault(key, []).append(pending)
+            self._settings[key] = dict(generation_kwargs)
+            self._cond.notify()
+            
+        return pending.future
+        
+    def generate(self, text: str, generation_kwargs: Dict[str, Any]) -> str:
+        """Queue an input and block until its output is ready"""
+        return self.submit(text, generation_kwargs).result()
+        
+    def close(self):
+        """Flush the remaining requests and stop the scheduler thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        
+    def _next_batch(self) -> Optional[Tuple[Dict[str, Any], List[_PendingGeneration]]]:
+        """Wait for the oldest group to fill up or time out and take a batch from it"""
+        with self._cond:
+            while not self._groups:
+                if self._closed:
+                    return None
+                self._cond.wait()
+                
+            # Serve the group whose oldest request has waited longest
+            key = min(self._groups, key=lambda k: self._groups[k][0].enqueued_at)
+            deadline = self._groups[key][0].enqueued_at + self.window
+            
+            while len(self._groups[key]) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                
+            group = self._groups[key]
+            batch, rest = group[:self.max_batch_size], group[self.max_batch_size:]
+            settings = self._settings[key]
+            if rest:
+                self._groups[key] = rest
+            else:
+                del self._groups[key]
+                del self._settings[key]
+                
+            return settings, batch
+            
+    def _run(self):
+        """Scheduler loop: run one batch at a time until closed"""
+        while True:
+            next_batch = self._next_batch()
+            if next_batch is None:
+                return
+                
+            settings, batch = next_batch
+            try:
+                outputs = self.generate_fn([pending.text for pending in batch], settings)
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"Expected {len(batch)} outputs, got {len(outputs)}")
+            except Exception as e:
+                for pending in batch:
+                    pending.future.set_exception(e)
+                continue
+                
+            for pending, output in zip(batch, outputs):
+                pending.future.set_result(output)
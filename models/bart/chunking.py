@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+# Sentences repeated at the start of the next window so no sentence loses its context
+CHUNK_OVERLAP_SENTENCES = int(os.environ.get("BART_CHUNK_OVERLAP_SENTENCES", "1"))
+
+# Roughly one paragraph in ANCHOR_RATE starts a fresh window regardless of
+# how full the current one is. Boundaries then depend on the content itself,
+# so an edit only reshuffles windows up to the next anchor.
+ANCHOR_RATE = 4
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def split_units(content: str) -> List[Tuple[str, bool]]:
+    """
+    Split content into sentences, remembering where paragraphs start
+    
+    Args:
+        content: Source text, paragraphs separated by blank lines
+        
+    Returns:
+        List of (sentence, starts_paragraph) pairs
+    """
+    units = []
+    for paragraph in _PARAGRAPH_SPLIT.split(content):
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(paragraph.strip()) if s.strip()]
+        for index, sentence in enumerate(sentences):
+            units.append((" ".join(sentence.split()), index == 0))
+    return units
+
+def _is_anchor(sentence: str) -> bool:
+    """Whether a paragraph opening with this sentence forces a window boundary"""
+    return hashlib.sha1(sentence.encode("utf-8")).digest()[0] < 256 // ANCHOR_RATE
+
+def _split_oversized(sentence: str, token_count: int, max_tokens: int) -> List[str]:
+    """Split a sentence longer than a window into word runs that fit"""
+    words = sentence.split()
+    pieces = -(-token_count // max_tokens) + 1
+    step = max(1, -(-len(words) // pieces))
+    return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+def iter_windows(content: str, count_tokens: Callable[[List[str]], List[int]], max_tokens: int,
+                 overlap: int = CHUNK_OVERLAP_SENTENCES) -> Iterator[str]:
+    """
+    Lazily pack content into overlapping windows of at most max_tokens
+    
+    Windows break on sentence boundaries, never mid-sentence, except for
+    single sentences longer than a window. Each window after the first
+    repeats the last `overlap` sentences of the previous one.
+    
+    Args:
+        content: Source text
+        count_tokens: Function returning the token count of each string in a list
+        max_tokens: Token budget per window
+        overlap: Number of sentences carried over between windows
+        
+    Yields:
+        Window text
+    """
+    units = split_units(content)
+    if not units:
+        return
+        
+    counts = count_tokens([sentence for sentence, _ in units])
+    
+    window: List[Tuple[str, int]] = []
+    window_tokens = 0
+    # Pieces in the current window that were not carried over from the last one
+    fresh = 0
+    
+    for (sentence, starts_paragraph), tokens in zip(units, counts):
+        if tokens > max_tokens:
+            pieces = _split_oversized(sentence, tokens, max_tokens)
+            piece_counts = count_tokens(pieces)
+        else:
+            pieces, piece_counts = [sentence], [tokens]
+            
+        for piece, piece_tokens in zip(pieces, piece_counts):
+            anchored = starts_paragraph and piece is pieces[0] and _is_anchor(sentence)
+            if fresh and (anchored or window_tokens + piece_tokens > max_tokens):
+                yield " ".join(text for text, _ in window)
+                
+                # Carry the overlap forward while it still leaves room for this piece
+                carried = window[-overlap:] if overlap > 0 else []
+                while carried and sum(n for _, n in carried) + piece_tokens > max_tokens:
+                    carried = carried[1:]
+                window = list(carried)
+                window_tokens = sum(n for _, n in window)
+                fresh = 0
+                
+            window.append((piece, piece_tokens))
+            window_tokens += piece_tokens
+            fresh += 1
+            
+    if fresh:
+        yield " ".join(text for text, _ in window)
+
+def batched(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most batch_size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
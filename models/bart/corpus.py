@@ -0,0 +1,148 @@
+import json
+import os
+import sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from models.bart.training import MAX_SOURCE_TOKENS, MAX_TARGET_TOKENS
+
+# Pairs tokenized per call while building a corpus
+BUILD_BATCH_SIZE = 1000
+
+def _corpus_paths(prefix: str) -> Dict[str, str]:
+    """Files making up a corpus"""
+    return {
+        "source": f"{prefix}.source.bin",
+        "target": f"{prefix}.target.bin",
+        "index": f"{prefix}.index.npy",
+        "meta": f"{prefix}.meta.json"
+    }
+
+def build_corpus(input_path: str, prefix: str, tokenizer, batch_size: int = BUILD_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Tokenize a JSONL file of source_text/target_text pairs into a memory-mappable corpus
+    
+    Token ids are appended to flat int32 files for sources and targets, and
+    an (N + 1, 2) int64 offsets index records where each pair starts. The
+    input is streamed in batches, so corpora larger than RAM can be built.
+    
+    Args:
+        input_path: JSONL file, one {"source_text", "target_text"} object per line
+        prefix: Output path prefix for the corpus files
+        tokenizer: Tokenizer used for fine-tuning
+        batch_size: Pairs tokenized per call
+        
+    Returns:
+        The corpus metadata
+    """
+    paths = _corpus_paths(prefix)
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        
+    offsets = array("q", [0, 0])
+    counts = {"source": 0, "target": 0}
+    
+    with open(input_path, "r", encoding="utf-8") as f, \
+            open(paths["source"], "wb") as source_file, \
+            open(paths["target"], "wb") as target_file:
+        
+        def flush(batch: List[Dict[str, str]]):
+            sources = tokenizer([item["source_text"] for item in batch], max_length=MAX_SOURCE_TOKENS, truncation=True)["input_ids"]
+            targets = tokenizer([item["target_text"] for item in batch], max_length=MAX_TARGET_TOKENS, truncation=True)["input_ids"]
+            for source_ids, target_ids in zip(sources, targets):
+                source_file.write(np.asarray(source_ids, dtype=np.int32).tobytes())
+                target_file.write(np.asarray(target_ids, dtype=np.int32).tobytes())
+                counts["source"] += len(source_ids)
+                counts["target"] += len(target_ids)
+                offsets.extend((counts["source"], counts["target"]))
+                
+        batch = []
+        for line in f:
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+            
+    np.save(paths["index"], np.frombuffer(offsets, dtype=np.int64).reshape(-1, 2))
+    
+    meta = {
+        "pairs": len(offsets) // 2 - 1,
+        "source_tokens": counts["source"],
+        "target_tokens": counts["target"],
+        "tokenizer": getattr(tokenizer, "name_or_path", ""),
+        "vocab_size": len(tokenizer),
+        "dtype": "int32"
+    }
+    with open(paths["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+        
+    print(f"Corpus written to {prefix}.* ({meta['pairs']} pairs)")
+    return meta
+
+class MmapCorpus(Dataset):
+    """
+    Pre-tokenized fine-tuning corpus read through memory maps
+    
+    Samples are views into the mapped token files, so nothing is tokenized or
+    copied until the batch is padded. Files are opened lazily in each process,
+    which keeps the dataset cheap to hand to DataLoader workers.
+    """
+    
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.paths = _corpus_paths(prefix)
+        with open(self.paths["meta"], "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._source: Optional[np.ndarray] = None
+        self._target: Optional[np.ndarray] = None
+        self._index: Optional[np.ndarray] = None
+        
+    def _open(self):
+        if self._index is None:
+            # Copy-on-write maps are writable views, so torch wraps them without
+            # copying; the files themselves are never modified
+            self._source = np.memmap(self.paths["source"], dtype=np.int32, mode="c")
+            self._target = np.memmap(self.paths["target"], dtype=np.int32, mode="c")
+            self._index = np.load(self.paths["index"], mmap_mode="r")
+            
+    def __getstate__(self):
+        # Workers reopen the maps instead of receiving pickled copies of them
+        state = dict(self.__dict__)
+        state.update(_source=None, _target=None, _index=None)
+        return state
+        
+    def __len__(self) -> int:
+        return self.meta["pairs"]
+        
+    def __getitem__(self, index: int) -> Dict[str, torch.Tensor]:
+        self._open()
+        source_start, target_start = self._index[index]
+        source_end, target_end = self._index[index + 1]
+        return {
+            "input_ids": torch.from_numpy(self._source[source_start:source_end]),
+            "labels": torch.from_numpy(self._target[target_start:target_end])
+        }
+        
+    def lengths(self) -> List[int]:
+        """Source token counts, read from the offsets index"""
+        self._open()
+        return np.diff(self._index[:, 0]).tolist()
+
+# Usage: python -m models.bart.corpus <input.jsonl> <output_prefix>
+if __name__ == "__main__":
+    from transformers import BartTokenizerFast
+    from models.bart.bart_model import MODEL_BASE
+    
+    if len(sys.argv) != 3:
+        raise SystemExit("Usage: python -m models.bart.corpus <input.jsonl> <output_prefix>")
+        
+    build_corpus(sys.argv[1], sys.argv[2], BartTokenizerFast.from_pretrained(MODEL_BASE))
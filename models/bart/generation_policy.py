@@ -0,0 +1,262 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Latency objective for model requests, from acceptance to response
+GENERATION_P95_TARGET_SECONDS = float(os.environ.get("GENERATION_P95_TARGET_SECONDS", "30"))
+
+# Queue depth (model requests waiting or running) at which settings get
+# lighter, and at or below which they may get heavier again
+GENERATION_QUEUE_HIGH = int(os.environ.get("GENERATION_QUEUE_HIGH", "4"))
+GENERATION_QUEUE_LOW = int(os.environ.get("GENERATION_QUEUE_LOW", "1"))
+
+# Settings only get heavier again once p95 falls below this fraction of the target
+GENERATION_RECOVERY_RATIO = float(os.environ.get("GENERATION_RECOVERY_RATIO", "0.5"))
+
+# Minimum time between two level changes, so the policy does not flap
+GENERATION_POLICY_HOLD_SECONDS = float(os.environ.get("GENERATION_POLICY_HOLD_SECONDS", "10"))
+
+# Request latencies kept for the p95 estimate, and how many are needed to trust it
+GENERATION_POLICY_WINDOW = int(os.environ.get("GENERATION_POLICY_WINDOW", "50"))
+GENERATION_POLICY_MIN_SAMPLES = int(os.environ.get("GENERATION_POLICY_MIN_SAMPLES", "5"))
+
+# Latencies older than this no longer count, so a burst that has drained is forgotten
+GENERATION_POLICY_SAMPLE_AGE_SECONDS = float(os.environ.get("GENERATION_POLICY_SAMPLE_AGE_SECONDS", "60"))
+
+# Highest level the policy may reach; 0 keeps full-quality settings under any load
+GENERATION_POLICY_MAX_LEVEL = int(os.environ.get("GENERATION_POLICY_MAX_LEVEL", "3"))
+
+# Degradation levels, lightest last. "settings" override the generate()
+# kwargs built from LEARNING_SPEED_PARAMS and GENERATION_DEFAULTS (None
+# removes a kwarg); "length_scale" shrinks min_length and max_length.
+POLICY_LEVELS = [
+    {"name": "full", "settings": {}, "length_scale": 1.0},
+    {"name": "reduced_beams", "settings": {"num_beams": 2}, "length_scale": 1.0},
+    {"name": "greedy", "settings": {"num_beams": 1, "early_stopping": None, "length_penalty": None}, "length_scale": 1.0},
+    {"name": "greedy_short", "settings": {"num_beams": 1, "early_stopping": None, "length_penalty": None}, "length_scale": 0.5}
+]
+
+class GenerationPolicy:
+    """
+    Chooses generate() settings from the current load
+    
+    Model requests are tracked with track(), which counts the queue depth
+    and records each request's latency. When the depth reaches queue_high or
+    the p95 latency of recent requests exceeds the target, the policy moves
+    one level down POLICY_LEVELS to lighter settings. It moves back up only
+    once the depth is at or below queue_low and p95 is below
+    recovery_ratio x target, or the queue is empty. Every move waits at
+    least hold_seconds after the previous one, and the latency window is
+    cleared on each move, so a level is judged only by its own requests;
+    latencies older than sample_age_seconds, or recorded before the policy
+    sat idle for hold_seconds, are dropped as well.
+    
+    The level is fixed for a request when it starts, so all generate()
+    calls of one request use the same settings. Work outside a tracked
+    request, such as the upload job pipeline whose results are stored,
+    always gets full-quality settings.
+    """
+    
+    def __init__(self, target_p95_seconds: float = GENERATION_P95_TARGET_SECONDS,
+                 queue_high: int = GENERATION_QUEUE_HIGH, queue_low: int = GENERATION_QUEUE_LOW,
+                 recovery_ratio: float = GENERATION_RECOVERY_RATIO, hold_seconds: float = GENERATION_POLICY_HOLD_SECONDS,
+                 window: int = GENERATION_POLICY_WINDOW, min_samples: int = GENERATION_POLICY_MIN_SAMPLES,
+                 sample_age_seconds: float = GENERATION_POLICY_SAMPLE_AGE_SECONDS, max_level: int = GENERATION_POLICY_MAX_LEVEL, levels: Optional[List[Dict[str, Any]]] = None):
+        self.levels = levels or POLICY_LEVELS
+        self.target_p95_seconds = target_p95_seconds
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.recovery_ratio = recovery_ratio
+        self.hold_seconds = hold_seconds
+        self.min_samples = min_samples
+        self.sample_age_seconds = sample_age_seconds
+        self.max_level = max(0, min(max_level, len(self.levels) - 1))
+        
+        self.level = 0
+        self.depth = 0
+        self.changed_at = time.monotonic()
+        self.finished_at = self.changed_at
+        # (time.monotonic() at completion, latency in seconds)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _p95_locked(self) -> Optional[float]:
+        cutoff = time.monotonic() - self.sample_age_seconds
+        while self._latencies and self._latencies[0][0] < cutoff:
+            self._latencies.popleft()
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(latency for _, latency in self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+    
+    def _set_level_locked(self, level: int, now: float):
+        if level != self.level:
+            print(f"Generation policy: {self.levels[self.level]['name']} -> {self.levels[level]['name']} "
+                  f"(queue depth {self.depth}, p95 {self._p95_locked()})")
+            self.level = level
+            self.changed_at = now
+            self._latencies.clear()
+    
+    def _update_locked(self, now: float):
+        """Move one level if the load calls for it and the hold time has passed"""
+        held = now - self.changed_at
+        if held < self.hold_seconds:
+            return
+        idle = now - self.finished_at if self.depth == 0 else 0.0
+        if idle >= self.hold_seconds:
+            # Latencies from before the pause, queueing included, no longer describe the load
+            self._latencies.clear()
+        p95 = self._p95_locked()
+        overloaded = self.depth >= self.queue_high or (p95 is not None and p95 > self.target_p95_seconds)
+        if overloaded:
+            self._set_level_locked(min(self.level + 1, self.max_level), now)
+        elif idle >= self.hold_seconds:
+            # Recover one level for every hold period spent without work
+            self._set_level_locked(max(0, self.level - int(idle // self.hold_seconds)), now)
+        elif self.depth <= self.queue_low and p95 is not None and p95 < self.target_p95_seconds * self.recovery_ratio:
+            self._set_level_locked(max(0, self.level - 1), now)
+    
+    def enqueued(self):
+        """Count a model request that is waiting for a worker"""
+        with self._lock:
+            self.depth += 1
+    
+    def dequeued(self):
+        """Uncount a request counted by enqueued() once a worker picks it up"""
+        with self._lock:
+            self.depth -= 1
+    
+    @contextmanager
+    def track(self, submitted: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run one model request under the policy
+        
+        Args:
+            submitted: time.perf_counter() when the request was accepted, so
+                its latency includes time spent queued; defaults to now
+        
+        Yields:
+            Description of the level in force for the request, for the
+            response metadata. result_level and result_policy name the
+            level the returned result was generated at, which is a heavier
+            one when it came from the result cache.
+        """
+        start = time.perf_counter() if submitted is None else submitted
+        with self._lock:
+            self._update_locked(time.monotonic())
+            level = self.level
+            info = {
+                "level": level,
+                "policy": self.levels[level]["name"],
+                "result_level": level,
+                "result_policy": self.levels[level]["name"],
+                "queue_depth": self.depth,
+                "p95_seconds": self._p95_locked(),
+                "target_p95_seconds": self.target_p95_seconds
+            }
+            self.depth += 1
+        
+        outer = getattr(self._local, "level", None)
+        outer_info = getattr(self._local, "info", None)
+        self._local.level = level
+        self._local.info = info
+        try:
+            yield info
+        finally:
+            if outer is None:
+                del self._local.level
+                del self._local.info
+            else:
+                self._local.level = outer
+                self._local.info = outer_info
+            with self._lock:
+                self.depth -= 1
+                # Latencies from the previous level would mislead the new one
+                self.finished_at = time.monotonic()
+                if level == self.level:
+                    self._latencies.append((self.finished_at, time.perf_counter() - start))
+                self._update_locked(self.finished_at)
+    
+    def current_level(self) -> int:
+        """Level of the request on this thread; 0 for work outside a tracked request"""
+        return getattr(self._local, "level", 0)
+    
+    def record_result_level(self, level: int):
+        """Note that the current request is answered with a result generated at level"""
+        info = getattr(self._local, "info", None)
+        if info is not None:
+            info["result_level"] = level
+            info["result_policy"] = self.levels[level]["name"]
+    
+    def usable_levels(self) -> List[int]:
+        """Levels whose output the current request may reuse, best quality first down to its own"""
+        return list(range(self.current_level() + 1))
+    
+    def result_id(self, model_id: str, level: Optional[int] = None) -> str:
+        """
+        Model identity for result cache keys, so output from lighter settings is cached apart
+        
+        Args:
+            model_id: Identity of the loaded weights
+            level: Level the result was generated at; the current request's by default
+        """
+        level = self.current_level() if level is None else level
+        return model_id if level == 0 else f"{model_id}@{self.levels[level]['name']}"
+    
+    def result_ids(self, model_id: str) -> List[str]:
+        """
+        Identities to look a result up under, best quality first
+        
+        A request running at a lighter level still prefers a cached result
+        from heavier settings, which costs nothing to reuse. Its own output
+        is stored under result_id() only, so degraded output never takes
+        the place of a better result.
+        """
+        return [self.result_id(model_id, level) for level in self.usable_levels()]
+    
+    def apply(self, generation_kwargs: Dict[str, Any], level: Optional[int] = None) -> Dict[str, Any]:
+        """
+        generate() kwargs adjusted for a level
+        
+        Args:
+            generation_kwargs: Full-quality kwargs
+            level: Level to apply; the current request's by default
+        
+        Returns:
+            A new dict; the input is not modified
+        """
+        spec = self.levels[self.current_level() if level is None else level]
+        adjusted = dict(generation_kwargs)
+        for key, value in spec["settings"].items():
+            if value is None:
+                adjusted.pop(key, None)
+            else:
+                adjusted[key] = value
+        
+        scale = spec["length_scale"]
+        if scale < 1.0 and "max_length" in adjusted:
+            min_length = int(adjusted.get("min_length", 0) * scale)
+            if "min_length" in adjusted:
+                adjusted["min_length"] = min_length
+            adjusted["max_length"] = max(min_length + 1, int(adjusted["max_length"] * scale))
+        return adjusted
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current level, queue depth and p95"""
+        with self._lock:
+            return {
+                "level": self.level,
+                "policy": self.levels[self.level]["name"],
+                "queue_depth": self.depth,
+                "p95_seconds": self._p95_locked(),
+                "target_p95_seconds": self.target_p95_seconds,
+                "samples": len(self._latencies)
+            }
+
+# Shared by the bridge, which tracks requests, and BartModelHandler, which applies the settings
+generation_policy = GenerationPolicy()
@@ -0,0 +1,199 @@
+import os
+import time
+import torch
+from typing import Any, Dict, List, Optional
+
+# Opt-in dynamic int8 quantization for CPU inference
+QUANTIZE_DEFAULT = os.environ.get("BART_QUANTIZE", "").lower() in ("1", "true", "yes")
+
+# Where the quantized model is stored so later processes skip re-quantizing
+QUANTIZED_MODEL_PATH = os.environ.get("BART_QUANTIZED_MODEL_PATH", "models/bart/quantized_model.pt")
+
+# Fixed inputs for comparing fp32 and int8 summaries
+PARITY_SAMPLES = [
+    """
+    Object-Oriented Programming (OOP) is a programming paradigm based on the concept of "objects",
+    which can contain data and code: data in the form of fields, and code in the form of procedures.
+    A feature of objects is that an object's own procedures can access and often modify the data
+    fields of itself. In OOP, computer programs are designed by making them out of objects that
+    interact with one another. Most popular OOP languages are class-based, meaning that objects are
+    instances of classes, which also determine their types.
+    """,
+    """
+    A hash table is a data structure that maps keys to values. It uses a hash function to compute an
+    index into an array of buckets, from which the desired value can be found. Ideally the hash
+    function assigns each key to a unique bucket, but most designs use an imperfect function, which
+    can cause collisions where the function generates the same index for more than one key. Such
+    collisions are handled with techniques such as separate chaining or open addressing. On average,
+    lookups, insertions and deletions take constant time.
+    """,
+    """
+    Photosynthesis is the process used by plants, algae and some bacteria to convert light energy into
+    chemical energy stored in glucose. It takes place mainly in the chloroplasts of leaf cells, where
+    chlorophyll absorbs light. In the light-dependent reactions, water is split and oxygen is released,
+    producing ATP and NADPH. In the Calvin cycle, these molecules are used to fix carbon dioxide from
+    the air into sugars. The overall rate depends on light intensity, carbon dioxide concentration and
+    temperature.
+    """,
+    """
+    The French Revolution was a period of political and societal change in France that began with the
+    Estates General of 1789 and ended with the coup of Napoleon Bonaparte in 1799. Many of its ideas are
+    considered fundamental principles of liberal democracy, while its values and institutions remain
+    central to modern French political discourse. Its causes are generally agreed to be a combination
+    of social, political and economic factors which the existing regime proved unable to manage.
+    """
+]
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """Apply dynamic int8 quantization to every Linear layer of a model"""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def save_quantized_model(model: torch.nn.Module, source_id: str, fingerprint: str, path: str = QUANTIZED_MODEL_PATH):
+    """
+    Save a quantized model together with the identity of the model it came from
+    
+    Args:
+        model: Quantized model
+        source_id: Identity of the fp32 model that was quantized
+        fingerprint: Fingerprint of the fp32 weights (artifacts.weights_fingerprint)
+        path: File to write
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    torch.save({"source_id": source_id, "fingerprint": fingerprint, "model": model}, path)
+    print(f"Quantized model saved to {path}")
+
+def load_quantized_model(source_id: str, fingerprint: str, path: str = QUANTIZED_MODEL_PATH) -> Optional[torch.nn.Module]:
+    """
+    Load a previously saved quantized model
+    
+    Args:
+        source_id: Identity of the fp32 model the caller expects
+        fingerprint: Fingerprint of the fp32 weights the caller expects
+        path: File to read
+        
+    Returns:
+        The quantized model, or None if the file is missing or was made from
+        a different model or from older weights of the same model
+    """
+    if not os.path.exists(path):
+        return None
+        
+    try:
+        saved = torch.load(path, weights_only=False)
+    except Exception as e:
+        print(f"Error loading quantized model: {e}")
+        return None
+        
+    if saved.get("source_id") != source_id:
+        print(f"Ignoring quantized model at {path}: built from {saved.get('source_id')}, expected {source_id}")
+        return None
+    if saved.get("fingerprint") != fingerprint:
+        print(f"Ignoring quantized model at {path}: built from other weights of {source_id}")
+        return None
+        
+    return saved["model"]
+
+def _lcs_length(a: List[str], b: List[str]) -> int:
+    """Length of the longest common subsequence of two token lists"""
+    previous = [0] * (len(b) + 1)
+    for token_a in a:
+        current = [0]
+        for j, token_b in enumerate(b):
+            current.append(previous[j] + 1 if token_a == token_b else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+def rouge_scores(reference: str, candidate: str) -> Dict[str, float]:
+    """
+    ROUGE-1 and ROUGE-L F1 between two texts, on lowercased whitespace tokens
+    
+    Args:
+        reference: Reference text (fp32 output)
+        candidate: Candidate text (int8 output)
+        
+    Returns:
+        Dictionary with "rouge1" and "rougeL" F1 scores
+    """
+    ref_tokens = reference.lower().split()
+    cand_tokens = candidate.lower().split()
+    if not ref_tokens or not cand_tokens:
+        return {"rouge1": float(ref_tokens == cand_tokens), "rougeL": float(ref_tokens == cand_tokens)}
+        
+    def f1(overlap: int) -> float:
+        if overlap == 0:
+            return 0.0
+        precision = overlap / len(cand_tokens)
+        recall = overlap / len(ref_tokens)
+        return 2 * precision * recall / (precision + recall)
+        
+    ref_counts: Dict[str, int] = {}
+    for token in ref_tokens:
+        ref_counts[token] = ref_counts.get(token, 0) + 1
+    unigram_overlap = 0
+    for token in cand_tokens:
+        if ref_counts.get(token, 0) > 0:
+            ref_counts[token] -= 1
+            unigram_overlap += 1
+            
+    return {"rouge1": f1(unigram_overlap), "rougeL": f1(_lcs_length(ref_tokens, cand_tokens))}
+
+def _model_size_mb(model: torch.nn.Module) -> float:
+    """Size of a model's serialized state dict in MB"""
+    total = 0
+    for value in model.state_dict().values():
+        if isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, tuple):
+            # Packed params of dynamically quantized Linear layers
+            total += sum(v.numel() * v.element_size() for v in value if isinstance(v, torch.Tensor))
+    return total / (1024 * 1024)
+
+def run_parity_check(learning_speed: str = "moderate", samples: List[str] = PARITY_SAMPLES) -> Dict[str, Any]:
+    """
+    Compare fp32 and int8 summaries over a fixed sample set
+    
+    Args:
+        learning_speed: Learning speed used for every summary
+        samples: Input texts
+        
+    Returns:
+        Dictionary with mean ROUGE scores, latencies and model sizes
+    """
+    from models.bart.bart_model import BartModelHandler
+    
+    fp32 = BartModelHandler(quantize=False)
+    int8 = BartModelHandler(quantize=True)
+    
+    report = {
+        "samples": len(samples),
+        "fp32_seconds": 0.0,
+        "int8_seconds": 0.0,
+        "rouge1": 0.0,
+        "rougeL": 0.0,
+        "fp32_size_mb": _model_size_mb(fp32.model),
+        "int8_size_mb": _model_size_mb(int8.model)
+    }
+    
+    for sample in samples:
+        start = time.perf_counter()
+        reference = fp32.generate_summary(sample, learning_speed)["summary"]
+        report["fp32_seconds"] += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        candidate = int8.generate_summary(sample, learning_speed)["summary"]
+        report["int8_seconds"] += time.perf_counter() - start
+        
+        scores = rouge_scores(reference, candidate)
+        report["rouge1"] += scores["rouge1"] / len(samples)
+        report["rougeL"] += scores["rougeL"] / len(samples)
+        
+    report["speedup"] = report["fp32_seconds"] / report["int8_seconds"] if report["int8_seconds"] else 0.0
+    return report
+
+# Usage example: python -m models.bart.quantization
+if __name__ == "__main__":
+    import json
+    
+    print(json.dumps(run_parity_check(), indent=2))
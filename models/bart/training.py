@@ -0,0 +1,150 @@
+import os
+import random
+import torch
+from torch.utils.data import Dataset, Sampler
+from typing import Any, Dict, Iterator, List, Optional
+
+# Token limits for fine-tuning pairs, matching the inference-time encoder window
+MAX_SOURCE_TOKENS = 1024
+MAX_TARGET_TOKENS = 512
+
+# Batches are formed from pools of this many batches' worth of similar-length
+# samples, trading padding waste against ordering randomness
+BUCKET_POOL_BATCHES = 50
+
+# Label value ignored by the loss
+LABEL_PAD_ID = -100
+
+class SummarizationDataset(Dataset):
+    """
+    source_text/target_text pairs, tokenized lazily in DataLoader workers
+    """
+    
+    def __init__(self, train_data: List[Dict[str, str]], tokenizer):
+        self.train_data = train_data
+        self.tokenizer = tokenizer
+        
+    def __len__(self) -> int:
+        return len(self.train_data)
+        
+    def __getitem__(self, index: int) -> Dict[str, List[int]]:
+        item = self.train_data[index]
+        return {
+            "input_ids": self.tokenizer.encode(item["source_text"], max_length=MAX_SOURCE_TOKENS, truncation=True),
+            "labels": self.tokenizer.encode(item["target_text"], max_length=MAX_TARGET_TOKENS, truncation=True)
+        }
+        
+    def lengths(self) -> List[int]:
+        """Approximate sample sizes for length bucketing, without tokenizing"""
+        return [len(item["source_text"]) for item in self.train_data]
+
+class LengthBucketSampler(Sampler):
+    """
+    Yield batches of indices whose samples have similar lengths
+    
+    Each epoch the indices are shuffled and cut into pools. Each pool is
+    sorted by length and split into batches, and the batch order is shuffled
+    again. Padding stays small without feeding batches strictly shortest-first.
+    """
+    
+    def __init__(self, lengths: List[int], batch_size: int, seed: int = 0):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+        self.skip_batches = 0
+        
+    def set_epoch(self, epoch: int, skip_batches: int = 0):
+        """Select the epoch's ordering, optionally skipping batches already trained on"""
+        self.epoch = epoch
+        self.skip_batches = skip_batches
+        
+    def _batches(self) -> List[List[int]]:
+        rng = random.Random(self.seed + self.epoch)
+        indices = list(range(len(self.lengths)))
+        rng.shuffle(indices)
+        
+        pool_size = self.batch_size * BUCKET_POOL_BATCHES
+        batches = []
+        for start in range(0, len(indices), pool_size):
+            pool = sorted(indices[start:start + pool_size], key=lambda index: self.lengths[index])
+            batches.extend(pool[i:i + self.batch_size] for i in range(0, len(pool), self.batch_size))
+        rng.shuffle(batches)
+        return batches
+        
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self._batches()[self.skip_batches:])
+        
+    def __len__(self) -> int:
+        return max(0, -(-len(self.lengths) // self.batch_size) - self.skip_batches)
+
+def collate_batch(items: List[Dict[str, Any]], pad_token_id: int) -> Dict[str, torch.Tensor]:
+    """
+    Pad a list of tokenized samples into batch tensors
+    
+    Args:
+        items: Samples with "input_ids" and "labels" token sequences
+        pad_token_id: Tokenizer padding id for inputs; labels are padded with LABEL_PAD_ID
+        
+    Returns:
+        input_ids, attention_mask and labels tensors
+    """
+    source_length = max(len(item["input_ids"]) for item in items)
+    target_length = max(len(item["labels"]) for item in items)
+    
+    input_ids = torch.full((len(items), source_length), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(items), source_length), dtype=torch.long)
+    labels = torch.full((len(items), target_length), LABEL_PAD_ID, dtype=torch.long)
+    
+    for row, item in enumerate(items):
+        source = torch.as_tensor(item["input_ids"], dtype=torch.long)
+        target = torch.as_tensor(item["labels"], dtype=torch.long)
+        input_ids[row, :len(source)] = source
+        attention_mask[row, :len(source)] = 1
+        labels[row, :len(target)] = target
+        
+    return {"input_ids": input_ids, "attention_mask": attention_mask, "labels": labels}
+
+def save_checkpoint(checkpoint_dir: str, model: torch.nn.Module, optimizer: torch.optim.Optimizer,
+                    epoch: int, next_batch: int, step: int):
+    """
+    Atomically write a resumable training checkpoint
+    
+    Args:
+        checkpoint_dir: Directory holding checkpoint.pt
+        model: Model being trained
+        optimizer: Its optimizer
+        epoch: Current epoch
+        next_batch: Index of the first batch of the epoch not yet trained on
+        step: Number of optimizer steps taken so far
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, "checkpoint.pt")
+    tmp_path = path + ".tmp"
+    torch.save({
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "epoch": epoch,
+        "next_batch": next_batch,
+        "step": step
+    }, tmp_path)
+    os.replace(tmp_path, path)
+    print(f"Checkpoint saved at step {step} (resumes at epoch {epoch + 1}, batch {next_batch})")
+
+def load_checkpoint(checkpoint_dir: str, model: torch.nn.Module, optimizer: torch.optim.Optimizer) -> Optional[Dict[str, int]]:
+    """
+    Restore model and optimizer state from a checkpoint, if one exists
+    
+    Returns:
+        Dictionary with epoch, next_batch and step, or None if there is no checkpoint
+    """
+    path = os.path.join(checkpoint_dir, "checkpoint.pt")
+    if not os.path.exists(path):
+        return None
+        
+    checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    model.load_state_dict(checkpoint["model"])
+    optimizer.load_state_dict(checkpoint["optimizer"])
+    print(f"Resumed from step {checkpoint['step']} (epoch {checkpoint['epoch'] + 1}, batch {checkpoint['next_batch']})")
+    
+    return {key: checkpoint[key] for key in ("epoch", "next_batch", "step")}
@@ -1,21 +1,78 @@
+import os
 import sys
 import json
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, TextIO, Callable
 
-# Import model bridge functionality
-from model_bridge import (
-    generate_summary,
-    generate_quiz,
-    generate_flashcards,
-    classify_user
-)
+# Import model bridge functionality. Running as `python -m models.bridge_server`
+# from the project root resolves the package path; running the file directly
+# from inside models/ resolves the sibling module.
+try:
+    from models import model_bridge
+    from models.model_bridge import (
+        generate_summary,
+        generate_quiz,
+        generate_flashcards,
+        generate_all,
+        stream_summary,
+        classify_user,
+        classify_users,
+        get_cache_stats,
+        get_model_status
+    )
+    from models import profiling
+    from models.bart.batching import BATCH_WINDOW_MS, MAX_BATCH_SIZE
+    from models.bart.generation_policy import generation_policy
+    from models.telemetry import telemetry
+except ImportError:
+    import model_bridge
+    from model_bridge import (
+        generate_summary,
+        generate_quiz,
+        generate_flashcards,
+        generate_all,
+        stream_summary,
+        classify_user,
+        classify_users,
+        get_cache_stats,
+        get_model_status
+    )
+    import profiling
+    from bart.batching import BATCH_WINDOW_MS, MAX_BATCH_SIZE
+    # Share model_bridge's instances; importing the sibling modules again
+    # would create a second registry and policy that the models never update
+    generation_policy = model_bridge.generation_policy
+    telemetry = model_bridge.telemetry
 
-def handle_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
+# Actions that run BART generation; everything else is cheap and is served
+# from a separate pool so it never queues behind a beam search.
+MODEL_ACTIONS = {"generate_summary", "generate_quiz", "generate_flashcards", "generate_all", "stream_summary"}
+
+# Worker counts for the two executors used in persistent mode. With BART
+# micro-batching enabled, enough model workers must be in flight at once to
+# fill a batch, so the default follows the maximum batch size.
+MODEL_WORKERS = int(os.environ.get("BRIDGE_MODEL_WORKERS", str(MAX_BATCH_SIZE if BATCH_WINDOW_MS > 0 else 1)))
+LIGHT_WORKERS = int(os.environ.get("BRIDGE_LIGHT_WORKERS", "4"))
+
+def handle_request(request_data: Dict[str, Any], emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   submitted: Optional[float] = None) -> Dict[str, Any]:
     """
     Handle incoming request from Node.js and route to appropriate model function
     
     Args:
         request_data: Dictionary containing action and parameters
+        emit: Optional callback receiving partial-response frames for streaming
+            actions; without it only the final response is produced
+        submitted: time.perf_counter() when the request was accepted, if it
+            was queued before this call
+            
+    Model actions run under the load-adaptive generation policy, and the
+    settings level they ran at is recorded in response["meta"]["generation"].
+    A request with a top-level "profile" flag (true, "cprofile", "torch" or
+    "both") when BRIDGE_PROFILE_REQUESTS=1, or one picked by
+    BRIDGE_PROFILE_SAMPLE_RATE, runs under the profiler and the written files are listed in response["meta"]["profile"].
         
     Returns:
         Response data to be returned to Node.js
@@ -31,6 +88,34 @@ def handle_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
         "data": None
     }
     
+    profile_modes = profiling.requested_modes(request_data, sampled=action in MODEL_ACTIONS)
+    
+    with telemetry.action(action or "unknown") as outcome:
+        if action in MODEL_ACTIONS:
+            with generation_policy.track(submitted) as policy:
+                _dispatch_profiled(action, params, request_id, response, emit, profile_modes)
+            response.setdefault("meta", {})["generation"] = policy
+            telemetry.increment("generation_policy_requests_total", action=action, policy=policy["policy"])
+        else:
+            _dispatch_profiled(action, params, request_id, response, emit, profile_modes)
+        if not response["success"]:
+            outcome["status"] = "error"
+            
+    return response
+
+def _dispatch_profiled(action: str, params: Dict[str, Any], request_id: str, response: Dict[str, Any],
+                       emit: Optional[Callable[[Dict[str, Any]], None]], profile_modes: List[str]):
+    """Run _dispatch, under the requested profilers if any"""
+    if not profile_modes:
+        _dispatch(action, params, request_id, response, emit)
+        return
+    with profiling.capture(request_id, profile_modes) as profile:
+        _dispatch(action, params, request_id, response, emit)
+    response.setdefault("meta", {})["profile"] = profile
+
+def _dispatch(action: str, params: Dict[str, Any], request_id: str, response: Dict[str, Any],
+              emit: Optional[Callable[[Dict[str, Any]], None]]):
+    """Run the model function for action and fill in the response envelope"""
     try:
         if action == "generate_summary":
             content = params.get("content", "")
@@ -40,6 +125,23 @@ def handle_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
             response["data"] = summary_data
             response["success"] = True
             
+        elif action == "stream_summary":
+            content = params.get("content", "")
+            learning_speed = params.get("learning_speed", "moderate")
+            
+            # Partial frames carry the new text; this response is the final frame
+            for event in stream_summary(content, learning_speed):
+                if "delta" in event:
+                    if emit is not None:
+                        emit({
+                            "request_id": request_id,
+                            "partial": True,
+                            "data": {"delta": event["delta"]}
+                        })
+                else:
+                    response["data"] = event["result"]
+            response["success"] = True
+            
         elif action == "generate_quiz":
             content = params.get("content", "")
             learning_speed = params.get("learning_speed", "moderate")
@@ -56,6 +158,14 @@ def handle_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
             response["data"] = flashcards_data
             response["success"] = True
             
+        elif action == "generate_all":
+            content = params.get("content", "")
+            learning_speed = params.get("learning_speed", "moderate")
+            learning_speeds = params.get("learning_speeds", {})
+            
+            response["data"] = generate_all(content, learning_speed, learning_speeds)
+            response["success"] = True
+            
         elif action == "classify_user":
             responses = params.get("responses", {})
             
@@ -63,20 +173,174 @@ def handle_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
             response["data"] = {"learning_speed": classification}
             response["success"] = True
             
+        elif action == "classify_users":
+            responses_list = params.get("responses_list", [])
+            
+            classifications = classify_users(responses_list)
+            response["data"] = {"learning_speeds": classifications}
+            response["success"] = True
+            
+        elif action == "status":
+            response["data"] = get_model_status()
+            response["success"] = True
+            
+        elif action == "cache_stats":
+            response["data"] = get_cache_stats()
+            response["success"] = True
+            
+        elif action == "stats":
+            response["data"] = dict(telemetry.snapshot(), generation_policy=generation_policy.stats())
+            response["success"] = True
+            
         else:
             response["error"] = f"Unknown action: {action}"
             
     except Exception as e:
         response["error"] = str(e)
+
+def _error_response(request_id: str, message: str) -> Dict[str, Any]:
+    """Build a failed response envelope"""
+    return {
+        "success": False,
+        "request_id": request_id,
+        "error": message,
+        "data": None
+    }
+
+class RequestDispatcher:
+    """
+    Run bridge requests concurrently and write each response as soon as it is ready
+    
+    BART actions go to the model executor, while classification and requests
+    that will be answered by the mock fallbacks go to the light executor.
+    Responses are therefore written out of order; callers match them to
+    requests by `request_id`.
+    """
+    
+    def __init__(self, output_stream: TextIO, model_workers: int = MODEL_WORKERS, light_workers: int = LIGHT_WORKERS):
+        self.output_stream = output_stream
+        self._write_lock = threading.Lock()
+        self.model_executor = ThreadPoolExecutor(max_workers=model_workers, thread_name_prefix="bridge-model")
+        self.light_executor = ThreadPoolExecutor(max_workers=light_workers, thread_name_prefix="bridge-light")
         
-    return response
+    def _executor_for(self, request_data: Dict[str, Any]) -> ThreadPoolExecutor:
+        """Pick the executor for a request based on its action"""
+        if request_data.get("action") in MODEL_ACTIONS and not model_bridge.bart_using_mocks():
+            return self.model_executor
+        return self.light_executor
+        
+    def submit(self, request_data: Dict[str, Any]):
+        """Schedule a request; its response is written when it completes"""
+        if request_data.get("action") in MODEL_ACTIONS:
+            # Waiting model requests count toward the generation policy's queue depth
+            generation_policy.enqueued()
+        self._executor_for(request_data).submit(self._run, request_data, time.perf_counter())
+        
+    def _run(self, request_data: Dict[str, Any], submitted: float):
+        """Handle a request on a worker thread and write its response"""
+        action = request_data.get("action", "") or "unknown"
+        telemetry.observe_stage("queue_wait", time.perf_counter() - submitted, action)
+        if action in MODEL_ACTIONS:
+            generation_policy.dequeued()
+        try:
+            response = handle_request(request_data, emit=self.write_response, submitted=submitted)
+        except Exception as e:
+            response = _error_response(request_data.get("request_id", "unknown"), str(e))
+        self.write_response(response, action)
+        
+    def write_response(self, response: Dict[str, Any], action: Optional[str] = None):
+        """Write one response line, serialised against other workers"""
+        start = time.perf_counter()
+        line = json.dumps(response) + "\n"
+        if action is not None:
+            telemetry.observe_stage("serialize", time.perf_counter() - start, action)
+        with self._write_lock:
+            self.output_stream.write(line)
+            self.output_stream.flush()
+            
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for in-flight requests"""
+        self.light_executor.shutdown(wait=wait)
+        self.model_executor.shutdown(wait=wait)
+
+def serve_forever(input_stream: TextIO, output_stream: TextIO):
+    """
+    Serve newline-delimited JSON requests until the input stream is closed
+    
+    Each input line is one request carrying a `request_id`; each response is
+    written as a single line with the same `request_id`. Requests are handled
+    concurrently by a RequestDispatcher, so responses may arrive in a different
+    order than the requests. The model singletons in model_bridge are loaded on
+    first use and reused for every later request.
+    
+    Args:
+        input_stream: Stream to read requests from (normally stdin)
+        output_stream: Stream to write responses to (normally stdout)
+    """
+    dispatcher = RequestDispatcher(output_stream)
+    
+    try:
+        # readline() returns as soon as a full line is available, so a request is
+        # answered without waiting for the writer to close the pipe.
+        for line in iter(input_stream.readline, ""):
+            line = line.strip()
+            if not line:
+                continue
+                
+            try:
+                request_data = json.loads(line)
+            except ValueError as e:
+                dispatcher.write_response(_error_response("unknown", f"Invalid request JSON: {str(e)}"))
+                continue
+                
+            if not isinstance(request_data, dict):
+                dispatcher.write_response(_error_response("unknown", "Request must be a JSON object"))
+                continue
+                
+            dispatcher.submit(request_data)
+    finally:
+        # Finish everything already accepted before the process exits
+        dispatcher.shutdown(wait=True)
 
-def main():
+def _persistent_mode_requested(argv) -> bool:
+    """Check the command line and environment for persistent worker mode"""
+    if "--persistent" in argv:
+        return True
+    return os.environ.get("BRIDGE_PERSISTENT", "").lower() in ("1", "true", "yes")
+
+def main(argv: Optional[list] = None):
     """
     Main entry point for the bridge server
     
-    Reads JSON request from stdin and writes JSON response to stdout
+    By default reads a single JSON request from stdin until EOF and writes one
+    JSON response to stdout. With `--persistent` (or BRIDGE_PERSISTENT=1) the
+    process stays up and serves newline-delimited requests instead. With
+    `--warmup` (or MODEL_WARMUP=1) both models start loading in the
+    background immediately.
+    
+    Requests wait for a model that is still loading, except in a persistent
+    bridge that is warming up: it answers from the fallbacks after
+    MODEL_WAIT_TIMEOUT_SECONDS rather than stall every client behind the load.
     """
+    argv = sys.argv[1:] if argv is None else argv
+    
+    warm_up = "--warmup" in argv or model_bridge.MODEL_WARMUP
+    if warm_up:
+        model_bridge.warm_up()
+        
+    if _persistent_mode_requested(argv):
+        if warm_up:
+            model_bridge.enable_wait_timeout()
+        # Model code reports progress with print(); keep stdout reserved for
+        # response frames so a log line can never corrupt the protocol.
+        protocol_out = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            serve_forever(sys.stdin, protocol_out)
+        finally:
+            sys.stdout = protocol_out
+        return
+        
     try:
         # Read request from stdin
         request_json = ""
@@ -103,4 +367,4 @@ def main():
         }))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -1,39 +1,152 @@
 import os
 import sys
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator, Optional, Tuple
 
 # Add the models directory to the path to import the model classes
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import model handlers
-from models.bart.bart_model import BartModelHandler
-from models.xgboost.xgboost_classifier import UserClassifier
+from models.result_cache import ResultCache, make_cache_key
+from models.model_loader import ModelLoader
+from models.telemetry import telemetry
+from models.bart.generation_policy import generation_policy
 
-# Singleton instances to prevent loading models multiple times
-bart_handler = None
-classifier = None
+# Start loading both models in the background as soon as the bridge starts
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "").lower() in ("1", "true", "yes")
 
-def get_bart_handler():
-    """Get or initialize the BART model handler"""
-    global bart_handler
-    if bart_handler is None:
+# How long a request waits for a model that is still loading before using the
+# mock/rule-based path. 0 never waits; a negative value waits for the load to
+# finish however long it takes. Only the persistent bridge applies it, once
+# warm-up has started (see enable_wait_timeout); everywhere else a request
+# waits for the load, since its answer is all that process will produce.
+MODEL_WAIT_TIMEOUT_SECONDS = float(os.environ.get("MODEL_WAIT_TIMEOUT_SECONDS", "10"))
+MODEL_WAIT_TIMEOUT = None
+
+# Generated results keyed by content hash, shared by all requests in the process
+result_cache = ResultCache()
+
+def _load_bart_handler():
+    """Build the BART model handler"""
+    # Imported here so torch and transformers load off the request path
+    from models.bart.bart_model import BartModelHandler
+    
+    handler = BartModelHandler()
+    # Share one cache between whole results and long-document window summaries
+    handler.chunk_cache = result_cache
+    return handler
+
+def _load_user_classifier():
+    """Build the user classifier"""
+    from models.xgboost.tree_predictor import CompiledClassifier, COMPILED_MODEL_PATH
+    
+    # The compiled export answers with NumPy alone, without importing xgboost or pandas
+    if os.path.exists(COMPILED_MODEL_PATH):
         try:
-            bart_handler = BartModelHandler()
-        except Exception as e:
-            print(f"Error initializing BART model: {e}")
-            return None
-    return bart_handler
+            return CompiledClassifier()
+        except ValueError as e:
+            print(f"Ignoring compiled model: {e}")
+        
+    from models.xgboost.xgboost_classifier import UserClassifier
+    
+    return UserClassifier()
+
+# Singleton loaders to prevent loading models multiple times
+bart_loader = ModelLoader("BART model", _load_bart_handler)
+classifier_loader = ModelLoader("user classifier", _load_user_classifier)
+
+def warm_up():
+    """Start loading BART and the user classifier in background threads"""
+    bart_loader.start()
+    classifier_loader.start()
+
+def enable_wait_timeout():
+    """Stop requests waiting past MODEL_WAIT_TIMEOUT_SECONDS for a model that is still loading"""
+    global MODEL_WAIT_TIMEOUT
+    MODEL_WAIT_TIMEOUT = MODEL_WAIT_TIMEOUT_SECONDS if MODEL_WAIT_TIMEOUT_SECONDS >= 0 else None
+
+def get_bart_handler():
+    """Get or initialize the BART model handler, None while unavailable"""
+    return bart_loader.get(MODEL_WAIT_TIMEOUT)
 
 def get_user_classifier():
-    """Get or initialize the user classifier"""
-    global classifier
-    if classifier is None:
-        try:
-            classifier = UserClassifier()
-        except Exception as e:
-            print(f"Error initializing user classifier: {e}")
-            return None
-    return classifier
+    """Get or initialize the user classifier, None while unavailable"""
+    return classifier_loader.get(MODEL_WAIT_TIMEOUT)
+
+def bart_using_mocks() -> bool:
+    """
+    Whether generation requests are currently being served by the mock fallbacks
+    
+    A load in progress counts as mock-served unless requests wait for it
+    without limit: a load that outlasts the wait leaves the request on the
+    mock path, and the full model load takes far longer than the default wait.
+    """
+    if bart_loader.state == "failed":
+        return True
+    return bart_loader.state == "loading" and MODEL_WAIT_TIMEOUT is not None
+
+def get_model_status() -> Dict[str, Any]:
+    """
+    Report the load state of each model
+    
+    Returns:
+        Dictionary mapping model name to its state, load duration and last error
+    """
+    return {
+        "bart": bart_loader.status(),
+        "classifier": classifier_loader.status()
+    }
+
+def _cache_lookup(action: str, content: str, learning_speed: str, model_id: str) -> Tuple[Any, str, Optional[int]]:
+    """
+    Find a cached result at the current generation policy level or a better one
+    
+    Returns:
+        The cached result or None, the key to store a freshly generated
+        result under (the current level's), and the level the cached result
+        was generated at or None
+    """
+    levels = generation_policy.usable_levels()
+    keys = [make_cache_key(action, content, learning_speed, result_id)
+            for result_id in generation_policy.result_ids(model_id)]
+    for level, key in zip(levels, keys):
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached, keys[-1], level
+    return None, keys[-1], None
+
+def _generate_cached(action: str, content: str, learning_speed: str, mock_fn) -> Dict[str, Any]:
+    """
+    Run a BART generation action through the result cache
+    
+    Args:
+        action: Name of the BartModelHandler method to call
+        content: The source content
+        learning_speed: The user's learning speed ("slow", "moderate", "fast")
+        mock_fn: Fallback used when the model is unavailable or fails
+        
+    Returns:
+        The cached or freshly generated result
+    """
+    handler = get_bart_handler()
+    
+    # Use mock function if handler is not available
+    if handler is None:
+        return mock_fn(content, learning_speed)
+        
+    cached, key, level = _cache_lookup(action, content, learning_speed, handler.model_id)
+    if cached is not None:
+        # The response metadata names the level the result was generated at
+        generation_policy.record_result_level(level)
+        return cached
+        
+    try:
+        result = getattr(handler, action)(content, learning_speed)
+    except Exception as e:
+        print(f"Error in {action}: {e}")
+        return mock_fn(content, learning_speed)
+        
+    # Mock fallbacks are never cached, only real model output
+    result_cache.put(key, result)
+    return result
 
 def generate_summary(content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
     """
@@ -46,17 +159,56 @@ def generate_summary(content: str, learning_speed: str = "moderate") -> Dict[str
     Returns:
         Dictionary containing the summary and metadata
     """
+    return _generate_cached("generate_summary", content, learning_speed, _mock_summary)
+
+def stream_summary(content: str, learning_speed: str = "moderate") -> Iterator[Dict[str, Any]]:
+    """
+    Generate a summary using the BART model, yielding text as it is decoded
+    
+    Args:
+        content: The content to summarize
+        learning_speed: The user's learning speed ("slow", "moderate", "fast")
+        
+    Yields:
+        {"delta": text} events while decoding, then one {"result": summary_data} event
+    """
     handler = get_bart_handler()
     
     # Use mock function if handler is not available
     if handler is None:
-        return _mock_summary(content, learning_speed)
+        yield {"result": _mock_summary(content, learning_speed)}
+        return
+        
+    cached, key, level = _cache_lookup("stream_summary", content, learning_speed, handler.model_id)
+    if cached is not None:
+        generation_policy.record_result_level(level)
+        yield {"delta": cached["summary"]}
+        yield {"result": cached}
+        return
         
+    pieces = []
     try:
-        return handler.generate_summary(content, learning_speed)
+        for piece in handler.stream_summary(content, learning_speed):
+            pieces.append(piece)
+            yield {"delta": piece}
     except Exception as e:
-        print(f"Error generating summary: {e}")
-        return _mock_summary(content, learning_speed)
+        print(f"Error in stream_summary: {e}")
+        # Text already sent cannot be replaced by the mock, so report the failure
+        if pieces:
+            raise
+        yield {"result": _mock_summary(content, learning_speed)}
+        return
+        
+    from models.bart.bart_model import LEARNING_SPEED_PARAMS
+    
+    params = LEARNING_SPEED_PARAMS.get(learning_speed, LEARNING_SPEED_PARAMS["moderate"])
+    result = {
+        "summary": "".join(pieces).strip(),
+        "detail_level": params["detail_level"],
+        "learning_speed": learning_speed
+    }
+    result_cache.put(key, result)
+    yield {"result": result}
 
 def generate_quiz(content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
     """
@@ -69,17 +221,7 @@ def generate_quiz(content: str, learning_speed: str = "moderate") -> Dict[str, A
     Returns:
         Dictionary containing the quiz questions and metadata
     """
-    handler = get_bart_handler()
-    
-    # Use mock function if handler is not available
-    if handler is None:
-        return _mock_quiz(content, learning_speed)
-        
-    try:
-        return handler.generate_quiz(content, learning_speed)
-    except Exception as e:
-        print(f"Error generating quiz: {e}")
-        return _mock_quiz(content, learning_speed)
+    return _generate_cached("generate_quiz", content, learning_speed, _mock_quiz)
 
 def generate_flashcards(content: str, learning_speed: str = "moderate") -> Dict[str, Any]:
     """
@@ -92,17 +234,55 @@ def generate_flashcards(content: str, learning_speed: str = "moderate") -> Dict[
     Returns:
         Dictionary containing the flashcards and metadata
     """
-    handler = get_bart_handler()
+    return _generate_cached("generate_flashcards", content, learning_speed, _mock_flashcards)
+
+def generate_all(content: str, learning_speed: str = "moderate", learning_speeds: Dict[str, str] = None) -> Dict[str, Any]:
+    """
+    Generate a summary, quiz and flashcards from a single BART encoder pass
     
-    # Use mock function if handler is not available
+    Args:
+        content: The source content
+        learning_speed: The user's learning speed ("slow", "moderate", "fast")
+        learning_speeds: Optional per-artifact overrides keyed by "summary", "quiz" or "flashcards"
+        
+    Returns:
+        Dictionary with "summary", "quiz" and "flashcards" results, and
+        "mock": True when they come from the fallbacks instead of the model
+    """
+    speeds = {artifact: learning_speed for artifact in ("summary", "quiz", "flashcards")}
+    speeds.update(learning_speeds or {})
+    
+    def mock_all() -> Dict[str, Any]:
+        return {
+            "summary": _mock_summary(content, speeds["summary"]),
+            "quiz": _mock_quiz(content, speeds["quiz"]),
+            "flashcards": _mock_flashcards(content, speeds["flashcards"]),
+            "mock": True
+        }
+        
+    handler = get_bart_handler()
     if handler is None:
-        return _mock_flashcards(content, learning_speed)
+        return mock_all()
+        
+    speed_key = ",".join(f"{artifact}={speed}" for artifact, speed in sorted(speeds.items()))
+    cached, key, level = _cache_lookup("generate_all", content, speed_key, handler.model_id)
+    if cached is not None:
+        # The response metadata names the level the result was generated at
+        generation_policy.record_result_level(level)
+        return cached
         
     try:
-        return handler.generate_flashcards(content, learning_speed)
+        result = handler.generate_all(content, learning_speed, speeds)
     except Exception as e:
-        print(f"Error generating flashcards: {e}")
-        return _mock_flashcards(content, learning_speed)
+        print(f"Error in generate_all: {e}")
+        return mock_all()
+        
+    result_cache.put(key, result)
+    return result
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the generation result cache"""
+    return result_cache.stats()
 
 def classify_user(responses: Dict[int, str]) -> str:
     """
@@ -126,9 +306,32 @@ def classify_user(responses: Dict[int, str]) -> str:
         print(f"Error classifying user: {e}")
         return _rule_based_classification(responses)
 
+def classify_users(responses_list: List[Dict[int, str]]) -> List[str]:
+    """
+    Classify many users based on their test responses in one prediction
+    
+    Args:
+        responses_list: One dictionary mapping question IDs to response values per user
+        
+    Returns:
+        Classification per user: 'slow', 'moderate', or 'fast'
+    """
+    user_classifier = get_user_classifier()
+    
+    # Use rule-based classification if classifier is not available
+    if user_classifier is None:
+        return [_rule_based_classification(responses) for responses in responses_list]
+        
+    try:
+        return user_classifier.classify_batch(responses_list)
+    except Exception as e:
+        print(f"Error classifying users: {e}")
+        return [_rule_based_classification(responses) for responses in responses_list]
+
 # Mock functions for when models are not available
 def _mock_summary(content: str, learning_speed: str) -> Dict[str, Any]:
     """Mock summary generation"""
+    telemetry.increment("mock_fallbacks_total", function="_mock_summary")
     # Adjust the summary based on learning speed
     if learning_speed == "slow":
         detail_level = "detailed"
@@ -151,6 +354,7 @@ def _mock_summary(content: str, learning_speed: str) -> Dict[str, Any]:
 
 def _mock_quiz(content: str, learning_speed: str) -> Dict[str, Any]:
     """Mock quiz generation"""
+    telemetry.increment("mock_fallbacks_total", function="_mock_quiz")
     question_count = 10 if learning_speed == "slow" else 15 if learning_speed == "moderate" else 20
     complexity = "Basic" if learning_speed == "slow" else "Intermediate" if learning_speed == "moderate" else "Advanced"
     
@@ -176,6 +380,7 @@ def _mock_quiz(content: str, learning_speed: str) -> Dict[str, Any]:
 
 def _mock_flashcards(content: str, learning_speed: str) -> Dict[str, Any]:
     """Mock flashcard generation"""
+    telemetry.increment("mock_fallbacks_total", function="_mock_flashcards")
     if learning_speed == "slow":
         card_count = 15
         detail_level = "detailed"
@@ -203,6 +408,7 @@ def _mock_flashcards(content: str, learning_speed: str) -> Dict[str, Any]:
 
 def _rule_based_classification(responses: Dict[int, str]) -> str:
     """Simple rule-based classification"""
+    telemetry.increment("mock_fallbacks_total", function="_rule_based_classification")
     # Count occurrences of each learning speed
     counts = {"slow": 0, "moderate": 0, "fast": 0}
     
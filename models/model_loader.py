@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Delay before retrying a failed load; doubles after each consecutive failure
+LOAD_RETRY_BACKOFF_SECONDS = float(os.environ.get("MODEL_LOAD_RETRY_BACKOFF_SECONDS", "30"))
+LOAD_RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get("MODEL_LOAD_RETRY_BACKOFF_MAX_SECONDS", "600"))
+
+class ModelLoader:
+    """
+    Load a model once on a background thread and report its readiness
+    
+    The loader moves through the states idle -> loading -> ready, or to
+    failed. A failed load is not retried until its backoff has passed, and
+    the backoff doubles with each consecutive failure. Callers can wait for
+    the load with a timeout, or get None straight away and use a fallback.
+    """
+    
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Args:
+            name: Model name used in log messages and status reports
+            factory: Function that builds the model instance
+        """
+        self.name = name
+        self.factory = factory
+        
+        self.state = "idle"
+        self.instance = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.failures = 0
+        self.retry_at = 0.0
+        
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        
+    def start(self) -> bool:
+        """
+        Start loading in the background unless already loading, loaded or backing off
+        
+        Returns:
+            True if a new load was started
+        """
+        with self._lock:
+            if self.state in ("loading", "ready"):
+                return False
+            if self.state == "failed" and time.monotonic() < self.retry_at:
+                return False
+            self.state = "loading"
+            self._done.clear()
+            
+        thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+        thread.start()
+        return True
+        
+    def _load(self):
+        """Build the model and record the outcome"""
+        start = time.perf_counter()
+        try:
+            instance = self.factory()
+        except Exception as e:
+            print(f"Error initializing {self.name}: {e}")
+            with self._lock:
+                self.failures += 1
+                backoff = min(LOAD_RETRY_BACKOFF_MAX_SECONDS, LOAD_RETRY_BACKOFF_SECONDS * 2 ** (self.failures - 1))
+                self.state = "failed"
+                self.error = str(e)
+                self.load_seconds = time.perf_counter() - start
+                self.retry_at = time.monotonic() + backoff
+        else:
+            with self._lock:
+                self.instance = instance
+                self.state = "ready"
+                self.error = None
+                self.failures = 0
+                self.load_seconds = time.perf_counter() - start
+        finally:
+            self._done.set()
+            
+    def set(self, instance: Any):
+        """Install an already-built instance, e.g. one loaded before forking"""
+        with self._lock:
+            self.instance = instance
+            self.state = "ready"
+            self.error = None
+            self.failures = 0
+        self._done.set()
+        
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Return the model, starting a load if needed
+        
+        Args:
+            timeout: Seconds to wait for a load in progress; None waits until it
+                finishes and 0 returns immediately
+                
+        Returns:
+            The model instance, or None if it is not ready in time
+        """
+        if self.state == "ready":
+            return self.instance
+            
+        self.start()
+        if self.state == "loading" and timeout != 0:
+            self._done.wait(timeout)
+            
+        return self.instance if self.state == "ready" else None
+        
+    def status(self) -> Dict[str, Any]:
+        """Report the current load state"""
+        with self._lock:
+            status = {
+                "state": self.state,
+                "load_seconds": self.load_seconds,
+                "error": self.error,
+                "failures": self.failures
+            }
+            if self.state == "failed":
+                status["retry_in_seconds"] = max(0.0, self.retry_at - time.monotonic())
+        return status
@@ -0,0 +1,153 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Directory that receives profiles, one file per profiled request and tool
+PROFILE_DIR = os.environ.get("BRIDGE_PROFILE_DIR", "/tmp/bridge-profiles")
+
+# Fraction of model requests profiled without being asked (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get("BRIDGE_PROFILE_SAMPLE_RATE", "0"))
+
+# Profilers used for sampled requests, and for requests that just send "profile": true
+PROFILE_MODE = os.environ.get("BRIDGE_PROFILE_MODE", "cprofile")
+
+# Oldest profiles are deleted once the directory holds more than this many files
+PROFILE_MAX_FILES = int(os.environ.get("BRIDGE_PROFILE_MAX_FILES", "200"))
+
+# The per-request "profile" flag is ignored unless BRIDGE_PROFILE_REQUESTS=1:
+# /api/bridge passes requests through from any HTTP client, and each profile
+# slows its request and writes files to disk
+PROFILE_REQUESTS_ALLOWED = os.environ.get("BRIDGE_PROFILE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+PROFILE_MODES = {
+    "cprofile": ["cprofile"],
+    "torch": ["torch"],
+    "both": ["cprofile", "torch"]
+}
+
+# torch.profiler allows one active profiler per process
+_torch_profiler_lock = threading.Lock()
+
+def requested_modes(request_data: Dict[str, Any], sampled: bool = True) -> List[str]:
+    """
+    Profilers to run for a bridge request
+    
+    Args:
+        request_data: The request; its optional top-level "profile" is true or
+            one of "cprofile", "torch" and "both"
+        sampled: Whether the request is eligible for random sampling
+    
+    Returns:
+        Profiler names, empty when the request is not profiled
+    """
+    flag = request_data.get("profile") if PROFILE_REQUESTS_ALLOWED else None
+    if flag is True:
+        return PROFILE_MODES.get(PROFILE_MODE, PROFILE_MODES["cprofile"])
+    if isinstance(flag, str) and flag in PROFILE_MODES:
+        return PROFILE_MODES[flag]
+    if sampled and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_MODES.get(PROFILE_MODE, PROFILE_MODES["cprofile"])
+    return []
+
+def profile_path(request_id: str, suffix: str, profile_dir: Optional[str] = None) -> str:
+    """File for one profile, named by the request_id with anything unsafe in a file name replaced"""
+    safe_id = re.sub(r"[^A-Za-z0-9._-]", "_", str(request_id))[:128] or "unknown"
+    return os.path.join(profile_dir or PROFILE_DIR, f"{safe_id}{suffix}")
+
+@contextmanager
+def capture(request_id: str, modes: List[str], profile_dir: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Profile the enclosed block and write the results when it exits
+    
+    cProfile only sees the calling thread; work handed to the micro-batching
+    or streaming threads shows up as time waiting on them. torch.profiler
+    records operators from every thread, and only one request can hold it at
+    a time; a request that finds it busy is not torch-profiled.
+    
+    Args:
+        request_id: Names the output files: <request_id>.prof for cProfile
+            (readable with pstats or snakeviz) and <request_id>.trace.json.gz
+            for torch.profiler (a gzipped chrome://tracing / Perfetto trace)
+        modes: Profilers to run, from requested_modes()
+        profile_dir: Output directory, PROFILE_DIR by default
+    
+    Yields:
+        Dict filled in on exit with "files" (profiler name to path),
+        "duration_seconds" and, if anything went wrong, "errors"
+    """
+    report: Dict[str, Any] = {"files": {}}
+    errors = []
+    
+    torch_profiler = None
+    torch_locked = False
+    if "torch" in modes:
+        if _torch_profiler_lock.acquire(blocking=False):
+            torch_locked = True
+            try:
+                from torch.profiler import ProfilerActivity, profile
+                
+                torch_profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True)
+                torch_profiler.__enter__()
+            except Exception as e:
+                errors.append(f"torch: {e}")
+                torch_profiler = None
+        else:
+            errors.append("torch: another request is being profiled")
+    
+    profiler = cProfile.Profile() if "cprofile" in modes else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield report
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        report["duration_seconds"] = time.perf_counter() - start
+        
+        try:
+            os.makedirs(profile_dir or PROFILE_DIR, exist_ok=True)
+        except OSError as e:
+            errors.append(str(e))
+        
+        if profiler is not None:
+            path = profile_path(request_id, ".prof", profile_dir)
+            try:
+                profiler.dump_stats(path)
+                report["files"]["cprofile"] = path
+            except OSError as e:
+                errors.append(f"cprofile: {e}")
+        
+        if torch_profiler is not None:
+            path = profile_path(request_id, ".trace.json.gz", profile_dir)
+            try:
+                torch_profiler.__exit__(None, None, None)
+                torch_profiler.export_chrome_trace(path)
+                report["files"]["torch"] = path
+            except Exception as e:
+                errors.append(f"torch: {e}")
+        if torch_locked:
+            _torch_profiler_lock.release()
+        
+        if report["files"]:
+            prune(profile_dir or PROFILE_DIR)
+        if errors:
+            report["errors"] = errors
+
+def prune(profile_dir: str, max_files: int = PROFILE_MAX_FILES):
+    """Delete the oldest files in profile_dir beyond the newest max_files"""
+    try:
+        entries = [entry for entry in os.scandir(profile_dir) if entry.is_file()]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max_files:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
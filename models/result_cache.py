@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# In-memory tier limits: entries are evicted least-recently-used first once
+# either bound is exceeded
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Entries older than this are treated as missing (0 keeps them forever)
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Directory for the on-disk tier; empty disables it
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "")
+
+# Bump when the shape of generated results changes so old entries are ignored
+RESULT_CACHE_VERSION = "1"
+
+def normalise_content(content: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return " ".join(content.split())
+
+def make_cache_key(action: str, content: str, learning_speed: str, model_id: str) -> str:
+    """
+    Build a content-addressed cache key
+    
+    Args:
+        action: Generation action, e.g. "generate_summary"
+        content: Source content (normalised before hashing)
+        learning_speed: The user's learning speed
+        model_id: Identity of the model producing the result
+        
+    Returns:
+        Hex SHA-256 digest identifying the result
+    """
+    payload = json.dumps(
+        [RESULT_CACHE_VERSION, action, normalise_content(content), learning_speed, model_id],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    Two-tier cache for generated summaries, quizzes and flashcards
+    
+    The memory tier is an LRU bounded by entry count and serialized size. The
+    optional disk tier stores one JSON file per key, so results survive a
+    restart. Values are stored serialized, and every hit returns a fresh copy.
+    """
+    
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 ttl_seconds: float = RESULT_CACHE_TTL_SECONDS, cache_dir: Optional[str] = RESULT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir or None
+        
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+        
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+        
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+        
+        Args:
+            key: Key from make_cache_key()
+            
+        Returns:
+            A copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, serialized = entry
+                if self._expired(created_at):
+                    self._remove_locked(key)
+                    self._counters["expirations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return json.loads(serialized)
+                    
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            self._store_locked(key, *entry)
+            
+        return json.loads(entry[1])
+        
+    def put(self, key: str, value: Dict[str, Any]):
+        """
+        Store a result in memory and, if enabled, on disk
+        
+        Args:
+            key: Key from make_cache_key()
+            value: JSON-serializable result
+        """
+        serialized = json.dumps(value)
+        created_at = time.time()
+        
+        with self._lock:
+            self._store_locked(key, created_at, serialized)
+            
+        self._write_disk(key, created_at, serialized)
+        
+    def _store_locked(self, key: str, created_at: float, serialized: str):
+        """Insert into the memory tier and evict down to the size limits"""
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = (created_at, serialized)
+        self._bytes += len(serialized)
+        
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove_locked(oldest)
+            self._counters["evictions"] += 1
+            
+    def _remove_locked(self, key: str):
+        _, serialized = self._entries.pop(key)
+        self._bytes -= len(serialized)
+        
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        """Read an entry from the disk tier, dropping it if expired"""
+        if not self.cache_dir:
+            return None
+            
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+            
+        if self._expired(record["created_at"]):
+            with self._lock:
+                self._counters["expirations"] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+            
+        return record["created_at"], record["value"]
+        
+    def _write_disk(self, key: str, created_at: float, serialized: str):
+        """Write an entry to the disk tier atomically"""
+        if not self.cache_dir:
+            return
+            
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": created_at, "value": serialized}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing result cache entry: {e}")
+            
+    def clear(self):
+        """Drop every entry from the memory tier"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current memory tier usage"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["disk_enabled"] = self.cache_dir is not None
+        return stats
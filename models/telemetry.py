@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets; a final +Inf
+# bucket is implied. Chosen to cover sub-millisecond cache hits through
+# multi-minute beam searches on CPU.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Prefix for every exported metric name
+METRICS_PREFIX = os.environ.get("METRICS_PREFIX", "studybuddy_")
+
+# Set TELEMETRY_ENABLED=0 to turn every recording call into a no-op
+TELEMETRY_ENABLED = os.environ.get("TELEMETRY_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Action label for work done outside a request, e.g. on the micro-batching thread
+BACKGROUND_ACTION = "background"
+
+METRIC_HELP = {
+    "request_duration_seconds": ("histogram", "Bridge request latency by action"),
+    "stage_duration_seconds": ("histogram", "Latency of one stage of a bridge request (queue_wait, tokenize, generate, decode, serialize)"),
+    "requests_total": ("counter", "Bridge requests handled, by action and outcome"),
+    "mock_fallbacks_total": ("counter", "Results produced by a mock or rule-based fallback instead of a model"),
+    "model_input_tokens_total": ("counter", "Tokens fed to the BART encoder"),
+    "model_output_tokens_total": ("counter", "Tokens produced by BART generation"),
+    "generation_policy_requests_total": ("counter", "Model requests by the generation policy level they ran at"),
+    "http_request_duration_seconds": ("histogram", "Flask request latency by endpoint"),
+    "process_resident_memory_bytes": ("gauge", "Resident set size of this process")
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(upper bound, observations at or below it) pairs, ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            running += count
+            pairs.append(("+Inf" if bound == float("inf") else repr(bound), running))
+        return pairs
+
+class Telemetry:
+    """
+    Process-wide latency histograms and counters
+    
+    Recording takes one short lock, so it is cheap enough to call on every
+    request stage. The action label for stage timings comes from the
+    calling thread's current request, set with action().
+    """
+    
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+    
+    def current_action(self) -> str:
+        """Action of the request running on this thread"""
+        return getattr(self._local, "action", BACKGROUND_ACTION)
+    
+    def observe(self, name: str, value: float, **labels: str):
+        """Record one histogram observation"""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+    
+    def increment(self, name: str, amount: float = 1, **labels: str):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+    
+    def observe_stage(self, stage: str, seconds: float, action: Optional[str] = None):
+        """Record a stage duration measured by the caller"""
+        self.observe("stage_duration_seconds", seconds, action=action or self.current_action(), stage=stage)
+    
+    @contextmanager
+    def stage(self, stage: str, action: Optional[str] = None) -> Iterator[None]:
+        """Time the enclosed block as one stage of the current request"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, action)
+    
+    @contextmanager
+    def action(self, action: str) -> Iterator[Dict[str, Any]]:
+        """
+        Mark the enclosed block as handling one request for action
+        
+        Stage timings on this thread are labelled with the action, and the
+        total duration and outcome are recorded when the block exits. Set
+        "status" in the yielded dict to record an outcome other than
+        "success"; an exception records "error".
+        """
+        outer = getattr(self._local, "action", None)
+        self._local.action = action
+        outcome = {"status": "success"}
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome["status"] = "error"
+            raise
+        finally:
+            self.observe("request_duration_seconds", time.perf_counter() - start, action=action)
+            self.increment("requests_total", action=action, status=outcome["status"])
+            if outer is None:
+                del self._local.action
+            else:
+                self._local.action = outer
+    
+    def reset(self):
+        """Drop every recorded value"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current values as plain data
+        
+        Returns:
+            "histograms" and "counters" keyed by metric name, each a list of
+            series with their labels, plus "process" memory figures
+        """
+        with self._lock:
+            histograms = {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": h.sum, "buckets": dict(h.cumulative())}
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+        return {
+            "histograms": histograms,
+            "counters": counters,
+            "process": {"resident_memory_bytes": resident_memory_bytes(), "pid": os.getpid()}
+        }
+    
+    def render_prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        """
+        Current values in the Prometheus text exposition format (version 0.0.4)
+        
+        Every series carries a pid label. Under api.prefork each worker keeps
+        its own registry and a scrape reaches whichever worker accepts it, so
+        without the label the counters of different workers would read as
+        one counter jumping up and down (and as resets to rate()). Sum over
+        pid to aggregate; each worker's series has gaps between the scrapes
+        that reached it.
+        """
+        lines = []
+        process = (("pid", str(os.getpid())),)
+        
+        def header(name: str, kind: str):
+            help_text = METRIC_HELP.get(name, (kind, name))[1]
+            lines.append(f"# HELP {prefix}{name} {help_text}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+        
+        with self._lock:
+            for name in sorted(self._histograms):
+                header(name, "histogram")
+                for key, h in self._histograms[name].items():
+                    key = process + key
+                    for bound, count in h.cumulative():
+                        lines.append(f"{prefix}{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                    lines.append(f"{prefix}{name}_sum{_format_labels(key)} {h.sum!r}")
+                    lines.append(f"{prefix}{name}_count{_format_labels(key)} {h.count}")
+            for name in sorted(self._counters):
+                header(name, "counter")
+                for key, value in self._counters[name].items():
+                    lines.append(f"{prefix}{name}{_format_labels(process + key)} {value:g}")
+        
+        header("process_resident_memory_bytes", "gauge")
+        lines.append(f"{prefix}process_resident_memory_bytes{_format_labels(process)} {resident_memory_bytes()}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    pairs = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def resident_memory_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+# Shared registry for the bridge, the model code and the Flask app
+telemetry = Telemetry()
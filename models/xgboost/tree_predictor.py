@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import numpy as np
+from typing import Any, Dict, List
+
+# Compact array export of the trained booster, loadable with NumPy alone
+COMPILED_MODEL_PATH = "models/xgboost/learning_speed_classifier.npz"
+
+# Class labels in the order of the model's numeric predictions
+SPEED_LABELS = ["slow", "moderate", "fast"]
+
+def encode_responses(responses_list: List[Dict[Any, str]], feature_encoder: Dict[Any, Dict[str, str]],
+                     columns: List[str]) -> np.ndarray:
+    """
+    Encode many response sets into one one-hot feature matrix
+    
+    Args:
+        responses_list: One dictionary of responses per user
+        feature_encoder: Mapping of question id to response -> learning speed
+        columns: Feature column order the model was trained with
+        
+    Returns:
+        float32 matrix with one row per user; unanswered questions are NaN
+    """
+    column_index = {name: index for index, name in enumerate(columns)}
+    # Question ids arrive as ints from Python and as strings from JSON
+    encoder = {str(question_id): encoding for question_id, encoding in feature_encoder.items()}
+    
+    matrix = np.full((len(responses_list), len(columns)), np.nan, dtype=np.float32)
+    for row, responses in enumerate(responses_list):
+        for question_id, response in responses.items():
+            encoding = encoder.get(str(question_id))
+            if encoding is None or response not in encoding:
+                continue
+            for speed in SPEED_LABELS:
+                column = column_index.get(f"q{question_id}_{speed}")
+                if column is not None:
+                    matrix[row, column] = 1.0 if encoding[response] == speed else 0.0
+                    
+    return matrix
+
+def export_compiled_model(booster, feature_encoder: Dict[Any, Dict[str, str]], feature_names: List[str],
+                          path: str = COMPILED_MODEL_PATH):
+    """
+    Flatten a trained multi-class booster into node arrays
+    
+    All trees are concatenated into flat arrays (children, split feature,
+    threshold or leaf value, missing-value direction) with per-tree offsets,
+    and saved with the feature names and feature encoder. Pickle is not used.
+    
+    Args:
+        booster: Trained xgboost Booster
+        feature_encoder: Feature encoder saved alongside the model
+        feature_names: Feature column order the booster was trained with
+        path: .npz file to write
+    
+    Raises:
+        ValueError: If feature_names is empty or does not match the booster
+    """
+    # The split indices refer to these columns; without them no input can be encoded
+    if not feature_names:
+        raise ValueError("Cannot export a model without its training feature columns")
+    if len(feature_names) != booster.num_features():
+        raise ValueError(f"Model has {booster.num_features()} features but {len(feature_names)} column names were given")
+        
+
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    model = learner["gradient_booster"]["model"]
+    trees = model["trees"]
+    
+    num_class = max(1, int(learner["learner_model_param"].get("num_class", "1")))
+    
+    offsets = np.cumsum([0] + [len(tree["left_children"]) for tree in trees]).astype(np.int32)
+    
+    def concat(field, dtype):
+        return np.concatenate([np.asarray(tree[field], dtype=dtype) for tree in trees])
+        
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        
+    np.savez(
+        path,
+        left=concat("left_children", np.int32),
+        right=concat("right_children", np.int32),
+        feature=concat("split_indices", np.int32),
+        # For leaves, split_conditions holds the leaf value
+        threshold=concat("split_conditions", np.float32),
+        default_left=concat("default_left", np.int8).astype(bool),
+        tree_offsets=offsets[:-1],
+        tree_class=np.asarray(model["tree_info"], dtype=np.int32),
+        base_score=np.float32(float(learner["learner_model_param"]["base_score"])),
+        num_class=np.int32(num_class),
+        feature_names=np.asarray(list(feature_names), dtype=str),
+        feature_encoder=np.asarray(json.dumps({str(k): v for k, v in feature_encoder.items()}))
+    )
+    print(f"Compiled model saved to {path}")
+
+class CompiledClassifier:
+    """
+    Pure NumPy predictor for an exported learning-speed booster
+    
+    Walks every tree at once, one level per step, so predicting a batch
+    costs a handful of vectorised array operations per tree depth.
+    """
+    
+    def __init__(self, path: str = COMPILED_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            self.left = data["left"]
+            self.right = data["right"]
+            self.feature = data["feature"]
+            self.threshold = data["threshold"]
+            self.default_left = data["default_left"]
+            self.tree_offsets = data["tree_offsets"]
+            self.tree_class = data["tree_class"]
+            self.base_score = float(data["base_score"])
+            self.num_class = int(data["num_class"])
+            self.feature_names = [str(name) for name in data["feature_names"]]
+            self.feature_encoder = json.loads(str(data["feature_encoder"]))
+            
+        if not self.feature_names:
+            raise ValueError(f"{path} was exported without feature columns; export the model again")
+            
+        # One-hot map from tree to the class it votes for
+        self._class_matrix = np.zeros((len(self.tree_offsets), self.num_class), dtype=np.float64)
+        self._class_matrix[np.arange(len(self.tree_offsets)), self.tree_class] = 1.0
+        
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        """Raw per-class scores for each row of a feature matrix"""
+        features = np.asarray(features, dtype=np.float32)
+        rows = np.arange(features.shape[0])[:, None]
+        
+        nodes = np.broadcast_to(self.tree_offsets, (features.shape[0], len(self.tree_offsets))).copy()
+        while True:
+            left = self.left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+                
+            values = features[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            # Child indices are local to their tree
+            child = np.where(go_left, left, self.right[nodes])
+            nodes = np.where(internal, self.tree_offsets + child, nodes)
+            
+        leaf_values = self.threshold[nodes].astype(np.float64)
+        return self.base_score + leaf_values @ self._class_matrix
+        
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predicted class index for each row of a feature matrix"""
+        return np.argmax(self.predict_margin(features), axis=1)
+        
+    def classify_batch(self, responses_list: List[Dict[Any, str]]) -> List[str]:
+        """
+        Classify many users based on test responses
+        
+        Args:
+            responses_list: One dictionary mapping question IDs to response values per user
+            
+        Returns:
+            Classification per user: 'slow', 'moderate', or 'fast'
+        """
+        if not responses_list:
+            return []
+            
+        features = encode_responses(responses_list, self.feature_encoder, self.feature_names)
+        return [SPEED_LABELS[int(prediction)] for prediction in self.predict(features)]
+        
+    def classify(self, responses: Dict[Any, str]) -> str:
+        """
+        Classify a user based on test responses
+        
+        Args:
+            responses: Dictionary mapping question IDs to response values
+            
+        Returns:
+            Classification result: 'slow', 'moderate', or 'fast'
+        """
+        return self.classify_batch([responses])[0]
+
+# Usage example: export the trained booster and check it against xgboost
+if __name__ == "__main__":
+    # Add the repository root to the path when run as a script
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from models.xgboost.xgboost_classifier import UserClassifier
+    
+    classifier = UserClassifier()
+    if classifier.feature_encoder is None:
+        raise SystemExit("No trained model to export")
+        
+    export_compiled_model(classifier.model.get_booster(), classifier.feature_encoder, classifier.feature_columns)
+    compiled = CompiledClassifier()
+    
+    rng = np.random.default_rng(0)
+    question_ids = list(classifier.feature_encoder)
+    samples = [
+        {question_id: SPEED_LABELS[rng.integers(0, 3)] for question_id in question_ids}
+        for _ in range(1000)
+    ]
+    matches = sum(a == b for a, b in zip(classifier.classify_batch(samples), compiled.classify_batch(samples)))
+    print(f"Compiled predictor agrees with the booster on {matches}/{len(samples)} samples")
@@ -4,32 +4,49 @@ import xgboost as xgb
 import json
 import os
 import pickle
-from typing import Dict, List, Any, Union
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
+import sys
+import time
+from typing import Dict, List, Any
+
+# Add the repository root to the path so the example below also runs as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from models.xgboost.tree_predictor import SPEED_LABELS, encode_responses, export_compiled_model
 
 # Model paths
 MODEL_PATH = "models/xgboost/learning_speed_classifier.model"
 FEATURE_ENCODER_PATH = "models/xgboost/feature_encoder.pkl"
+# Feature column order the model was trained with; the binary model format does not keep it
+FEATURE_COLUMNS_PATH = "models/xgboost/feature_columns.json"
+
+# Hyperparameters for a freshly trained classifier
+MODEL_PARAMS = {
+    "objective": "multi:softmax",
+    "num_class": 3,  # slow, moderate, fast
+    "learning_rate": 0.1,
+    "max_depth": 4,
+    "n_estimators": 100,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8
+}
+
+# Incremental retraining: JSONL lines read per chunk, extra boosting rounds
+# per retrain, and rounds without holdout improvement before stopping early
+INCREMENTAL_CHUNK_SIZE = 10000
+INCREMENTAL_BOOST_ROUNDS = 50
+INCREMENTAL_EARLY_STOPPING_ROUNDS = 5
 
 class UserClassifier:
     def __init__(self, load_model: bool = True):
         """Initialize XGBoost classifier for user learning speed classification"""
         self.model = None
         self.feature_encoder = None
+        self.feature_columns = None
         
         if load_model and os.path.exists(MODEL_PATH):
             self.load_model()
         else:
-            self.model = xgb.XGBClassifier(
-                objective='multi:softmax',
-                num_class=3,  # slow, moderate, fast
-                learning_rate=0.1,
-                max_depth=4,
-                n_estimators=100,
-                subsample=0.8,
-                colsample_bytree=0.8
-            )
+            self.model = xgb.XGBClassifier(**MODEL_PARAMS)
             
     def load_model(self):
         """Load trained model and feature encoder"""
@@ -40,19 +57,20 @@ class UserClassifier:
             with open(FEATURE_ENCODER_PATH, 'rb') as f:
                 self.feature_encoder = pickle.load(f)
                 
+            if os.path.exists(FEATURE_COLUMNS_PATH):
+                with open(FEATURE_COLUMNS_PATH, 'r') as f:
+                    self.feature_columns = json.load(f)
+            else:
+                # Saved before the column order was stored; rebuild it from the encoder
+                self.feature_columns = self._training_columns()
+            # Restore the names the binary format dropped, so the booster checks its input columns
+            self.model.get_booster().feature_names = self.feature_columns
+                
             print(f"Model loaded from {MODEL_PATH}")
         except Exception as e:
             print(f"Error loading model: {e}")
             # Initialize a new model if loading fails
-            self.model = xgb.XGBClassifier(
-                objective='multi:softmax',
-                num_class=3,  # slow, moderate, fast
-                learning_rate=0.1,
-                max_depth=4,
-                n_estimators=100,
-                subsample=0.8,
-                colsample_bytree=0.8
-            )
+            self.model = xgb.XGBClassifier(**MODEL_PARAMS)
             
     def save_model(self):
         """Save trained model and feature encoder"""
@@ -67,8 +85,17 @@ class UserClassifier:
             with open(FEATURE_ENCODER_PATH, 'wb') as f:
                 pickle.dump(self.feature_encoder, f)
                 
+            # Save feature column order
+            if self.feature_columns is not None:
+                with open(FEATURE_COLUMNS_PATH, 'w') as f:
+                    json.dump(self.feature_columns, f)
+                
             print(f"Model saved to {MODEL_PATH}")
             
+            # Export the dependency-free predictor used for serving
+            if self.feature_encoder is not None:
+                export_compiled_model(self.model.get_booster(), self.feature_encoder, self._feature_columns())
+            
     def _preprocess_test_responses(self, responses: Dict[str, Any]) -> pd.DataFrame:
         """
         Preprocess test responses for model input
@@ -102,7 +129,9 @@ class UserClassifier:
                     if speed != response:
                         features[f"q{question_id}_{speed}"] = 0
         
-        # Convert to DataFrame
+        # Convert to DataFrame, in the column order the model was trained with
+        if self.feature_encoder is not None:
+            return pd.DataFrame([features]).reindex(columns=self._feature_columns())
         return pd.DataFrame([features])
         
     def classify(self, responses: Dict[int, str]) -> str:
@@ -135,6 +164,86 @@ class UserClassifier:
             # Fallback to rule-based classification
             return self._rule_based_classification(responses)
             
+    def _feature_columns(self) -> List[str]:
+        """
+        Feature column order expected by the model
+        
+        This is the order one-hot features were first seen during training,
+        saved with the model. Fall back to the booster's own names, and then
+        to the order rebuilt from the feature encoder.
+        """
+        if self.feature_columns:
+            return list(self.feature_columns)
+            
+        feature_names = None
+        try:
+            feature_names = self.model.get_booster().feature_names
+        except Exception:
+            pass
+            
+        if feature_names:
+            return list(feature_names)
+            
+        return self._training_columns()
+        
+    def _training_columns(self) -> List[str]:
+        """
+        Column order train() produces for the current feature encoder
+        
+        train() adds a question's three columns together the first time the
+        question is seen: the given response first, then the other speeds.
+        The encoder keeps questions and responses in the order first seen, so
+        the first response recorded for each question fixes its columns.
+        """
+        columns = []
+        for question_id, encoding in self.feature_encoder.items():
+            first = next(iter(encoding), None)
+            speeds = [first] + [speed for speed in SPEED_LABELS if speed != first] if first else SPEED_LABELS
+            columns.extend(f"q{question_id}_{speed}" for speed in speeds)
+        return columns
+        
+    def _encode_matrix(self, responses_list: List[Dict[Any, str]], columns: List[str]) -> np.ndarray:
+        """
+        Encode many response sets into one feature matrix
+        
+        Args:
+            responses_list: One dictionary of responses per user
+            columns: Feature column order from _feature_columns()
+            
+        Returns:
+            float32 matrix with one row per user; unanswered questions are NaN
+        """
+        return encode_responses(responses_list, self.feature_encoder, columns)
+        
+    def classify_batch(self, responses_list: List[Dict[int, str]]) -> List[str]:
+        """
+        Classify many users with a single model prediction
+        
+        Args:
+            responses_list: One dictionary mapping question IDs to response values per user
+            
+        Returns:
+            Classification per user: 'slow', 'moderate', or 'fast'
+        """
+        if not responses_list:
+            return []
+            
+        # If model not available, use rule-based classification
+        if self.model is None or self.feature_encoder is None:
+            return [self._rule_based_classification(responses) for responses in responses_list]
+            
+        try:
+            features = self._encode_matrix(responses_list, self._feature_columns())
+            predictions = self.model.predict(features)
+            
+            return [SPEED_LABELS[int(prediction)] if 0 <= int(prediction) < len(SPEED_LABELS) else "moderate"
+                    for prediction in predictions]
+            
+        except Exception as e:
+            print(f"Error during batch classification: {e}")
+            # Fallback to rule-based classification
+            return [self._rule_based_classification(responses) for responses in responses_list]
+            
     def _rule_based_classification(self, responses: Dict[int, str]) -> str:
         """
         Simple rule-based classification when model is not available
@@ -170,6 +279,10 @@ class UserClassifier:
         Args:
             training_data: List of dictionaries with 'responses' and 'classification' keys
         """
+        # scikit-learn is only needed for training, not for classification
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
+        
         # Prepare feature encoder
         self.feature_encoder = {}
         
@@ -213,6 +326,7 @@ class UserClassifier:
         
         # Train model
         self.model.fit(X_train, y_train)
+        self.feature_columns = list(X.columns)
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -225,6 +339,152 @@ class UserClassifier:
         # Save the model
         self.save_model()
 
+    def _read_labelled_stream(self, jsonl_path: str, columns: List[str], chunk_size: int):
+        """
+        Encode a JSONL stream of labelled responses chunk by chunk
+        
+        Args:
+            jsonl_path: File with one {"responses", "classification"} object per line
+            columns: Stable feature column order
+            chunk_size: Lines encoded per chunk
+            
+        Returns:
+            Feature matrix and label vector
+        """
+        speed_mapping = {speed: index for index, speed in enumerate(SPEED_LABELS)}
+        matrices, labels = [], []
+        
+        def flush(chunk: List[Dict[str, Any]]):
+            matrices.append(self._encode_matrix([item["responses"] for item in chunk], columns))
+            labels.append(np.array([speed_mapping.get(item["classification"], 1) for item in chunk], dtype=np.float32))
+            
+        chunk = []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                chunk.append(json.loads(line))
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    chunk = []
+        if chunk:
+            flush(chunk)
+            
+        if not matrices:
+            return np.empty((0, len(columns)), dtype=np.float32), np.empty(0, dtype=np.float32)
+        return np.vstack(matrices), np.concatenate(labels)
+        
+    def train_incremental(self, jsonl_path: str, chunk_size: int = INCREMENTAL_CHUNK_SIZE,
+                          num_boost_round: int = INCREMENTAL_BOOST_ROUNDS,
+                          early_stopping_rounds: int = INCREMENTAL_EARLY_STOPPING_ROUNDS,
+                          holdout_fraction: float = 0.2, compare_from_scratch: bool = False) -> Dict[str, Any]:
+        """
+        Continue boosting the trained model on newly labelled responses
+        
+        Responses are read from a JSONL stream in chunks and encoded directly
+        into a matrix using the existing model's feature columns, so the schema
+        stays stable. Questions the model has never seen are ignored. New trees
+        are added to the current booster with the hist tree method, and
+        boosting stops early once the holdout loss stops improving.
+        
+        Args:
+            jsonl_path: File with one {"responses", "classification"} object per line
+            chunk_size: Lines encoded per chunk
+            num_boost_round: Maximum number of boosting rounds to add
+            early_stopping_rounds: Rounds without holdout improvement before stopping
+            holdout_fraction: Fraction of the new data held out for early stopping
+            compare_from_scratch: Also time a from-scratch train on the same data
+            
+        Returns:
+            Report with row count, rounds added, holdout accuracy and timings;
+            incremental_seconds and from_scratch_seconds both cover training
+            only, and encode_seconds the reading of the stream
+            
+        Raises:
+            ValueError: If there is no trained model, its booster's columns do
+                not match the feature encoder, or there is too little data
+        """
+        if self.feature_encoder is None:
+            raise ValueError("Incremental training needs a trained model; call train() first")
+            
+        columns = self._feature_columns()
+        base_booster = self.model.get_booster()
+        # New trees are added on top of the existing ones, so both must read the same columns
+        if list(base_booster.feature_names or []) != columns or base_booster.num_features() != len(columns):
+            raise ValueError("The model's feature columns do not match its saved column order; retrain with train()")
+        known = set(columns)
+        missing = [column for column in self._training_columns() if column not in known]
+        if missing:
+            raise ValueError(f"The model has no columns for encoded features {missing[:5]}; retrain with train()")
+            
+        start = time.perf_counter()
+        X, y = self._read_labelled_stream(jsonl_path, columns, chunk_size)
+        encode_seconds = time.perf_counter() - start
+        if len(y) < 2:
+            raise ValueError("Not enough labelled responses to retrain")
+            
+        start = time.perf_counter()
+        # Hold out part of the new data for early stopping
+        order = np.random.default_rng(42).permutation(len(y))
+        holdout_size = max(1, int(len(y) * holdout_fraction))
+        holdout, train = order[:holdout_size], order[holdout_size:]
+        dtrain = xgb.DMatrix(X[train], label=y[train], feature_names=columns)
+        dholdout = xgb.DMatrix(X[holdout], label=y[holdout], feature_names=columns)
+        
+        params = {
+            "objective": MODEL_PARAMS["objective"],
+            "num_class": MODEL_PARAMS["num_class"],
+            "eta": MODEL_PARAMS["learning_rate"],
+            "max_depth": MODEL_PARAMS["max_depth"],
+            "subsample": MODEL_PARAMS["subsample"],
+            "colsample_bytree": MODEL_PARAMS["colsample_bytree"],
+            "tree_method": "hist",
+            "eval_metric": "mlogloss"
+        }
+        
+        base_rounds = base_booster.num_boosted_rounds()
+        booster = xgb.train(
+            params,
+            dtrain,
+            num_boost_round=num_boost_round,
+            xgb_model=base_booster,
+            evals=[(dholdout, "holdout")],
+            early_stopping_rounds=early_stopping_rounds,
+            verbose_eval=False
+        )
+        # Drop the rounds added after the best holdout score
+        booster = booster[:booster.best_iteration + 1]
+        
+        # Load the extended booster into a fresh classifier through the public API
+        model = xgb.XGBClassifier()
+        model.load_model(bytearray(booster.save_raw("json")))
+        self.model = model
+        incremental_seconds = time.perf_counter() - start
+        
+        accuracy = float(np.mean(booster.predict(dholdout) == y[holdout]))
+        report = {
+            "rows": int(len(y)),
+            "rounds_added": booster.num_boosted_rounds() - base_rounds,
+            "holdout_accuracy": accuracy,
+            "encode_seconds": encode_seconds,
+            "incremental_seconds": incremental_seconds
+        }
+        
+        if compare_from_scratch:
+            start = time.perf_counter()
+            scratch = xgb.XGBClassifier(**MODEL_PARAMS, tree_method="hist")
+            scratch.fit(X, y.astype(int))
+            report["from_scratch_seconds"] = time.perf_counter() - start
+            
+        print(f"Incremental retrain on {report['rows']} rows added {report['rounds_added']} rounds "
+              f"in {incremental_seconds:.2f}s (encoding took {encode_seconds:.2f}s), holdout accuracy {accuracy:.4f}")
+        if compare_from_scratch:
+            print(f"From-scratch train on the same rows took {report['from_scratch_seconds']:.2f}s")
+            
+        # Save the model
+        self.save_model()
+        return report
+
 # Sample training data structure
 sample_training_data = [
     {
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# The API's stores open their databases when first imported; point them at a
+# scratch directory before any test imports the api package
+_storage_dir = tempfile.mkdtemp(prefix="studybuddy-tests-")
+os.environ["UPLOAD_STORAGE_DIR"] = _storage_dir
+os.environ["QUIZ_DB_PATH"] = os.path.join(_storage_dir, "quizzes.db")
@@ -0,0 +1,43 @@
+from models.bart.chunking import batched, iter_windows, split_units
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+def make_document(paragraphs: int, sentences: int = 5) -> str:
+    return "\n\n".join(
+        " ".join(f"Paragraph {p} sentence {s} talks about topic {p * sentences + s}." for s in range(sentences))
+        for p in range(paragraphs)
+    )
+
+def test_windows_fit_the_budget_and_keep_every_sentence():
+    content = make_document(12)
+    windows = list(iter_windows(content, count_words, max_tokens=40, overlap=1))
+    
+    assert len(windows) > 1
+    assert all(count_words([window])[0] <= 40 for window in windows)
+    joined = " ".join(windows)
+    for sentence, _ in split_units(content):
+        assert sentence in joined
+
+def test_each_window_repeats_the_last_sentence_of_the_previous_one():
+    windows = list(iter_windows(make_document(8), count_words, max_tokens=40, overlap=1))
+    for previous, current in zip(windows, windows[1:]):
+        last_sentence = previous.split(". ")[-1]
+        assert current.startswith(last_sentence)
+
+def test_oversized_sentence_is_split_into_fitting_pieces():
+    sentence = " ".join(f"word{i}" for i in range(100)) + "."
+    windows = list(iter_windows(sentence, count_words, max_tokens=30, overlap=0))
+    assert len(windows) >= 4
+    assert all(count_words([window])[0] <= 30 for window in windows)
+    assert " ".join(windows).split() == sentence.split()
+
+def test_appending_content_keeps_the_earlier_windows():
+    content = make_document(10)
+    original = list(iter_windows(content, count_words, max_tokens=40))
+    extended = list(iter_windows(content + "\n\n" + "A new closing paragraph. It adds two sentences.", count_words, max_tokens=40))
+    assert extended[:len(original) - 1] == original[:-1]
+
+def test_batched_groups_in_order():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
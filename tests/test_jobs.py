@@ -0,0 +1,113 @@
+import io
+import threading
+import time
+import uuid
+
+import pytest
+
+from api import jobs
+from api.jobs import LEARNING_SPEEDS, JobQueue
+from api.quiz_store import quiz_store
+from api.storage import blob_store
+from models import model_bridge
+
+def make_upload(content: bytes, title: str = "Notes"):
+    """Store content with its extracted text already recorded, and add an upload of it"""
+    blob, _ = blob_store.store_stream(io.BytesIO(content), "txt")
+    blob_store.put_artifact(blob["sha256"], "text", content.decode("utf-8"))
+    return blob_store.add_upload(uuid.uuid4().hex, "course-1", title, "", "notes.txt", blob["sha256"])
+
+def generated(speed: str):
+    return {
+        "summary": {"summary": f"summary {speed}"},
+        "quiz": {"description": f"quiz {speed}", "questions": [{"question": "q"}]},
+        "flashcards": {"flashcards": []}
+    }
+
+def wait_for(queue: JobQueue, job_id: str, predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if predicate(job):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not reach the expected state: {queue.get(job_id)}")
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(db_path=str(tmp_path / "jobs.db"), workers=2)
+
+def test_uploads_of_the_same_content_share_one_job(queue, monkeypatch):
+    release = threading.Event()
+    calls = []
+    
+    def generate_all(text, speed):
+        release.wait(10)
+        calls.append(speed)
+        return generated(speed)
+    monkeypatch.setattr(model_bridge, "generate_all", generate_all)
+    
+    content = f"shared content {uuid.uuid4()}".encode("utf-8")
+    uploads = [make_upload(content, title=f"Notes {index}") for index in range(8)]
+    job_ids = [None] * len(uploads)
+    
+    def enqueue(index):
+        job_ids[index] = queue.enqueue(uploads[index])["id"]
+    threads = [threading.Thread(target=enqueue, args=(index,)) for index in range(len(uploads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    
+    assert len(set(job_ids)) == 1
+    wait_for(queue, job_ids[0], lambda job: job["status"] == "done")
+    assert sorted(calls) == sorted(LEARNING_SPEEDS)
+    # Every upload gets its own quiz per speed
+    for upload in uploads:
+        for speed in LEARNING_SPEEDS:
+            assert quiz_store.get_quiz(f"{upload['id']}-{speed}")["description"] == f"quiz {speed}"
+    
+    # Content already processed is published straight away, without a job
+    late = make_upload(content, title="Late notes")
+    assert queue.enqueue(late) is None
+    assert quiz_store.get_quiz(f"{late['id']}-fast") is not None
+
+def test_jobs_left_queued_resume_in_a_new_queue(queue, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_bridge, "generate_all", lambda text, speed: generated(speed))
+    # Simulate a process that stopped before running the job
+    submitted = []
+    monkeypatch.setattr(queue.executor, "submit", lambda *args: submitted.append(args))
+    upload = make_upload(f"resumed content {uuid.uuid4()}".encode("utf-8"))
+    job_id = queue.enqueue(upload)["id"]
+    assert len(submitted) == 1
+    
+    restarted = JobQueue(db_path=queue.db_path, workers=1)
+    assert restarted.resume() == [job_id]
+    job = wait_for(restarted, job_id, lambda job: job["status"] == "done")
+    assert set(job["results"]) == set(LEARNING_SPEEDS)
+    assert restarted.resume() == []
+
+def test_mock_output_requeues_the_stage_without_publishing(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_DELAY_SECONDS", 0.2)
+    model_ready = threading.Event()
+    
+    def generate_all(text, speed):
+        if not model_ready.is_set():
+            return dict(generated(speed), mock=True)
+        return generated(speed)
+    monkeypatch.setattr(model_bridge, "generate_all", generate_all)
+    
+    upload = make_upload(f"model not loaded {uuid.uuid4()}".encode("utf-8"))
+    job_id = queue.enqueue(upload)["id"]
+    job = wait_for(queue, job_id, lambda job: job["error"] is not None)
+    assert job["status"] == "queued"
+    assert job["results"] == {}
+    assert quiz_store.get_quiz(f"{upload['id']}-slow") is None
+    assert "quiz" not in blob_store.get_artifacts(upload["sha256"])
+    
+    # The retry runs once the model is available
+    model_ready.set()
+    job = wait_for(queue, job_id, lambda job: job["status"] == "done")
+    assert job["error"] is None
+    assert quiz_store.get_quiz(f"{upload['id']}-slow") is not None
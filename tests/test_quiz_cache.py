@@ -0,0 +1,63 @@
+import multiprocessing
+import uuid
+
+import pytest
+
+from api import app
+from api import quizzes  # registers the quiz routes
+from api.quiz_store import QuizStore, quiz_store
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def make_quiz(title: str, quiz_id: str = None):
+    return {"id": quiz_id or uuid.uuid4().hex, "course_id": "course-1", "title": title,
+            "questions": [{"question": "q"}]}
+
+def write_from_child(db_path: str, quiz):
+    QuizStore(db_path).put_quiz(quiz)
+
+def write_with_inherited_store(before: int):
+    quiz_store.put_quiz(make_quiz("Child"))
+    # Fails the child's exit code if the read went through the parent's connection
+    assert quiz_store.generation() == before + 1
+
+def test_unchanged_quiz_is_confirmed_with_304(client):
+    quiz = quiz_store.put_quiz(make_quiz("Cached"))
+    first = client.get(f"/api/quizzes/{quiz['id']}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    
+    again = client.get(f"/api/quizzes/{quiz['id']}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+def test_write_by_another_process_invalidates_cached_responses(client):
+    quiz = quiz_store.put_quiz(make_quiz("Before"))
+    etag = client.get(f"/api/quizzes/{quiz['id']}").headers["ETag"]
+    list_etag = client.get("/api/quizzes?courseId=course-1&limit=100").headers["ETag"]
+    
+    # The child writes without touching this process's response cache
+    context = multiprocessing.get_context("fork")
+    child = context.Process(target=write_from_child, args=(quiz_store.db_path, make_quiz("After", quiz["id"])))
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+    
+    changed = client.get(f"/api/quizzes/{quiz['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["title"] == "After"
+    assert changed.headers["ETag"] != etag
+    assert client.get("/api/quizzes?courseId=course-1&limit=100",
+                      headers={"If-None-Match": list_etag}).status_code == 200
+
+def test_generation_read_in_a_forked_child_uses_its_own_connection():
+    before = quiz_store.generation()
+    context = multiprocessing.get_context("fork")
+    # The child inherits this thread's open connection and must not reuse it
+    child = context.Process(target=write_with_inherited_store, args=(before,))
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+    assert quiz_store.generation() == before + 1
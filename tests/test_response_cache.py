@@ -0,0 +1,37 @@
+from api.response_cache import ResponseCache
+
+def test_entry_is_rebuilt_after_the_version_changes():
+    version = [0]
+    cache = ResponseCache(version=lambda: version[0])
+    builds = []
+    
+    def build():
+        builds.append(version[0])
+        return {"built_at": version[0]}
+    
+    first = cache.get_or_build("quizzes?", build)
+    assert cache.get_or_build("quizzes?", build) is first
+    assert cache.get("quizzes?") is first
+    
+    version[0] += 1
+    assert cache.get("quizzes?") is None
+    rebuilt = cache.get_or_build("quizzes?", build)
+    assert builds == [0, 1]
+    assert rebuilt.etags != first.etags
+
+def test_build_that_races_an_invalidation_is_not_stored():
+    cache = ResponseCache()
+    
+    def build():
+        cache.invalidate("quiz:1")
+        return {"id": "1"}
+    
+    cache.get_or_build("quiz:1", build)
+    assert cache.get("quiz:1") is None
+
+def test_oldest_entry_is_evicted_at_capacity():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_build(key, lambda: {"key": key})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
@@ -0,0 +1,63 @@
+import uuid
+
+import pytest
+
+from models import bridge_server, model_bridge
+from models.bart.generation_policy import generation_policy
+
+class FakeHandler:
+    """Stands in for BartModelHandler and records which level each generation ran at"""
+    model_id = "fake-bart#0"
+    
+    def __init__(self):
+        self.levels = []
+        
+    def generate_summary(self, content, learning_speed):
+        self.levels.append(generation_policy.current_level())
+        return {"summary": f"summary at level {generation_policy.current_level()}", "learning_speed": learning_speed}
+
+@pytest.fixture
+def handler(monkeypatch):
+    fake = FakeHandler()
+    monkeypatch.setattr(model_bridge, "get_bart_handler", lambda: fake)
+    # Hold the policy at whatever level a test sets
+    monkeypatch.setattr(generation_policy, "hold_seconds", 3600.0)
+    monkeypatch.setattr(generation_policy, "level", 0)
+    return fake
+
+def summarize(content):
+    return bridge_server.handle_request({
+        "action": "generate_summary",
+        "params": {"content": content, "learning_speed": "moderate"},
+        "request_id": uuid.uuid4().hex
+    })
+
+def test_degraded_request_reuses_a_full_quality_result(handler):
+    content = f"cached at full quality {uuid.uuid4()}"
+    first = summarize(content)
+    assert first["meta"]["generation"]["result_policy"] == "full"
+    
+    generation_policy.level = 2
+    second = summarize(content)
+    assert handler.levels == [0]
+    assert second["data"] == first["data"]
+    assert second["meta"]["generation"]["policy"] == "greedy"
+    # The metadata describes the settings the result was generated with
+    assert second["meta"]["generation"]["result_level"] == 0
+    assert second["meta"]["generation"]["result_policy"] == "full"
+
+def test_degraded_result_is_not_served_at_full_quality(handler):
+    content = f"cached degraded {uuid.uuid4()}"
+    generation_policy.level = 2
+    degraded = summarize(content)
+    assert degraded["meta"]["generation"]["result_policy"] == "greedy"
+    
+    generation_policy.level = 1
+    assert summarize(content)["meta"]["generation"]["result_policy"] == "reduced_beams"
+    generation_policy.level = 3
+    assert summarize(content)["meta"]["generation"]["result_policy"] == "reduced_beams"
+    assert handler.levels == [2, 1]
+    
+    generation_policy.level = 0
+    assert summarize(content)["meta"]["generation"]["result_policy"] == "full"
+    assert handler.levels == [2, 1, 0]
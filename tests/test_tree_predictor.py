@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from models.xgboost.xgboost_classifier import UserClassifier
+from models.xgboost.tree_predictor import CompiledClassifier, export_compiled_model
+from tests.test_xgboost_classifier import make_training_data
+
+def test_export_of_a_reloaded_model_matches_xgboost(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    UserClassifier(load_model=False).train(make_training_data(300))
+    samples = [item["responses"] for item in make_training_data(300, seed=1)]
+    
+    # Export from the reloaded model, whose booster came back from the binary format
+    classifier = UserClassifier()
+    path = str(tmp_path / "reloaded.npz")
+    export_compiled_model(classifier.model.get_booster(), classifier.feature_encoder, classifier.feature_columns, path)
+    
+    compiled = CompiledClassifier(path)
+    assert compiled.feature_names == classifier.feature_columns
+    assert compiled.classify_batch(samples) == classifier.classify_batch(samples)
+
+def test_export_without_columns_is_refused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    classifier = UserClassifier(load_model=False)
+    classifier.train(make_training_data(100))
+    
+    with pytest.raises(ValueError):
+        export_compiled_model(classifier.model.get_booster(), classifier.feature_encoder, [], str(tmp_path / "empty.npz"))
+    
+    np.savez(tmp_path / "legacy.npz", **{**dict(np.load("models/xgboost/learning_speed_classifier.npz")),
+                                         "feature_names": np.asarray([], dtype=str)})
+    with pytest.raises(ValueError):
+        CompiledClassifier(str(tmp_path / "legacy.npz"))
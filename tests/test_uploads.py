@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+import uuid
+
+import pytest
+
+from api import app
+from api import uploads
+from api.jobs import job_queue
+
+CHUNK_SIZE = 1024
+
+@pytest.fixture
+def client(monkeypatch):
+    # Completing an upload would start the generation pipeline
+    monkeypatch.setattr(job_queue, "enqueue", lambda upload: None)
+    return app.test_client()
+
+def start_upload(client, content: bytes):
+    response = client.post("/api/uploads", json={
+        "title": f"Deck {uuid.uuid4()}", "courseId": "course-1", "fileName": "deck.pdf",
+        "size": len(content), "chunkSize": CHUNK_SIZE, "sha256": hashlib.sha256(content).hexdigest()
+    })
+    assert response.status_code == 201
+    return response.get_json()["uploadId"]
+
+def send_chunks(client, upload_id: str, content: bytes):
+    for index in range(0, len(content), CHUNK_SIZE):
+        chunk = content[index:index + CHUNK_SIZE]
+        response = client.put(f"/api/uploads/{upload_id}/chunks/{index // CHUNK_SIZE}", data=chunk,
+                              headers={"X-Chunk-Sha256": hashlib.sha256(chunk).hexdigest()})
+        assert response.status_code == 200
+
+def test_complete_assembles_the_file_once(client):
+    content = os.urandom(3 * CHUNK_SIZE + 100)
+    upload_id = start_upload(client, content)
+    send_chunks(client, upload_id, content)
+    
+    statuses = []
+    def complete():
+        statuses.append(client.post(f"/api/uploads/{upload_id}/complete").status_code)
+    threads = [threading.Thread(target=complete) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(statuses) == [200, 409, 409, 409]
+    assert client.get(f"/api/uploads/{upload_id}").get_json()["state"] == "complete"
+    assert not os.path.exists(uploads._staging_path(upload_id))
+
+def test_complete_with_missing_chunks_reopens_the_session(client):
+    content = os.urandom(2 * CHUNK_SIZE)
+    upload_id = start_upload(client, content)
+    send_chunks(client, upload_id, content[:CHUNK_SIZE])
+    
+    response = client.post(f"/api/uploads/{upload_id}/complete")
+    assert response.status_code == 409
+    assert response.get_json()["missingChunks"] == [1]
+    assert client.get(f"/api/uploads/{upload_id}").get_json()["state"] == "open"
+
+def test_abort_removes_an_open_session(client):
+    upload_id = start_upload(client, os.urandom(CHUNK_SIZE))
+    assert client.delete(f"/api/uploads/{upload_id}").status_code == 200
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+    assert not os.path.exists(uploads._staging_path(upload_id))
+    assert client.post(f"/api/uploads/{upload_id}/complete").status_code == 404
+
+def test_abort_cannot_remove_a_session_being_completed(client):
+    content = os.urandom(CHUNK_SIZE)
+    upload_id = start_upload(client, content)
+    send_chunks(client, upload_id, content)
+    # As if a complete had claimed the session and was still assembling it
+    assert uploads._set_session_status(upload_id, "completing", "open")
+    
+    assert client.delete(f"/api/uploads/{upload_id}").status_code == 409
+    assert uploads.expire_sessions(max_age=0) >= 0
+    assert client.get(f"/api/uploads/{upload_id}").get_json()["state"] == "completing"
+    assert os.path.exists(uploads._staging_path(upload_id))
+    
+    assert uploads._set_session_status(upload_id, "open", "completing")
+    assert client.post(f"/api/uploads/{upload_id}/complete").status_code == 200
+    assert client.delete(f"/api/uploads/{upload_id}").status_code == 409
+
+def test_expiry_removes_only_stale_open_sessions(client):
+    stale = start_upload(client, os.urandom(CHUNK_SIZE))
+    completed_content = os.urandom(CHUNK_SIZE)
+    completed = start_upload(client, completed_content)
+    send_chunks(client, completed, completed_content)
+    assert client.post(f"/api/uploads/{completed}/complete").status_code == 200
+    
+    # Nothing is old enough under the default TTL
+    uploads.expire_sessions()
+    assert client.get(f"/api/uploads/{stale}").status_code == 200
+    
+    assert uploads.expire_sessions(max_age=0) >= 1
+    assert client.get(f"/api/uploads/{stale}").status_code == 404
+    assert not os.path.exists(uploads._staging_path(stale))
+    assert client.get(f"/api/uploads/{completed}").get_json()["state"] == "complete"
@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from models.xgboost import xgboost_classifier
+from models.xgboost.xgboost_classifier import UserClassifier
+from models.xgboost.tree_predictor import SPEED_LABELS
+
+def make_training_data(count: int, seed: int = 0):
+    """Labelled responses whose first-seen one-hot column order is not q{id}_{slow,moderate,fast}"""
+    rng = np.random.default_rng(seed)
+    data = []
+    for _ in range(count):
+        responses = {question_id: SPEED_LABELS[rng.integers(0, 3)] for question_id in range(1, 9)}
+        votes = [SPEED_LABELS.index(response) for response in responses.values()]
+        data.append({"responses": responses, "classification": SPEED_LABELS[int(round(np.mean(votes)))]})
+    return data
+
+@pytest.fixture
+def trained(tmp_path, monkeypatch):
+    # Model paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    classifier = UserClassifier(load_model=False)
+    classifier.train(make_training_data(300))
+    samples = [item["responses"] for item in make_training_data(300, seed=1)]
+    return classifier, samples
+
+def test_reloaded_model_predicts_like_the_trained_one(trained):
+    classifier, samples = trained
+    expected = classifier.classify_batch(samples)
+    
+    reloaded = UserClassifier()
+    assert reloaded.feature_columns == classifier.feature_columns
+    assert reloaded.classify_batch(samples) == expected
+    assert [reloaded.classify(responses) for responses in samples[:20]] == expected[:20]
+
+def test_model_saved_without_column_order_rebuilds_it(trained):
+    classifier, samples = trained
+    expected = classifier.classify_batch(samples)
+    os.remove(xgboost_classifier.FEATURE_COLUMNS_PATH)
+    
+    reloaded = UserClassifier()
+    assert reloaded.feature_columns == classifier.feature_columns
+    assert reloaded.classify_batch(samples) == expected
+
+def write_jsonl(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in data:
+            f.write(json.dumps(item) + "\n")
+
+def test_incremental_retrain_of_a_reloaded_model(trained, tmp_path):
+    classifier, samples = trained
+    write_jsonl(tmp_path / "new.jsonl", make_training_data(200, seed=2))
+    
+    reloaded = UserClassifier()
+    report = reloaded.train_incremental(str(tmp_path / "new.jsonl"), compare_from_scratch=True)
+    assert report["rows"] == 200
+    assert {"encode_seconds", "incremental_seconds", "from_scratch_seconds"} <= set(report)
+    assert reloaded.model.get_booster().feature_names == classifier.feature_columns
+    
+    # The retrained model is saved with the same columns and reloads to the same predictions
+    assert UserClassifier().classify_batch(samples) == reloaded.classify_batch(samples)
+
+def test_incremental_retrain_refuses_mismatched_columns(trained, tmp_path):
+    write_jsonl(tmp_path / "new.jsonl", make_training_data(50, seed=2))
+    
+    reloaded = UserClassifier()
+    reloaded.feature_columns = sorted(reloaded.feature_columns)
+    with pytest.raises(ValueError):
+        reloaded.train_incremental(str(tmp_path / "new.jsonl"))